@@ -0,0 +1,256 @@
+# admission.py - 답변 생성 동시 실행 수 제한 (세션별 공정 대기열, 과부하 시 429로 거절)
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from deadline import Deadline
+from latency_stats import Histogram, LatencyWindow
+
+try:
+    import fcntl
+except ImportError:  # Windows 개발 환경에서는 프로세스 안에서만 제한
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 대기 시간(초)과 도착 시 대기열 길이 히스토그램 구간
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class Overloaded(Exception):
+    """요청을 받을 수 없음 (reason: 거절 사유, retry_after: 다시 시도하기까지 권장 대기 시간(초))"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"요청 거절 ({reason}), {retry_after}초 후 재시도 권장")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """대기열의 요청 하나 (with 문을 벗어나면 실행 슬롯 반환)"""
+
+    __slots__ = ("controller", "session_id", "enqueued_at", "admitted_at", "slot", "released")
+
+    def __init__(self, controller: "AdmissionController", session_id: str):
+        self.controller = controller
+        self.session_id = session_id
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.slot: Optional[int] = None
+        self.released = False
+
+    def release(self) -> None:
+        self.controller.release(self)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """답변 생성을 동시에 최대 max_concurrent개만 실행하고 나머지는 대기열에서 차례를 기다림
+
+    - 실행 슬롯은 slot_dir의 잠금 파일(fcntl) max_concurrent개로 표현하여 같은 서버의 gunicorn 워커가 한도를 공유합니다.
+      워커가 비정상 종료되어도 운영체제가 잠금을 풀어 슬롯이 회수됩니다.
+    - 대기열은 세션별로 나뉘어 세션을 번갈아 가며(라운드 로빈) 실행하므로, 질문을 연달아 보내는 세션이
+      다른 세션의 차례를 빼앗지 못합니다. 세션당 대기 요청 수도 max_per_session개로 제한합니다.
+    - 대기열이 가득 찼거나, 최근 실행 시간으로 예측한 대기 시간이 max_wait초를 넘으면 바로 거절(Overloaded)합니다.
+    - 다른 워커가 반환한 슬롯은 알림을 받을 수 없으므로 차례가 된 요청은 poll_interval 간격으로 슬롯을 확인합니다.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int = 32, max_wait: float = 10.0,
+                 max_per_session: int = 3, slot_dir: Optional[str] = None, poll_interval: float = 0.02):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.max_per_session = max(1, max_per_session)
+        self.slot_dir = slot_dir if fcntl is not None else None
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._sessions: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        self._waiting = 0
+        self._held: Dict[int, Ticket] = {}
+        self._slot_files: List[Any] = []
+        self.hold_time = LatencyWindow()
+        self.wait_time = Histogram(WAIT_BUCKETS)
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+        self.admitted = 0
+        self.shed: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def predicted_wait(self, ahead: int) -> Optional[float]:
+        """앞에 ahead개 요청이 있을 때 예상 대기 시간(초), 실행 시간 표본이 없으면 None"""
+        service = self.hold_time.percentile(50)
+        if service is None:
+            return None
+        return (ahead + 1) * service / self.max_concurrent
+
+    def admit(self, session_id: str, deadline: Optional[Deadline] = None) -> Ticket:
+        """실행 차례가 될 때까지 대기 후 슬롯을 잡은 Ticket 반환 (받을 수 없으면 Overloaded)"""
+        ticket = self._enqueue(session_id)
+        wait_until = self._wait_until(ticket, deadline)
+        with self._cond:
+            while not self._try_admit(ticket):
+                remaining = wait_until - time.monotonic()
+                if remaining <= 0:
+                    self._give_up(ticket)
+                self._cond.wait(min(remaining, self.poll_interval) if self.slot_dir else remaining)
+        return ticket
+
+    async def aadmit(self, session_id: str, deadline: Optional[Deadline] = None) -> Ticket:
+        """admit의 비동기 버전 (기다리는 동안 이벤트 루프와 스레드를 막지 않음)"""
+        ticket = self._enqueue(session_id)
+        wait_until = self._wait_until(ticket, deadline)
+        while True:
+            with self._cond:
+                if self._try_admit(ticket):
+                    return ticket
+                if time.monotonic() >= wait_until:
+                    self._give_up(ticket)
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self, ticket: Ticket) -> None:
+        """실행 슬롯 반환 (여러 번 호출해도 한 번만 반환)"""
+        with self._cond:
+            if ticket.released or ticket.admitted_at is None:
+                return
+            ticket.released = True
+            if ticket.slot is not None:
+                del self._held[ticket.slot]
+                if self.slot_dir:
+                    fcntl.flock(self._slot_files[ticket.slot], fcntl.LOCK_UN)
+            self._cond.notify_all()
+        self.hold_time.add(time.monotonic() - ticket.admitted_at)
+
+    def _wait_until(self, ticket: Ticket, deadline: Optional[Deadline]) -> float:
+        """대기를 포기할 시각 (max_wait과 요청 시간 예산 중 먼저 끝나는 쪽)"""
+        limit = self.max_wait
+        remaining = deadline.remaining() if deadline is not None else None
+        if remaining is not None:
+            limit = min(limit, remaining)
+        return ticket.enqueued_at + limit
+
+    def _reject(self, reason: str, ahead: int) -> None:
+        """거절 사유를 집계하고 Overloaded 발생 (Retry-After는 예상 대기 시간, 최소 1초)"""
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        predicted = self.predicted_wait(ahead)
+        retry_after = max(1, math.ceil(predicted)) if predicted is not None else 1
+        logger.warning(f"요청 거절 ({reason}): 대기 {self._waiting}개, 실행 중 {len(self._held)}개")
+        raise Overloaded(reason, retry_after)
+
+    def _enqueue(self, session_id: str) -> Ticket:
+        ticket = Ticket(self, session_id)
+        with self._cond:
+            ahead = self._waiting
+            self.queue_depth.add(ahead)
+            if not self.enabled:
+                ticket.admitted_at = ticket.enqueued_at
+                self.admitted += 1
+                return ticket
+            if ahead >= self.max_queue and not self._can_start_now():
+                self._reject('queue_full', ahead)
+            session_queue = self._sessions.get(session_id)
+            if session_queue is not None and len(session_queue) >= self.max_per_session:
+                self._reject('session_queue_full', ahead)
+            predicted = self.predicted_wait(ahead) if ahead else None
+            if predicted is not None and predicted > self.max_wait:
+                self._reject('predicted_wait', ahead)
+            self._sessions.setdefault(session_id, deque()).append(ticket)
+            self._waiting += 1
+        return ticket
+
+    def _can_start_now(self) -> bool:
+        return self._waiting == 0 and len(self._held) < self.max_concurrent
+
+    def _try_admit(self, ticket: Ticket) -> bool:
+        """ticket이 라운드 로빈 차례이고 빈 슬롯을 잡으면 대기열에서 빼고 True (self._cond를 잡은 상태에서 호출)"""
+        if ticket.admitted_at is not None:
+            return True
+        session_id, session_queue = next(iter(self._sessions.items()))
+        if session_queue[0] is not ticket:
+            return False
+        slot = self._acquire_slot()
+        if slot is None:
+            return False
+        session_queue.popleft()
+        # 이 세션의 다음 요청은 다른 세션들 뒤로 보냄
+        del self._sessions[session_id]
+        if session_queue:
+            self._sessions[session_id] = session_queue
+        self._waiting -= 1
+        ticket.slot = slot
+        self._held[slot] = ticket
+        ticket.admitted_at = time.monotonic()
+        self.admitted += 1
+        self.wait_time.add(ticket.admitted_at - ticket.enqueued_at)
+        # 다음 차례 요청이 바로 슬롯을 확인하도록 깨움
+        self._cond.notify_all()
+        return True
+
+    def _give_up(self, ticket: Ticket) -> None:
+        """대기 시간 한도가 지난 요청을 대기열에서 빼고 거절"""
+        session_queue = self._sessions[ticket.session_id]
+        session_queue.remove(ticket)
+        if not session_queue:
+            del self._sessions[ticket.session_id]
+        self._waiting -= 1
+        self._cond.notify_all()
+        self._reject('wait_timeout', self._waiting)
+
+    def _acquire_slot(self) -> Optional[int]:
+        """빈 실행 슬롯 번호 (없으면 None)"""
+        free = [slot for slot in range(self.max_concurrent) if slot not in self._held]
+        if not self.slot_dir:
+            return free[0] if free else None
+        # 워커들이 같은 순서로 확인하면 앞쪽 슬롯에서만 경합하므로 임의 순서로 확인
+        random.shuffle(free)
+        for slot in free:
+            try:
+                fcntl.flock(self._slot_file(slot), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot
+            except BlockingIOError:
+                continue
+        return None
+
+    def _slot_file(self, slot: int):
+        if not self._slot_files:
+            os.makedirs(self.slot_dir, exist_ok=True)
+            self._slot_files = [
+                open(os.path.join(self.slot_dir, f"slot-{i}.lock"), "a") for i in range(self.max_concurrent)
+            ]
+        return self._slot_files[slot]
+
+    def stats(self) -> Dict[str, Any]:
+        """대기열 길이, 대기 시간 히스토그램, 거절 횟수"""
+        with self._cond:
+            waiting, in_flight, admitted, shed = self._waiting, len(self._held), self.admitted, dict(self.shed)
+            sessions = len(self._sessions)
+        predicted = self.predicted_wait(waiting) if self.enabled else None
+        return {
+            'enabled': self.enabled,
+            'shared_across_workers': bool(self.slot_dir),
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'max_wait_seconds': self.max_wait,
+            'in_flight': in_flight,
+            'queue_depth': waiting,
+            'waiting_sessions': sessions,
+            'predicted_wait_seconds': round(predicted, 3) if predicted is not None else None,
+            'admitted': admitted,
+            'shed': shed,
+            'queue_depth_histogram': self.queue_depth.summary(),
+            'wait_seconds_histogram': self.wait_time.summary(),
+            'generation_seconds': self.hold_time.summary(),
+        }
@@ -0,0 +1,224 @@
+# ann_index.py - 말뭉치 크기에 따른 FAISS 인덱스 종류 선택(Flat/HNSW/IVF/PQ)과 파라미터 조정
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf", "pq")
+INDEX_COMPRESSIONS = ("none", "fp16", "pq")
+
+HNSW_M = 32
+HNSW_EF_CANDIDATES = (16, 32, 64, 128, 256, 512)
+# IVF 군집 하나당 최소 학습 벡터 수 (FAISS 권장값)
+MIN_POINTS_PER_CENTROID = 39
+# PQ 코드북(256개 중심) 학습에 필요한 최소 벡터 수
+PQ_MIN_TRAIN = 256 * MIN_POINTS_PER_CENTROID
+# 재현율/지연 측정에 쓸 표본 질의 수
+EVAL_QUERIES = 200
+
+
+def choose_index_type(requested: str, ntotal: int, flat_max: int, compression: str) -> str:
+    """설정과 벡터 수로 실제 사용할 인덱스 종류 결정 (학습 데이터가 부족하면 flat)"""
+    if requested not in INDEX_TYPES:
+        raise ValueError(f"알 수 없는 인덱스 종류입니다: {requested} (가능: {', '.join(INDEX_TYPES)})")
+    if compression not in INDEX_COMPRESSIONS:
+        raise ValueError(f"알 수 없는 인덱스 압축 방식입니다: {compression} (가능: {', '.join(INDEX_COMPRESSIONS)})")
+    index_type = requested
+    if requested == "auto":
+        if ntotal < flat_max:
+            return "flat"
+        index_type = "pq" if compression == "pq" else "hnsw"
+    if index_type == "ivf" and ntotal < MIN_POINTS_PER_CENTROID * 2:
+        logger.warning(f"IVF 학습에 벡터가 부족하여({ntotal}개) flat 인덱스를 사용합니다.")
+        return "flat"
+    if index_type == "pq" and ntotal < PQ_MIN_TRAIN:
+        logger.warning(f"PQ 학습에 벡터가 부족하여({ntotal}개, 최소 {PQ_MIN_TRAIN}개) flat 인덱스를 사용합니다.")
+        return "flat"
+    return index_type
+
+
+def _ivf_nlist(ntotal: int) -> int:
+    """IVF 군집 수: 약 4*sqrt(n), 군집마다 학습 벡터가 충분하도록 제한"""
+    return max(1, min(int(4 * math.sqrt(ntotal)), ntotal // MIN_POINTS_PER_CENTROID))
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """차원을 나누어떨어지게 하는 PQ 부분 양자화기 수 (부분 벡터당 약 8차원, 벡터당 m바이트)"""
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def factory_spec(index_type: str, dim: int, ntotal: int, compression: str) -> str:
+    """faiss.index_factory 설정 문자열"""
+    storage = "SQfp16" if compression == "fp16" else "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}" if storage == "Flat" else f"HNSW{HNSW_M},{storage}"
+    if index_type == "ivf":
+        return f"IVF{_ivf_nlist(ntotal)},{storage}"
+    if index_type == "pq":
+        # np: 폴리세머스 학습은 매우 느리고 이 검색 방식에서는 쓰지 않으므로 생략
+        return f"IVF{_ivf_nlist(ntotal)},PQ{_pq_subquantizers(dim)}np"
+    return "Flat" if storage == "Flat" else storage
+
+
+def exact_index(index) -> Optional[faiss.IndexFlat]:
+    """원본 벡터를 그대로 복원할 수 있으면 같은 순서의 flat 인덱스로 변환 (PQ/fp16처럼 손실 압축이면 None)
+
+    HNSW는 remove_ids를 지원하지 않으므로 증분 반영은 flat으로 되돌린 뒤 수행하고 검색 인덱스를 다시 만듭니다.
+    """
+    if isinstance(index, faiss.IndexFlat):
+        return index
+    if isinstance(index, faiss.IndexHNSWFlat):
+        pass
+    elif isinstance(index, faiss.IndexIVFFlat):
+        index.make_direct_map()
+    else:
+        return None
+    flat = faiss.IndexFlat(index.d, index.metric_type)
+    if index.ntotal:
+        flat.add(index.reconstruct_n(0, index.ntotal))
+    return flat
+
+
+def apply_search_params(index, params: Dict[str, Any]) -> None:
+    """저장된 검색 파라미터(efSearch, nprobe)를 인덱스에 적용"""
+    if "efSearch" in params and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = int(params["efSearch"])
+    if "nprobe" in params and isinstance(index, faiss.IndexIVF):
+        index.nprobe = int(params["nprobe"])
+
+
+def search_parameters(index, selector) -> faiss.SearchParameters:
+    """인덱스 종류에 맞는 검색 파라미터 (HNSW/IVF는 전용 타입이어야 하며 조정된 값을 유지해야 함)"""
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = index.hnsw.efSearch
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = index.nprobe
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    return params
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t[t >= 0])) for f, t in zip(found, truth))
+    total = sum(int((t >= 0).sum()) for t in truth)
+    return hits / total if total else 1.0
+
+
+def _latency_ms(index, queries: np.ndarray, k: int) -> Dict[str, float]:
+    """질의 하나씩 검색할 때의 지연 시간 p50/p95 (밀리초)"""
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query[None, :], k)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"p50_ms": round(float(np.percentile(samples, 50)), 3), "p95_ms": round(float(np.percentile(samples, 95)), 3)}
+
+
+# 목표 재현율에 도달하지 못하면 차례로 시도할 (인덱스 종류, 압축 방식)
+# (PQ는 압축을 fp16으로 낮춘 IVF로, 그래도 안 되거나 HNSW/IVF이면 정확 검색(flat)으로)
+RECALL_FALLBACKS = {
+    "pq": ("ivf", "fp16"),
+    "hnsw": ("flat", "none"),
+    "ivf": ("flat", "none"),
+}
+
+
+def _tune(flat: faiss.IndexFlat, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+          spec: str, k: int, target_recall: float) -> Tuple[Any, Dict[str, int], float]:
+    """spec 인덱스를 학습/구성하고 목표 재현율을 만족하는 가장 작은 검색 파라미터 탐색 (인덱스, 파라미터, 재현율)"""
+    ntotal = flat.ntotal
+    index = faiss.index_factory(flat.d, spec, flat.metric_type)
+    if not index.is_trained:
+        nlist = faiss.extract_index_ivf(index).nlist if isinstance(index, faiss.IndexIVF) else 1
+        sample = min(ntotal, max(nlist * 256, PQ_MIN_TRAIN))
+        train = vectors if sample == ntotal else vectors[np.random.default_rng(0).choice(ntotal, sample, replace=False)]
+        index.train(train)
+    index.add(vectors)
+
+    # 파라미터 후보를 작은 값(빠른 검색)부터 시험
+    candidates: List[Tuple[str, int]] = []
+    if isinstance(index, faiss.IndexHNSW):
+        candidates = [("efSearch", ef) for ef in HNSW_EF_CANDIDATES if ef >= k] or [("efSearch", k)]
+    elif isinstance(index, faiss.IndexIVF):
+        nlist = index.nlist
+        candidates = [("nprobe", 2 ** i) for i in range(int(math.log2(nlist)) + 1)]
+        if candidates[-1][1] != nlist:
+            candidates.append(("nprobe", nlist))
+
+    params: Dict[str, int] = {}
+    recall = None
+    for name, value in candidates:
+        apply_search_params(index, {name: value})
+        _, found = index.search(queries, k)
+        recall = _recall(found, truth)
+        params = {name: value}
+        if recall >= target_recall:
+            break
+    if recall is None:
+        _, found = index.search(queries, k)
+        recall = _recall(found, truth)
+    return index, params, recall
+
+
+def build_search_index(flat: faiss.IndexFlat, index_type: str, compression: str,
+                       target_recall: float, k: int) -> Tuple[Any, Dict[str, Any]]:
+    """flat 인덱스의 벡터로 검색용 인덱스를 만들고, 목표 재현율을 만족하는 가장 빠른 파라미터로 조정
+
+    표본 벡터를 질의로 삼아 flat(정확) 검색 결과 대비 재현율(recall@k)과 질의당 지연 시간을 측정해 반환합니다.
+    가장 큰 파라미터로도 목표 재현율에 도달하지 못하면 RECALL_FALLBACKS 순서로 더 정확한 인덱스를 사용합니다.
+    """
+    started = time.perf_counter()
+    ntotal = flat.ntotal
+    spec = factory_spec(index_type, flat.d, ntotal, compression)
+    info: Dict[str, Any] = {"type": index_type, "compression": compression, "factory": spec, "vectors": ntotal, "params": {}}
+    if ntotal == 0:
+        return flat, info
+
+    vectors = flat.reconstruct_n(0, ntotal)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(ntotal, min(EVAL_QUERIES, ntotal), replace=False)]
+    k = min(k, ntotal)
+    info["k"] = k
+    # 표본 질의의 정확 검색 결과(정답)
+    _, truth = flat.search(queries, k)
+
+    index, recall = flat, 1.0
+    while spec != "Flat":
+        index, params, recall = _tune(flat, vectors, queries, truth, spec, k, target_recall)
+        if recall >= target_recall or index_type not in RECALL_FALLBACKS:
+            info["params"] = params
+            break
+        fallback_type, fallback_compression = RECALL_FALLBACKS[index_type]
+        fallback_spec = factory_spec(fallback_type, flat.d, ntotal, fallback_compression)
+        logger.warning(
+            f"{spec} 인덱스가 목표 재현율 {target_recall}에 도달하지 못해(최대 {recall:.4f}) "
+            f"{fallback_spec} 인덱스로 대체합니다."
+        )
+        info.setdefault("fallback_from", []).append({"factory": spec, "recall_at_k": round(recall, 4)})
+        index_type, compression, spec = fallback_type, fallback_compression, fallback_spec
+        index, recall = flat, 1.0
+    info.update({"type": index_type, "compression": compression, "factory": spec})
+
+    info["recall_at_k"] = round(recall, 4)
+    info["latency"] = _latency_ms(index, queries[:50], k)
+    if index is not flat:
+        info["exact_latency"] = _latency_ms(flat, queries[:50], k)
+    info["build_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"검색 인덱스 구성 완료: {spec} {info['params']} recall@{k}={info['recall_at_k']} "
+        f"(목표 {target_recall}), 질의당 p50 {info['latency']['p50_ms']}ms ({info['build_seconds']:.2f}초)"
+    )
+    if recall < target_recall:
+        logger.warning(f"목표 재현율 {target_recall}에 도달하지 못했습니다 (최대 {recall:.4f}).")
+    return index, info
@@ -1,21 +1,48 @@
 # app.py - 메인 Flask 애플리케이션
-from flask import Flask, request, jsonify, render_template_string, render_template
+from flask import Flask, request, jsonify, render_template_string, render_template, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy.exc import IntegrityError, OperationalError
+from datetime import datetime, timedelta
 import os
 import json
 import logging
-from typing import List, Dict, Any
+import threading
+import time
+import asyncio
+from typing import List, Dict, Any, Iterable, Iterator, AsyncIterator, Optional, Tuple
 
 # --- Gemini 및 LangChain 관련 임포트 변경 ---
 # import openai # OpenAI 라이브러리 대신 Gemini 관련 라이브러리 사용
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings # Gemini 모델 임포트
+from langchain_google_genai import ChatGoogleGenerativeAI # Gemini 모델 임포트
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS # Langchain 0.1.0 이후 langchain.vectorstores에서 langchain_community.vectorstores로 변경
-from langchain_community.document_loaders import CSVLoader # CSV 로더 임포트
 from langchain.schema import Document # Document 클래스 임포트
 from dotenv import load_dotenv # .env 파일 로드를 위해 추가
+from index_store import (
+    MANIFEST_FILE, build_manifest, diff_rows, files_unchanged, index_build_lock, index_version,
+    load_index, load_manifest, row_file, row_key, same_build_config, save_index, text_sha256
+)
+from embedding_cache import CachedEmbeddings, QueryEmbeddingCache
+from embedding_pipeline import EmbeddingPipeline
+from embedders import create_embeddings
+from csv_ingest import DEFAULT_METADATA_SCHEMA, iter_data_documents, parse_schema, render_document
+from metadata_index import MetadataColumns
+from lexical_index import BM25Index
+from ann_index import apply_search_params, build_search_index, choose_index_type, exact_index
+from retrieval import position_documents, reciprocal_rank_fusion
+from micro_batcher import RetrievalBatcher
+from latency_stats import Histogram, LatencyWindow
+from deadline import Deadline, DeadlineExceeded, HedgedCaller
+from admission import AdmissionController, Overloaded
+from constraints import ConstraintExtractor
+from response_cache import SemanticResponseCache, unit_vector
+from prompt_builder import PromptBuilder, estimate_tokens
+from session_summary import SessionSummarizer
+from conversation_memory import ConversationMemory
+from followup import SessionRetrievalCache, detect_followup, pick_ordinal
+from faq_router import FaqRouter
+from canned_answers import DEFAULT_CANNED_QUESTIONS, CannedAnswers, parse_questions
 
 # .env 파일 로드 (가장 상단에 위치하여 환경 변수를 먼저 로드)
 load_dotenv()
@@ -28,9 +55,102 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 # SECRET_KEY를 .env에서 로드하도록 변경
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'your-fallback-secret-key-please-change')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///chatbot.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///chatbot.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# 벡터 인덱스 저장 경로 (CSV 내용이 바뀌지 않았다면 재임베딩 없이 로드)
+RAG_INDEX_DIR = os.getenv('RAG_INDEX_DIR', os.path.join('instance', 'rag_index'))
+# 임베딩 캐시 파일 (모든 gunicorn 워커가 공유)
+RAG_EMBEDDING_CACHE = os.getenv('RAG_EMBEDDING_CACHE', os.path.join('instance', 'embedding_cache.sqlite3'))
+# 임베딩 캐시 최대 행 수와 보관 기간(초), 넘으면 오래된 것부터 삭제 (0이면 제한 없음)
+RAG_EMBEDDING_CACHE_MAX_ROWS = int(os.getenv('RAG_EMBEDDING_CACHE_MAX_ROWS', '200000'))
+RAG_EMBEDDING_CACHE_MAX_AGE = float(os.getenv('RAG_EMBEDDING_CACHE_MAX_AGE', str(30 * 24 * 3600)))
+# 검색 인덱스 종류 (auto / flat / hnsw / ivf / pq)와 메모리 압축 방식 (none / fp16 / pq)
+RAG_INDEX_TYPE = os.getenv('RAG_INDEX_TYPE', 'auto')
+RAG_INDEX_COMPRESSION = os.getenv('RAG_INDEX_COMPRESSION', 'none')
+# auto일 때 이 벡터 수 미만이면 정확 검색(flat), 이상이면 근사 검색 인덱스 사용
+RAG_INDEX_FLAT_MAX = int(os.getenv('RAG_INDEX_FLAT_MAX', '10000'))
+# 근사 검색 파라미터(efSearch, nprobe) 조정 시 목표로 하는 정확 검색 대비 재현율
+RAG_INDEX_TARGET_RECALL = float(os.getenv('RAG_INDEX_TARGET_RECALL', '0.95'))
+# 질의 임베딩 LRU 캐시 크기와 유효 시간(초, 0이면 만료 없음)
+RAG_QUERY_CACHE_SIZE = int(os.getenv('RAG_QUERY_CACHE_SIZE', '1024'))
+RAG_QUERY_CACHE_TTL = float(os.getenv('RAG_QUERY_CACHE_TTL', '0'))
+# 동시에 들어온 질의를 모아 임베딩/벡터 검색을 한 번에 처리할 최대 개수와 최대 대기 시간(밀리초, 0이면 사용 안 함)
+RAG_BATCH_MAX_SIZE = int(os.getenv('RAG_BATCH_MAX_SIZE', '16'))
+RAG_BATCH_MAX_WAIT_MS = float(os.getenv('RAG_BATCH_MAX_WAIT_MS', '5'))
+# 응답 캐시 크기, 유효 시간(초), 같은 질문으로 볼 질의 임베딩 코사인 유사도
+RAG_RESPONSE_CACHE_SIZE = int(os.getenv('RAG_RESPONSE_CACHE_SIZE', '512'))
+RAG_RESPONSE_CACHE_TTL = float(os.getenv('RAG_RESPONSE_CACHE_TTL', '3600'))
+RAG_RESPONSE_CACHE_THRESHOLD = float(os.getenv('RAG_RESPONSE_CACHE_THRESHOLD', '0.95'))
+# 빠른 질문 버튼 등 답변을 미리 만들어 둘 질문 목록('|'로 구분)과 저장 파일
+RAG_CANNED_QUESTIONS = os.getenv('RAG_CANNED_QUESTIONS', DEFAULT_CANNED_QUESTIONS)
+RAG_CANNED_ANSWERS = os.getenv('RAG_CANNED_ANSWERS', os.path.join('instance', 'canned_answers.json'))
+# 요청 한 건의 시간 예산(초): 대화 기록 조회, 검색, 답변 생성(스트리밍은 첫 토큰까지)이 나눠 씀 (0이면 제한 없음)
+# gunicorn 동기 워커의 기본 timeout(30초)보다 짧게 두어 워커가 종료되기 전에 안내 문구를 응답
+RAG_REQUEST_BUDGET = float(os.getenv('RAG_REQUEST_BUDGET', '25'))
+# 답변 생성이 일시적인 오류로 실패했을 때 재시도 횟수와 백오프 기본 대기 시간(초, 지터 적용, 남은 예산 안에서만 재시도)
+RAG_LLM_MAX_RETRIES = int(os.getenv('RAG_LLM_MAX_RETRIES', '2'))
+RAG_LLM_RETRY_DELAY = float(os.getenv('RAG_LLM_RETRY_DELAY', '0.5'))
+# 답변 생성이 최근 응답 시간의 이 백분위수(예: 95)를 넘기면 같은 요청을 한 번 더 보내 먼저 온 응답 사용 (0이면 사용 안 함)
+RAG_LLM_HEDGE_PERCENTILE = float(os.getenv('RAG_LLM_HEDGE_PERCENTILE', '0'))
+# 답변 생성 동시 실행 수 (같은 서버의 모든 gunicorn 워커 합계, 0이면 제한 없음)와 실행 슬롯 잠금 파일 폴더
+RAG_MAX_CONCURRENT = int(os.getenv('RAG_MAX_CONCURRENT', '8'))
+RAG_ADMISSION_SLOT_DIR = os.getenv('RAG_ADMISSION_SLOT_DIR', os.path.join('instance', 'llm_slots'))
+# 워커당 대기열 길이, 세션당 대기 요청 수, 최대 대기 시간(초, 예상 대기 시간이 이보다 길면 바로 429로 거절)
+RAG_ADMISSION_QUEUE_SIZE = int(os.getenv('RAG_ADMISSION_QUEUE_SIZE', '32'))
+RAG_ADMISSION_SESSION_QUEUE = int(os.getenv('RAG_ADMISSION_SESSION_QUEUE', '2'))
+RAG_ADMISSION_MAX_WAIT = float(os.getenv('RAG_ADMISSION_MAX_WAIT', '10'))
+# 프롬프트 토큰 예산(지시문, 검색 결과, 이전 대화 합계)과 프롬프트에 넣을 이전 챗봇 답변의 최대 토큰 수
+RAG_PROMPT_TOKEN_BUDGET = int(os.getenv('RAG_PROMPT_TOKEN_BUDGET', '2000'))
+RAG_PROMPT_HISTORY_ANSWER_TOKENS = int(os.getenv('RAG_PROMPT_HISTORY_ANSWER_TOKENS', '150'))
+# 프롬프트에 그대로 넣을 최근 대화 수 (1 이상, 그 이전 대화는 세션 요약으로 전달)와 세션 요약 최대 토큰 수 (0이면 요약 안 함)
+RAG_HISTORY_TURNS = max(1, int(os.getenv('RAG_HISTORY_TURNS', '1')))
+RAG_SUMMARY_MAX_TOKENS = int(os.getenv('RAG_SUMMARY_MAX_TOKENS', '300'))
+# 요약에 반영되지 않은 이전 대화가 몇 개 쌓이거나 몇 토큰을 넘으면 요약을 갱신할지 (그 전까지는 프롬프트에 그대로 넣음)
+RAG_SUMMARY_EVERY_TURNS = max(1, int(os.getenv('RAG_SUMMARY_EVERY_TURNS', '4')))
+RAG_SUMMARY_TRIGGER_TOKENS = int(os.getenv('RAG_SUMMARY_TRIGGER_TOKENS', '600'))
+# 최근 대화 외에 질문과 관련된 이전 대화를 몇 개까지 프롬프트에 넣을지와 최소 코사인 유사도 (0이면 사용 안 함)
+RAG_MEMORY_TURNS = int(os.getenv('RAG_MEMORY_TURNS', '2'))
+RAG_MEMORY_MIN_SIMILARITY = float(os.getenv('RAG_MEMORY_MIN_SIMILARITY', '0.5'))
+# 대화 임베딩을 메모리에 유지할 세션 수(LRU)와 세션당 대화 수
+RAG_MEMORY_SESSIONS = int(os.getenv('RAG_MEMORY_SESSIONS', '256'))
+RAG_MEMORY_MAX_TURNS = int(os.getenv('RAG_MEMORY_MAX_TURNS', '200'))
+# 후속 질문('두 번째 거는요?')에 다시 검색하지 않고 재사용할 세션별 직전 검색 결과 수(LRU, 0이면 사용 안 함)와 유효 시간(초)
+RAG_FOLLOWUP_SESSIONS = int(os.getenv('RAG_FOLLOWUP_SESSIONS', '1024'))
+RAG_FOLLOWUP_TTL = float(os.getenv('RAG_FOLLOWUP_TTL', '1800'))
+# 절차 질문(신청 방법, 준비 서류, 모집 시기, 일자리 유형) 라우팅: 키워드가 있을 때와 없을 때 대표 질문과의 최소 n-gram 유사도
+# (정해진 답변으로 LLM 없이 응답, RAG_FAQ_MIN_SIMILARITY를 1 초과로 설정하면 끔)
+RAG_FAQ_MIN_SIMILARITY = float(os.getenv('RAG_FAQ_MIN_SIMILARITY', '0.3'))
+RAG_FAQ_HIGH_SIMILARITY = float(os.getenv('RAG_FAQ_HIGH_SIMILARITY', '0.7'))
+# 임베딩 백엔드 (gemini / local) 및 기본 백엔드로 인덱스를 준비하지 못했을 때 대신 사용할 백엔드 (빈 값이면 사용 안 함)
+RAG_EMBEDDING_BACKEND = os.getenv('RAG_EMBEDDING_BACKEND', 'gemini')
+RAG_EMBEDDING_FALLBACK = os.getenv('RAG_EMBEDDING_FALLBACK', 'local')
+# 대체 백엔드 인덱스 사용 중 기본 백엔드로 다시 구축을 시도하는 주기(초)
+RAG_BACKEND_RETRY_INTERVAL = float(os.getenv('RAG_BACKEND_RETRY_INTERVAL', '600'))
+# 로컬 임베딩(문자 n-gram 해싱) 차원
+RAG_LOCAL_EMBEDDING_DIM = int(os.getenv('RAG_LOCAL_EMBEDDING_DIM', '512'))
+# 인덱싱 임베딩 배치 크기, 동시 요청 수, 분당 요청 한도, 재시도 횟수
+RAG_EMBED_BATCH_SIZE = int(os.getenv('RAG_EMBED_BATCH_SIZE', '100'))
+RAG_EMBED_CONCURRENCY = int(os.getenv('RAG_EMBED_CONCURRENCY', '4'))
+RAG_EMBED_RPM = float(os.getenv('RAG_EMBED_RPM', '300'))
+RAG_EMBED_MAX_RETRIES = int(os.getenv('RAG_EMBED_MAX_RETRIES', '5'))
+# CSV 스트리밍 시 한 번에 임베딩/인덱싱할 청크 수 (메모리 사용량 상한)
+RAG_INGEST_BATCH_SIZE = int(os.getenv('RAG_INGEST_BATCH_SIZE', str(RAG_EMBED_BATCH_SIZE * RAG_EMBED_CONCURRENCY)))
+# 인덱싱 방식: row(CSV 한 행 = 벡터 하나, 기본값) / chunk(행을 텍스트 분할기로 나눠 임베딩)
+RAG_INGEST_MODE = os.getenv('RAG_INGEST_MODE', 'row')
+# 타입이 지정된 메타데이터 컬럼 ("컬럼명:타입" 목록, 타입은 str/category/int)
+RAG_METADATA_SCHEMA = os.getenv('RAG_METADATA_SCHEMA', DEFAULT_METADATA_SCHEMA)
+# 하이브리드 검색: 벡터/BM25 후보를 k의 몇 배까지 가져와 RRF로 합칠지
+RAG_FUSION_FETCH_FACTOR = int(os.getenv('RAG_FUSION_FETCH_FACTOR', '4'))
+# BM25 확신도가 이 값 이상이면 질의 임베딩(원격 호출) 없이 BM25 결과만 사용 (1 초과로 설정하면 끔)
+RAG_LEXICAL_SHORTCUT = float(os.getenv('RAG_LEXICAL_SHORTCUT', '0.8'))
+# data 폴더 변경 감시 주기(초), 0이면 감시하지 않음
+RAG_RELOAD_INTERVAL = float(os.getenv('RAG_RELOAD_INTERVAL', '30'))
+# 지식 베이스 첫 구축 실패 시 다시 시도할 간격(초, 실패할 때마다 두 배, 최대값까지)과 최대 시도 횟수(0이면 무제한)
+RAG_BUILD_RETRY_DELAY = float(os.getenv('RAG_BUILD_RETRY_DELAY', '5'))
+RAG_BUILD_RETRY_MAX_DELAY = float(os.getenv('RAG_BUILD_RETRY_MAX_DELAY', '300'))
+RAG_BUILD_MAX_ATTEMPTS = int(os.getenv('RAG_BUILD_MAX_ATTEMPTS', '0'))
+
 # 확장 기능 초기화
 db = SQLAlchemy(app)
 CORS(app)
@@ -58,6 +178,13 @@ class Conversation(db.Model):
             'user_agent': self.user_agent
         }
 
+class SessionSummary(db.Model):
+    """세션별 대화 요약 (최근 대화를 제외한 이전 대화를 요약, 응답 이후 백그라운드에서 갱신)"""
+    session_id = db.Column(db.String(100), primary_key=True)
+    summary = db.Column(db.Text, nullable=False, default='')
+    last_conversation_id = db.Column(db.Integer, nullable=False, default=0)  # 요약에 반영된 마지막 대화 id
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class JobInfo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -68,135 +195,1074 @@ class JobInfo(db.Model):
     location = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+def create_tables():
+    """없는 테이블 생성 (기존 테이블과 데이터는 그대로 둠)
+
+    __main__ 외에 gunicorn(app:app, asgi:application)으로 실행할 때도 새로 추가된 테이블(session_summary 등)이
+    있도록 import 시점에 호출합니다. 여러 워커가 동시에 만들다 충돌하면 다른 워커가 만든 것이므로 무시합니다.
+    """
+    with app.app_context():
+        try:
+            db.create_all()
+        except OperationalError as e:
+            logger.warning(f"테이블 생성 중 충돌 (다른 워커가 생성한 것으로 보고 계속합니다): {e}")
+
+create_tables()
+
+# 응답 생성 실패 시 안내 문구
+ERROR_RESPONSE = "죄송합니다. 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
+# 요청 시간 예산 안에 답변을 만들지 못했을 때 안내 문구
+TIMEOUT_RESPONSE = "죄송합니다. 지금은 답변이 늦어지고 있습니다. 잠시 후 다시 질문해주세요."
+
+# 프롬프트 지시문 (앞부분: 역할, 뒷부분: 답변 지침)
+PROMPT_HEADER = "당신은 노인 일자리 상담 전문가입니다. 친절하고 정확한 정보를 제공해주세요."
+PROMPT_GUIDELINES = """
+위 정보를 바탕으로 사용자의 질문에 친절하고 정확하게 답변해주세요.
+특히 사용자가 '다리 아파'와 같이 신체적 부담을 언급하며 직업을 추천해달라고 할 경우,
+제공된 '관련 정보'에서 '신체활동수준'이 '낮음'이거나, '업무내용'을 보았을 때 주로 앉아서 하거나
+신체적 움직임이 적은 직업들을 우선적으로 추천해주세요.
+추천할 직업이 여러 개라면 2~3가지 정도를 예시로 들어 설명해주세요.
+만약 주어진 '관련 정보'에서 답을 찾을 수 없다면, 모른다고 답하고 추가 정보를 요청하거나, 다른 질문을 하도록 안내해주세요.
+불필요한 정보를 추가하지 마세요. 답변은 한국어로 제공해주세요. 이모지를 적절히 사용하여 친근감 표현해주세요.
+"""
+# 요청별 프롬프트/응답 토큰 수 히스토그램 구간
+TOKEN_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192)
+
 # RAG 시스템 클래스 (CSV 파일 로딩 및 Gemini 임베딩/모델 사용)
 class SeniorJobRAG:
-    def __init__(self):
-        # OpenAIEmbeddings 대신 GoogleGenerativeAIEmbeddings 사용
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    def __init__(self, background: bool = False, watch_interval: float = 0):
+        # 임베딩 백엔드별 객체 (처음 사용할 때 생성, 네트워크 없이도 서버가 시작되도록 함)
+        self.embedding_backend = RAG_EMBEDDING_BACKEND
+        self.embedders = {}
+        # 반복되는 질문은 임베딩 API를 다시 호출하지 않도록 정규화된 질의 기준으로 캐시
+        self.query_cache = QueryEmbeddingCache(RAG_QUERY_CACHE_SIZE, RAG_QUERY_CACHE_TTL)
+        # 동시 요청의 질의 임베딩과 벡터 검색을 배치로 묶어 처리
+        self.retrieval_batcher = RetrievalBatcher(self.query_cache, RAG_BATCH_MAX_SIZE, RAG_BATCH_MAX_WAIT_MS / 1000)
+        # 같은 문서로 답하는 비슷한 질문은 LLM을 다시 호출하지 않도록 답변 캐시
+        self.response_cache = SemanticResponseCache(
+            RAG_RESPONSE_CACHE_SIZE, RAG_RESPONSE_CACHE_TTL, RAG_RESPONSE_CACHE_THRESHOLD
+        )
+        # 절차 질문은 검색/LLM 없이 정해진 답변으로 응답 (라우팅 결과는 임계값 조정을 위해 집계)
+        self.faq_router = FaqRouter(min_similarity=RAG_FAQ_MIN_SIMILARITY, high_similarity=RAG_FAQ_HIGH_SIMILARITY)
+        # 첫 메시지로 자주 오는 질문은 인덱스가 바뀔 때마다 답변을 미리 생성
+        self.canned_answers = CannedAnswers(RAG_CANNED_ANSWERS, parse_questions(RAG_CANNED_QUESTIONS))
+        self.index_backend = None
         self.vectorstore = None
+        self.metadata_columns = None
+        self.constraint_extractor = None
+        self.lexical_index = None
+        # 스트리밍 응답의 첫 토큰까지 걸린 시간 (검색 시간 포함)
+        self.first_token_latency = LatencyWindow()
+        self.retrieval_counts = {
+            'vector': 0, 'hybrid': 0, 'lexical_shortcut': 0, 'lexical_fallback': 0,
+            'followup_reuse': 0, 'followup_ordinal': 0, 'followup_merge': 0,
+        }
+        self.ingest_mode = RAG_INGEST_MODE
+        self.metadata_schema = parse_schema(RAG_METADATA_SCHEMA)
+        self.chunk_size = 500 # CSV 데이터에 맞게 청크 사이즈 조정
+        self.chunk_overlap = 50
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500, # CSV 데이터에 맞게 청크 사이즈 조정
-            chunk_overlap=50,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
             length_function=len
         )
         # Gemini LLM 모델 초기화
         self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.7) # 또는 "gemini-1.5-pro", "gemini-1.5-flash"
-        self.initialize_knowledge_base()
+        # LLM 호출은 요청 시간 예산 안에서 재시도하고, 설정 시 느린 호출은 한 번 더 보내(헤징) 먼저 온 응답 사용
+        # 헤징 시점은 호출 종류별 지연 시간으로 정하므로 전체 응답/스트리밍 첫 조각/미리 생성 호출을 따로 집계
+        self.llm_caller = HedgedCaller('rag-llm', RAG_LLM_MAX_RETRIES, RAG_LLM_RETRY_DELAY, RAG_LLM_HEDGE_PERCENTILE)
+        # 헤징에서 진 스트림은 닫아서 남은 토큰 생성을 중단
+        self.stream_caller = HedgedCaller('rag-llm-stream', RAG_LLM_MAX_RETRIES, RAG_LLM_RETRY_DELAY,
+                                          RAG_LLM_HEDGE_PERCENTILE, discard=close_stream)
+        # 미리 생성은 백그라운드 작업이므로 헤징하지 않음
+        self.precompute_caller = HedgedCaller('rag-llm-precompute', RAG_LLM_MAX_RETRIES, RAG_LLM_RETRY_DELAY,
+                                              max_workers=2)
+        # 시간 예산을 넘긴 단계별 요청 수
+        self.deadline_exceeded = {}
+        # 토큰 예산 안에서 프롬프트 구성, 요청마다 프롬프트/응답 토큰 수(로컬 추정치) 기록
+        self.prompt_builder = PromptBuilder(
+            PROMPT_HEADER, PROMPT_GUIDELINES, RAG_PROMPT_TOKEN_BUDGET, RAG_PROMPT_HISTORY_ANSWER_TOKENS
+        )
+        self.token_usage = {'prompt': Histogram(TOKEN_BUCKETS), 'completion': Histogram(TOKEN_BUCKETS)}
+        # 세션별 대화 임베딩 (질문과 관련된 이전 대화를 골라 프롬프트에 포함, 임베딩은 백그라운드에서)
+        self.conversation_memory = ConversationMemory(
+            RAG_MEMORY_SESSIONS if RAG_MEMORY_TURNS > 0 else 0, RAG_MEMORY_MAX_TURNS
+        )
+        # 세션별 직전 검색 결과 (후속 질문은 질의 임베딩/검색 없이 재사용)
+        self.session_retrievals = SessionRetrievalCache(RAG_FOLLOWUP_SESSIONS, RAG_FOLLOWUP_TTL)
+
+        # 인덱스 상태 (building / ready / failed)
+        self.index_state = 'building'
+        self.index_error = None
+        self.index_version = None
+        self.search_index_info = None
+        self.build_started_at = None
+        self.build_duration = None
+        self.build_attempts = 0
+        self.next_build_retry_at = None
+        self.reloading = False
+        self.reload_count = 0
+        self.last_reload_at = None
+
+        if background:
+            # 서버가 먼저 요청을 받을 수 있도록 지식 베이스는 백그라운드 스레드에서 구축
+            threading.Thread(target=self._run_background, args=(watch_interval,), name='rag-index-build', daemon=True).start()
+        else:
+            self._build_knowledge_base()
+            if self.index_state == 'failed':
+                threading.Thread(target=self._build_with_retry, args=(1,), name='rag-index-build', daemon=True).start()
+            if watch_interval > 0:
+                threading.Thread(target=self._watch_data_dir, args=(watch_interval,), name='rag-data-watcher', daemon=True).start()
+
+    def _run_background(self, watch_interval: float):
+        """백그라운드 스레드: 지식 베이스 구축 후 데이터 폴더 감시"""
+        self._build_with_retry()
+        if watch_interval > 0:
+            self._watch_data_dir(watch_interval)
+
+    def _build_with_retry(self, failures: int = 0):
+        """지식 베이스 구축, 실패하면 간격을 두 배씩 늘려 다시 시도 (RAG_BUILD_MAX_ATTEMPTS회까지, 0이면 무제한)"""
+        while True:
+            if failures:
+                if RAG_BUILD_MAX_ATTEMPTS and failures >= RAG_BUILD_MAX_ATTEMPTS:
+                    logger.error(f"지식 베이스 구축을 {failures}회 시도했지만 실패하여 더 이상 시도하지 않습니다.")
+                    return
+                delay = min(RAG_BUILD_RETRY_MAX_DELAY, RAG_BUILD_RETRY_DELAY * 2 ** (failures - 1))
+                self.next_build_retry_at = datetime.now() + timedelta(seconds=delay)
+                logger.warning(f"지식 베이스 구축 {failures}회 실패: {delay:g}초 후 다시 시도합니다.")
+                time.sleep(delay)
+                self.next_build_retry_at = None
+            self._build_knowledge_base()
+            if self.index_state == 'ready':
+                return
+            failures += 1
+
+    def _build_knowledge_base(self):
+        """지식 베이스 로드/구축 후 인덱스 상태 기록"""
+        self.index_state = 'building'
+        self.build_started_at = datetime.now()
+        self.build_attempts += 1
+        started = time.perf_counter()
+        try:
+            self.initialize_knowledge_base()
+            self.index_state = 'ready'
+            self.index_error = None
+        except Exception as e:
+            logger.error(f"지식 베이스 구축 실패: {e}")
+            self.index_error = str(e)
+            self.index_state = 'failed'
+        finally:
+            self.build_duration = time.perf_counter() - started
+        logger.info(f"지식 베이스 상태: {self.index_state} ({self.build_duration:.2f}초)")
+
+    def _data_fingerprint(self):
+        """CSV 파일과 저장된 인덱스 매니페스트의 (이름, 수정 시각, 크기) 목록"""
+        entries = []
+        paths = [os.path.join(RAG_INDEX_DIR, MANIFEST_FILE)]
+        if os.path.isdir("data"):
+            paths += [os.path.join("data", f) for f in sorted(os.listdir("data")) if f.endswith('.csv')]
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                entries.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                continue
+        return tuple(entries)
+
+    def _watch_data_dir(self, interval: float):
+        """data 폴더를 주기적으로 확인하여 변경 시 인덱스를 새로 만들어 교체"""
+        logger.info(f"data 폴더 변경 감시 시작 ({interval}초 간격)")
+        last_fingerprint = self._data_fingerprint()
+        last_backend_retry = time.monotonic()
+        while True:
+            time.sleep(interval)
+            if self.index_state == 'building':
+                continue
+            fingerprint = self._data_fingerprint()
+            if fingerprint != last_fingerprint:
+                logger.info("데이터 변경 감지: 지식 베이스를 다시 불러옵니다.")
+            elif (self.index_backend and self.index_backend != self.embedding_backend
+                  and time.monotonic() - last_backend_retry >= RAG_BACKEND_RETRY_INTERVAL):
+                # 대체 백엔드로 만든 인덱스를 사용 중이면 주기적으로 기본 백엔드 복구를 시도
+                logger.info(f"'{self.index_backend}' 임베딩 인덱스 사용 중: '{self.embedding_backend}' 임베딩으로 다시 구축을 시도합니다.")
+                last_backend_retry = time.monotonic()
+            else:
+                continue
+            self.reload_knowledge_base()
+            last_fingerprint = self._data_fingerprint()
+
+    def reload_knowledge_base(self):
+        """요청 처리를 멈추지 않고 인덱스를 새로 로드/구축하여 교체"""
+        self.reloading = True
+        started = time.perf_counter()
+        try:
+            previous_version = self.index_version
+            self.initialize_knowledge_base()
+            self.index_state = 'ready'
+            self.index_error = None
+            self.reload_count += 1
+            self.last_reload_at = datetime.now()
+            logger.info(
+                f"지식 베이스 교체 완료: {previous_version} -> {self.index_version} "
+                f"({time.perf_counter() - started:.2f}초)"
+            )
+        except Exception as e:
+            # 새 인덱스 구축에 실패하면 기존 인덱스로 계속 서비스
+            logger.error(f"지식 베이스 다시 불러오기 실패 (기존 인덱스 유지): {e}")
+            self.index_error = str(e)
+        finally:
+            self.reloading = False
+
+    def is_ready(self) -> bool:
+        """검색 가능한 인덱스가 준비되었는지 여부"""
+        return self.index_state == 'ready'
+
+    def index_status(self) -> Dict[str, Any]:
+        """인덱스 상태 정보"""
+        vectorstore = self.vectorstore
+        return {
+            'state': self.index_state,
+            'chunks': vectorstore.index.ntotal if vectorstore is not None else 0,
+            'build_started_at': self.build_started_at.isoformat() if self.build_started_at else None,
+            'build_duration_seconds': round(self.build_duration, 3) if self.build_duration is not None else None,
+            'build_attempts': self.build_attempts,
+            'next_retry_at': self.next_build_retry_at.isoformat() if self.next_build_retry_at else None,
+            'version': self.index_version,
+            'ingest_mode': self.ingest_mode,
+            'embedding_backend': self.index_backend,
+            'search_index': self.search_index_info,
+            'metadata_columns': self.metadata_columns.summary() if self.metadata_columns else {},
+            'reloading': self.reloading,
+            'reload_count': self.reload_count,
+            'last_reload_at': self.last_reload_at.isoformat() if self.last_reload_at else None,
+            'error': self.index_error
+        }
 
     def initialize_knowledge_base(self):
         """CSV 파일에서 지식 베이스 초기화"""
+        # 여러 워커가 동시에 같은 인덱스를 만들지 않도록 파일 잠금 (먼저 만든 워커의 결과를 나머지는 로드)
+        with index_build_lock(RAG_INDEX_DIR):
+            vectorstore, manifest = self._load_or_build_index()
+        # 메타데이터 컬럼 배열을 먼저 준비한 뒤 인덱스 참조를 한 번에 교체
+        # (검색 중인 요청은 이전 인덱스를 그대로 사용)
+        self.metadata_columns = MetadataColumns(vectorstore, self.metadata_schema)
+        self.constraint_extractor = ConstraintExtractor(self.metadata_columns)
+        self.lexical_index = BM25Index(vectorstore, [
+            render_document(doc, self.metadata_schema)
+            for doc in position_documents(vectorstore, range(vectorstore.index.ntotal))
+        ])
+        self.vectorstore = vectorstore
+        self.index_version = index_version(manifest) if manifest else None
+        self.index_backend = manifest.get('embedding_backend') if manifest else None
+        self.search_index_info = manifest.get('index') if manifest else None
+        if self.index_version and self.canned_answers.questions:
+            threading.Thread(target=self._precompute_answers, args=(self.index_version,),
+                             name='rag-canned-answers', daemon=True).start()
+
+    def _precompute_answers(self, version: str):
+        """정해진 질문의 답변을 새 인덱스 기준으로 미리 생성"""
+        try:
+            # FAQ 라우터가 먼저 답하는 질문은 미리 생성해도 제공되지 않으므로 LLM 호출 생략
+            questions = [q for q in self.canned_answers.questions if not self._route_faq(q).intents]
+            skipped = len(self.canned_answers.questions) - len(questions)
+            if skipped:
+                logger.info(f"절차 질문으로 정해진 답변을 쓰는 {skipped}개 질문은 미리 생성하지 않습니다.")
+            self.canned_answers.refresh(version, lambda question: self._generate(
+                question, [], Deadline(0), caller=self.precompute_caller
+            ), questions)
+        except Exception as e:
+            logger.error(f"답변 미리 생성 중 오류: {e}")
+
+    def canned_answer(self, user_query: str) -> Optional[str]:
+        """현재 인덱스로 미리 생성해 둔 답변 (없으면 None)"""
+        return self.canned_answers.get(self.index_version, user_query)
+
+    def faq_answer(self, user_query: str) -> Optional[str]:
+        """절차 질문(신청 방법, 준비 서류, 모집 시기, 일자리 유형)이면 정해진 답변 (RAG로 답해야 하면 None)
+
+        후속 질문, 특정 직업을 묻는 질문(BM25 확신도 높음), 조건이 있는 질문은 검색 결과로 답해야 하므로 RAG로 보냅니다.
+        """
+        started = time.perf_counter()
+        decision = self._route_faq(user_query)
+        self.faq_router.record(user_query, decision, time.perf_counter() - started)
+        if not decision.intents:
+            return None
+        logger.info(f"절차 질문 {list(decision.intents)}: 정해진 답변으로 응답 (유사도 {decision.score:.2f})")
+        return self.faq_router.answer(decision.intents)
+
+    def _route_faq(self, user_query: str):
+        """FAQ 라우터 분류 결과 (RAG로 보내야 하면 intents를 비우고 사유 기록)"""
+        decision = self.faq_router.classify(user_query)
+        if decision.intents:
+            reason = self._faq_fallthrough_reason(user_query)
+            if reason is not None:
+                decision = decision._replace(intents=(), reason=reason)
+        return decision
+
+    def _faq_fallthrough_reason(self, user_query: str) -> Optional[str]:
+        """절차 질문으로 분류되었지만 RAG로 보내야 하는 사유 (없으면 None)"""
+        if detect_followup(user_query):
+            return 'followup'
+        vectorstore = self.vectorstore
+        lexical = self.lexical_index
+        if lexical is not None and lexical.vectorstore is vectorstore:
+            # 질문에 직업명이 그대로 들어 있으면(BM25 상위 결과 기준) 그 직업의 정보로 답해야 함
+            lexical_hits, confidence = lexical.search(user_query, 3)
+            title_column = next(iter(self.metadata_schema), None)
+            query_text = "".join(user_query.split())
+            titles = [
+                "".join(str(doc.metadata.get(title_column) or '').split())
+                for doc in position_documents(vectorstore, [position for position, _ in lexical_hits])
+            ]
+            if confidence >= RAG_LEXICAL_SHORTCUT or any(title and title in query_text for title in titles):
+                return 'specific_job'
+        extractor = self.constraint_extractor
+        if extractor is not None and extractor.extract(user_query):
+            return 'constraints'
+        return None
+
+    def _embedder(self, backend: str):
+        """백엔드 이름으로 임베딩 객체 반환 (원격 백엔드는 SQLite 캐시로 감쌈)"""
+        embeddings = self.embedders.get(backend)
+        if embeddings is None:
+            embeddings, model_name = create_embeddings(backend, RAG_LOCAL_EMBEDDING_DIM)
+            if backend != 'local':
+                # 동일한 텍스트는 다시 임베딩하지 않도록 캐시로 감쌈 (인덱싱과 질의 모두 사용)
+                embeddings = CachedEmbeddings(
+                    embeddings, model_name, RAG_EMBEDDING_CACHE,
+                    RAG_EMBEDDING_CACHE_MAX_ROWS, RAG_EMBEDDING_CACHE_MAX_AGE
+                )
+            self.embedders[backend] = embeddings
+        return embeddings
+
+    def _load_or_build_index(self):
+        """저장된 인덱스를 로드하거나 새로 구축하여 (벡터 저장소, 매니페스트) 반환"""
         data_path = "data" # 데이터 폴더 경로
-        all_documents = []
 
         # 데이터 폴더가 없으면 생성
         if not os.path.exists(data_path):
             os.makedirs(data_path)
             logger.warning(f"경고: '{data_path}' 폴더가 없어 생성했습니다. CSV 파일을 넣어주세요.")
-            self.vectorstore = FAISS.from_documents([], self.embeddings)
-            return
+            return FAISS.from_documents([], self._embedder(self.embedding_backend)), None
 
         # 데이터 폴더 내의 모든 CSV 파일 찾기
         csv_files = [f for f in os.listdir(data_path) if f.endswith('.csv')]
 
         if not csv_files:
             logger.warning(f"경고: '{data_path}' 폴더에 CSV 파일이 없습니다. 챗봇이 답변할 정보가 제한될 수 있습니다.")
-            self.vectorstore = FAISS.from_documents([], self.embeddings)
-            return
+            return FAISS.from_documents([], self._embedder(self.embedding_backend)), None
 
-        for csv_file in csv_files:
-            full_csv_path = os.path.join(data_path, csv_file)
-            logger.info(f"{full_csv_path} 파일 로딩 중...")
+        try:
+            return self._load_or_build_with(self.embedding_backend, data_path, csv_files)
+        except Exception as e:
+            fallback = RAG_EMBEDDING_FALLBACK
+            if not fallback or fallback == self.embedding_backend:
+                raise
+            logger.warning(f"'{self.embedding_backend}' 임베딩으로 인덱스를 준비하지 못해 '{fallback}' 임베딩으로 대체합니다: {e}")
+            return self._load_or_build_with(fallback, data_path, csv_files)
 
+    def _load_or_build_with(self, backend: str, data_path: str, csv_files: List[str]):
+        """지정한 임베딩 백엔드로 인덱스를 로드/구축 (매니페스트에 백엔드를 기록하여 질의와 문서 벡터가 섞이지 않게 함)"""
+        embeddings = self._embedder(backend)
+        pipeline = EmbeddingPipeline(
+            embeddings,
+            batch_size=RAG_EMBED_BATCH_SIZE,
+            max_workers=RAG_EMBED_CONCURRENCY,
+            requests_per_minute=RAG_EMBED_RPM,
+            max_retries=RAG_EMBED_MAX_RETRIES
+        )
+
+        # 저장된 인덱스가 현재 CSV/설정과 일치하면 그대로 로드
+        manifest = build_manifest(
+            [os.path.join(data_path, f) for f in csv_files],
+            self.chunk_size, self.chunk_overlap, backend, embeddings.model_name,
+            self.ingest_mode, self.metadata_schema, RAG_INDEX_TYPE, RAG_INDEX_COMPRESSION
+        )
+        saved_manifest = load_manifest(RAG_INDEX_DIR)
+        if files_unchanged(saved_manifest, manifest):
             try:
-                loader = CSVLoader(
-                    file_path=full_csv_path,
-                    # encoding="utf-8",
-                    encoding="euc-kr",
-                    csv_args={
-                        "delimiter": ",",
-                    },
-                    metadata_columns=['직업명'] # CSV 컬럼명에 맞게 설정
-                )
-                documents = loader.load()
-                logger.info(f"{len(documents)}개의 직업 정보 로드 완료. (파일: {csv_file})")
-                all_documents.extend(documents)
+                vectorstore = load_index(RAG_INDEX_DIR, embeddings)
+                apply_search_params(vectorstore.index, saved_manifest.get('index', {}).get('params', {}))
+                logger.info(f"저장된 벡터 인덱스 로드 완료: {RAG_INDEX_DIR} ({vectorstore.index.ntotal}개 벡터)")
+                return vectorstore, saved_manifest
+            except Exception as e:
+                logger.warning(f"저장된 벡터 인덱스 로드 실패, 다시 생성합니다: {type(e).__name__}: {e}")
+                saved_manifest = None
+
+        # 증분 반영이 가능하면 저장된 인덱스를 불러와 변경된 행만 처리
+        vectorstore = None
+        old_rows = None
+        if same_build_config(saved_manifest, manifest):
+            try:
+                vectorstore = load_index(RAG_INDEX_DIR, embeddings)
+                # 증분 반영은 벡터 제거가 가능한 flat 인덱스에서 수행 (HNSW는 remove_ids 미지원)
+                flat_index = exact_index(vectorstore.index)
+                if flat_index is None:
+                    logger.info("저장된 인덱스가 손실 압축(PQ/fp16)되어 원본 벡터를 복원할 수 없으므로 전체를 다시 생성합니다.")
+                    vectorstore = None
+                else:
+                    vectorstore.index = flat_index
+                    old_rows = saved_manifest["rows"]
             except Exception as e:
-                logger.error(f"오류: '{csv_file}' 파일 로딩 중 문제가 발생했습니다: {e}")
-                logger.error(f"파일 경로: {full_csv_path}, 인코딩: utf-8")
-                logger.error("CSV 파일의 형식이나 컬럼명, 인코딩을 확인해주세요.")
-                continue # 다음 파일로 넘어감
+                logger.warning(f"저장된 벡터 인덱스 로드 실패, 전체를 다시 생성합니다: {type(e).__name__}: {e}")
+                vectorstore = None
 
-        if not all_documents:
+        # CSV 행을 한 줄씩 읽어 고정 크기 배치로 임베딩 (전체 문서를 메모리에 올리지 않음)
+        # 읽다가 실패한 파일은 {파일명: 오류}로 기록 (그 파일의 기존 행은 삭제하지 않음)
+        failed_files: Dict[str, str] = {}
+        documents = iter_data_documents(data_path, csv_files, self.metadata_schema, failed_files)
+        try:
+            vectorstore, rows = self._index_documents(documents, vectorstore, old_rows, pipeline, failed_files)
+        except Exception as e:
+            if old_rows is None:
+                raise
+            logger.warning(f"벡터 인덱스 증분 반영 실패, 전체를 다시 생성합니다: {e}")
+            failed_files = {}
+            documents = iter_data_documents(data_path, csv_files, self.metadata_schema, failed_files)
+            vectorstore, rows = self._index_documents(documents, None, None, pipeline, failed_files)
+
+        if vectorstore is None:
             logger.error("모든 CSV 파일에서 문서를 로드하지 못했습니다. RAG 시스템을 구축할 수 없습니다.")
-            self.vectorstore = FAISS.from_documents([], self.embeddings)
-            return
+            return FAISS.from_documents([], embeddings), None
+
+        manifest["rows"] = rows
+        # 읽지 못한 파일은 해시를 비워 두어 다음 구축(재시작/다시 불러오기) 때 다시 읽도록 함
+        for name in failed_files:
+            manifest["files"][name] = None
+        # 임베딩이 끝난 정확(flat) 인덱스로부터 말뭉치 크기에 맞는 검색 인덱스를 구성하고 파라미터 조정
+        index_type = choose_index_type(RAG_INDEX_TYPE, vectorstore.index.ntotal, RAG_INDEX_FLAT_MAX, RAG_INDEX_COMPRESSION)
+        vectorstore.index, manifest["index"] = build_search_index(
+            vectorstore.index, index_type, RAG_INDEX_COMPRESSION, RAG_INDEX_TARGET_RECALL,
+            k=3 * max(1, RAG_FUSION_FETCH_FACTOR)
+        )
+
+        try:
+            save_index(vectorstore, RAG_INDEX_DIR, manifest)
+            logger.info(f"벡터 인덱스 저장 완료: {RAG_INDEX_DIR}")
+        except Exception as e:
+            logger.error(f"벡터 인덱스 저장 중 오류: {e}")
+
+        return vectorstore, manifest
+
+    def _index_documents(self, documents: Iterable[Document], vectorstore: Optional[FAISS],
+                         old_rows: Optional[Dict[str, Dict]], pipeline: EmbeddingPipeline,
+                         failed_files: Optional[Dict[str, str]] = None):
+        """CSV 행을 스트리밍하며 배치 단위로 임베딩하여 인덱스에 반영
+
+        old_rows(저장된 행 매니페스트)가 있으면 내용이 그대로인 행은 건너뛰고,
+        변경/삭제된 행의 기존 벡터만 제거합니다. failed_files(documents를 다 읽은 뒤 채워진
+        읽기 실패 파일)의 행은 읽지 못했을 뿐이므로 기존 벡터와 매니페스트 항목을 그대로 둡니다.
+        """
+        started = time.perf_counter()
+        old_rows = old_rows or {}
+        rows = {}
+        pending_keys = []
+        pending_chunks = []
+        embedded = 0
+
+        for doc in documents:
+            # 행 키: 파일명 + 직업명 (같은 직업명이 여러 번 나오면 순번을 붙임)
+            base_key = row_key(doc)
+            key = base_key
+            n = 1
+            while key in rows:
+                n += 1
+                key = f"{base_key}#{n}"
+
+            # row 모드는 짧은 행을 나누지 않고 그대로 벡터 하나로 사용
+            chunks = [doc] if self.ingest_mode == 'row' else self.text_splitter.split_documents([doc])
+            rows[key] = {
+                "hash": text_sha256(render_document(doc, self.metadata_schema)),
+                "ids": [f"{key}/{i}" for i in range(len(chunks))],
+            }
+            if key in old_rows and old_rows[key]["hash"] == rows[key]["hash"]:
+                continue
+
+            pending_keys.append(key)
+            pending_chunks.extend(chunks)
+            if len(pending_chunks) >= RAG_INGEST_BATCH_SIZE:
+                vectorstore = self._embed_rows(vectorstore, pending_keys, pending_chunks, rows, old_rows, pipeline)
+                embedded += len(pending_chunks)
+                pending_keys, pending_chunks = [], []
+
+        if pending_chunks:
+            vectorstore = self._embed_rows(vectorstore, pending_keys, pending_chunks, rows, old_rows, pipeline)
+            embedded += len(pending_chunks)
 
-        logger.info(f"총 {len(all_documents)}개의 통합 문서 생성 완료.")
+        kept = [key for key in old_rows if key not in rows and row_file(key) in (failed_files or {})]
+        if kept:
+            logger.warning(
+                f"읽기에 실패한 파일({', '.join(sorted(failed_files))})의 기존 {len(kept)}행은 삭제하지 않고 유지합니다."
+            )
+            for key in kept:
+                rows[key] = old_rows[key]
+        removed_ids = [chunk_id for key in old_rows if key not in rows for chunk_id in old_rows[key]["ids"]]
+        if removed_ids:
+            vectorstore.delete(removed_ids)
 
-        # 문서 분할
-        splits = self.text_splitter.split_documents(all_documents)
+        elapsed = time.perf_counter() - started
+        throughput = f"{embedded}개 청크 임베딩, {elapsed:.2f}초, {embedded / elapsed if elapsed > 0 else 0:.1f} chunks/s"
+        if old_rows:
+            added, changed, removed = diff_rows(old_rows, rows)
+            logger.info(
+                f"벡터 인덱스 증분 반영 완료: 추가 {len(added)}행, 변경 {len(changed)}행, 삭제 {len(removed)}행 "
+                f"({throughput}, 총 {vectorstore.index.ntotal}개 벡터)"
+            )
+        elif vectorstore is not None:
+            logger.info(f"총 {len(rows)}개의 통합 문서 생성 완료.")
+            logger.info(f"RAG 시스템 초기화 완료: {vectorstore.index.ntotal}개 문서 청크 생성 ({throughput})")
+        return vectorstore, rows
 
-        # 벡터 저장소 생성
-        self.vectorstore = FAISS.from_documents(splits, self.embeddings)
+    def _embed_rows(self, vectorstore: Optional[FAISS], keys: List[str], chunks: List[Document],
+                    rows: Dict[str, Dict], old_rows: Dict[str, Dict], pipeline: EmbeddingPipeline) -> FAISS:
+        """배치 하나를 임베딩하여 인덱스에 추가 (변경된 행의 기존 벡터는 먼저 제거)"""
+        stale_ids = [chunk_id for key in keys if key in old_rows for chunk_id in old_rows[key]["ids"]]
+        if stale_ids:
+            vectorstore.delete(stale_ids)
 
-        logger.info(f"RAG 시스템 초기화 완료: {len(splits)}개 문서 청크 생성")
+        texts = [doc.page_content for doc in chunks]
+        ids = [chunk_id for key in keys for chunk_id in rows[key]["ids"]]
+        # row 모드는 메타데이터 컬럼(직업명 등)까지 포함한 한 줄 표현을 임베딩
+        if self.ingest_mode == 'row':
+            vectors = pipeline.embed([render_document(doc, self.metadata_schema) for doc in chunks])
+        else:
+            vectors = pipeline.embed(texts)
+        if vectorstore is None:
+            return FAISS.from_embeddings(
+                zip(texts, vectors), pipeline.embeddings,
+                metadatas=[doc.metadata for doc in chunks], ids=ids
+            )
+        vectorstore.add_embeddings(zip(texts, vectors), metadatas=[doc.metadata for doc in chunks], ids=ids)
+        return vectorstore
 
     def search_relevant_info(self, query: str, k: int = 3) -> List[str]:
         """관련 정보 검색"""
-        if not self.vectorstore:
+        # 검색 도중 인덱스가 교체되어도 같은 인덱스를 끝까지 사용하도록 참조를 한 번만 읽음
+        vectorstore = self.vectorstore
+        hits, _ = self._search_hits(vectorstore, query, k)
+        docs = position_documents(vectorstore, [position for position, _ in hits])
+        # 검색된 문서의 메타데이터도 포함하여 반환 (프롬프트에서 활용 가능)
+        return [render_document(doc, self.metadata_schema) for doc in docs]
+
+    def _search_hits(self, vectorstore, query: str, k: int, deadline: Optional[Deadline] = None):
+        """관련 문서의 (벡터 위치, 점수) 목록과 질의 벡터 검색 (질의를 임베딩하지 않았으면 벡터는 None)"""
+        if not vectorstore:
             logger.warning("벡터 저장소가 초기화되지 않았습니다. 관련 정보를 검색할 수 없습니다.")
-            return []
+            return [], None
+        # 질문에서 추출한 조건(예: '다리 아파' -> 신체활동수준 낮음)에 맞는 행만 대상으로 검색
+        mask = self._constraint_mask(vectorstore, query)
+        return self._retrieve(vectorstore, query, k, mask, deadline)
 
-        # 유사도 검색
-        docs = self.vectorstore.similarity_search(query, k=k)
-        # 검색된 문서의 메타데이터도 포함하여 반환 (프롬프트에서 활용 가능)
-        return [f"직업명: {doc.metadata.get('직업명', '알 수 없음')}, 신체활동수준: {doc.metadata.get('신체활동수준', '알 수 없음')}, 업무내용: {doc.page_content}" for doc in docs]
+    def _constraint_mask(self, vectorstore, query: str):
+        """질문에서 추출한 메타데이터 조건의 위치 마스크 (조건이 없거나 적용할 수 없으면 None)"""
+        extractor = self.constraint_extractor
+        if extractor is None or extractor.columns.vectorstore is not vectorstore:
+            return None
+        constraints = extractor.extract(query)
+        if not constraints:
+            return None
+        mask = extractor.columns.mask(constraints)
+        matched = int(mask.sum())
+        logger.info(f"검색 조건 적용: {constraints} ({matched}/{mask.size}개 대상)")
+        # 조건에 맞는 행이 없거나 전체이면 일반 검색
+        if matched == 0 or matched == mask.size:
+            return None
+        return mask
 
-    def generate_response(self, user_query: str, conversation_history: List[Dict]) -> str:
-        """RAG 기반 응답 생성"""
+    def _retrieve(self, vectorstore, query: str, k: int, mask,
+                  deadline: Optional[Deadline] = None) -> Tuple[List[Tuple[int, float]], Optional[List[float]]]:
+        """BM25와 벡터 검색을 RRF로 결합하여 상위 k개 (벡터 위치, 점수) 목록과 질의 벡터 반환
+
+        점수는 검색 방식에 따라 BM25 점수, 벡터 거리 또는 RRF 점수입니다.
+        BM25 결과의 확신도가 충분히 높으면(정확한 직업명 등) 질의 임베딩을 생략하며, 이때 질의 벡터는 None입니다.
+        """
+        fetch_k = k * max(1, RAG_FUSION_FETCH_FACTOR)
+        lexical = self.lexical_index
+        lexical_hits = []
+        if lexical is not None and lexical.vectorstore is vectorstore:
+            lexical_hits, confidence = lexical.search(query, fetch_k, mask)
+            if lexical_hits and confidence >= RAG_LEXICAL_SHORTCUT:
+                self.retrieval_counts['lexical_shortcut'] += 1
+                logger.info(f"BM25 결과 확신도 {confidence:.2f}: 질의 임베딩 없이 검색 결과 사용")
+                return lexical_hits[:k], None
+
+        # 질의는 인덱스를 만든 것과 같은 임베딩 백엔드로 임베딩 (동시 요청과 함께 배치로 처리, 남은 시간 예산만큼만 대기)
         try:
-            # 관련 정보 검색
-            relevant_info_list = self.search_relevant_info(user_query)
-            context = "\n\n".join(relevant_info_list)
-
-            # 대화 기록 구성
-            history_text = ""
-            for msg in conversation_history[-3:]:  # 최근 3개 대화만 사용
-                history_text += f"사용자: {msg.get('user_message', '')}\n"
-                history_text += f"챗봇: {msg.get('bot_response', '')}\n"
-
-            # 프롬프트 구성
-            prompt = f"""
-            당신은 노인 일자리 상담 전문가입니다. 친절하고 정확한 정보를 제공해주세요.
-            
-            관련 정보 (CSV 파일에서 검색된 내용):
-            {context}
-            
-            이전 대화:
-            {history_text}
-            
-            사용자 질문: {user_query}
-            
-            위 정보를 바탕으로 사용자의 질문에 친절하고 정확하게 답변해주세요.
-            특히 사용자가 '다리 아파'와 같이 신체적 부담을 언급하며 직업을 추천해달라고 할 경우,
-            제공된 '관련 정보'에서 '신체활동수준'이 '낮음'이거나, '업무내용'을 보았을 때 주로 앉아서 하거나
-            신체적 움직임이 적은 직업들을 우선적으로 추천해주세요.
-            추천할 직업이 여러 개라면 2~3가지 정도를 예시로 들어 설명해주세요.
-            만약 주어진 '관련 정보'에서 답을 찾을 수 없다면, 모른다고 답하고 추가 정보를 요청하거나, 다른 질문을 하도록 안내해주세요.
-            불필요한 정보를 추가하지 마세요. 답변은 한국어로 제공해주세요. 이모지를 적절히 사용하여 친근감 표현해주세요.
-            """
+            timeout = deadline.remaining() if deadline is not None else None
+            vector_hits, query_vector = self.retrieval_batcher.search(vectorstore, query, fetch_k, mask, timeout)
+        except Exception as e:
+            if not lexical_hits:
+                raise
+            self.retrieval_counts['lexical_fallback'] += 1
+            logger.warning(f"질의 임베딩 실패, BM25 결과만 사용합니다: {e}")
+            return lexical_hits[:k], None
+
+        if not lexical_hits:
+            self.retrieval_counts['vector'] += 1
+            return vector_hits[:k], query_vector
+
+        self.retrieval_counts['hybrid'] += 1
+        return reciprocal_rank_fusion([vector_hits, lexical_hits])[:k], query_vector
+
+    def _followup_hits(self, vectorstore, user_query: str, session_id: str,
+                       conversation_history: List[Dict]) -> Optional[List[Tuple[int, float]]]:
+        """직전 답변을 가리키는 후속 질문이면 세션의 직전 검색 결과를 재사용 (다시 검색해야 하면 None)
+
+        - '두 번째 거는요?': 직전 답변에서 두 번째로 안내한 직업을 맨 앞으로
+        - '그중 앉아서 하는 건?': 질문의 조건에 맞는 직전 결과만 (맞는 것이 없으면 다시 검색)
+        - '그거 더 자세히': 직전 결과 그대로
+        질문에 직전 결과에 없는 직업명이 있으면(BM25 확신도 높음) 새 질문으로 보고 다시 검색합니다.
+        """
+        followup = detect_followup(user_query)
+        if followup is None or not conversation_history:
+            return None
+        previous = self.session_retrievals.get(session_id, self.index_version)
+        if previous is None:
+            return None
+        lexical = self.lexical_index
+        if lexical is not None and lexical.vectorstore is vectorstore:
+            lexical_hits, confidence = lexical.search(user_query, 2)
+            if lexical_hits and confidence >= RAG_LEXICAL_SHORTCUT and lexical_hits[0][0] not in previous.positions:
+                return None
+        hits = list(zip(previous.positions, previous.scores))
+
+        if followup.kind == 'ordinal':
+            title_column = next(iter(self.metadata_schema), None)
+            titles = [str(doc.metadata.get(title_column) or '') for doc in position_documents(vectorstore, previous.positions)]
+            if len(titles) != len(hits):
+                return None
+            chosen = pick_ordinal(titles, conversation_history[-1].get('bot_response', ''), followup.ordinal)
+            if chosen is None:
+                return None
+            self.retrieval_counts['followup_ordinal'] += 1
+            logger.info(f"후속 질문({followup.ordinal}번째): 직전 검색 결과의 '{titles[chosen]}' 사용")
+            return [hits[chosen]] + hits[:chosen] + hits[chosen + 1:]
+
+        mask = self._constraint_mask(vectorstore, user_query)
+        if mask is not None:
+            hits = [hit for hit in hits if mask[hit[0]]]
+            if not hits:
+                return None
+            self.retrieval_counts['followup_merge'] += 1
+            logger.info(f"후속 질문: 직전 검색 결과 중 조건에 맞는 {len(hits)}개 사용")
+            return hits
+
+        self.retrieval_counts['followup_reuse'] += 1
+        logger.info(f"후속 질문: 직전 검색 결과 {len(hits)}개 재사용 (질의 임베딩 생략)")
+        return hits
+
+    def memory_last_id(self, session_id: str) -> Optional[int]:
+        """세션 메모리에 반영된 마지막 대화 id (관련 대화 검색을 쓰지 않으면 None)"""
+        vectorstore = self.vectorstore
+        if not vectorstore or not self.conversation_memory.enabled:
+            return None
+        return self.conversation_memory.last_id(session_id, vectorstore.embedding_function)
+
+    def schedule_memory(self, session_id: str) -> None:
+        """세션의 새 대화를 세션 메모리에 임베딩하도록 예약 (백그라운드에서 처리)"""
+        vectorstore = self.vectorstore
+        if vectorstore and self.conversation_memory.enabled:
+            self.conversation_memory.schedule(session_id, vectorstore.embedding_function)
+
+    def _recall_turns(self, vectorstore, session_id: str, query_vector: List[float],
+                      conversation_history: List[Dict]) -> List[Dict]:
+        """검색에 쓴 질의 벡터로 세션 메모리에서 질문과 관련된 이전 대화를 골라 최근 대화와 합침 (id 순)"""
+        exclude = {msg['id'] for msg in conversation_history if 'id' in msg}
+        hits = self.conversation_memory.recall(
+            session_id, vectorstore.embedding_function, query_vector,
+            RAG_MEMORY_TURNS, RAG_MEMORY_MIN_SIMILARITY, exclude
+        )
+        if not hits:
+            return conversation_history
+        recalled = [{'id': turn_id, 'user_message': user, 'bot_response': bot} for (turn_id, user, bot), _ in hits]
+        return sorted(conversation_history + recalled, key=lambda msg: msg['id'])
+
+    def _response_cache_key(self, vectorstore, query_vector: Optional[List[float]], positions: List[int],
+                            history: List[Dict], summary: str):
+        """응답 캐시 키 (질의 임베딩, 문서 ID 집합), 캐시를 쓸 수 없으면 None
 
-            # LangChain ChatGoogleGenerativeAI 모델 호출
-            response = self.llm.invoke(prompt) # invoke() 메서드 사용 (LangChain 0.1.0 이후 권장)
+        키에는 검색에 쓴 질의 벡터를 그대로 사용하므로 임베딩을 다시 호출하지 않습니다.
+        BM25 결과만으로 검색해 질의 벡터가 없으면 캐시하지 않고, 이전 대화나 세션 요약이 프롬프트에 들어가면
+        답변이 세션의 맥락에 따라 달라지므로 다른 세션에 같은 답변을 주지 않도록 캐시하지 않습니다.
+        """
+        if not vectorstore or not positions or self.response_cache.max_size <= 0:
+            return None
+        if query_vector is None or history or summary.strip():
+            return None
+        doc_ids = frozenset(vectorstore.index_to_docstore_id[position] for position in positions)
+        return unit_vector(query_vector), doc_ids
 
-            return response.content # 응답 객체에서 content 속성 사용
+    def generate_response(self, user_query: str, conversation_history: List[Dict],
+                          deadline: Optional[Deadline] = None, summary: str = '', session_id: str = '') -> str:
+        """RAG 기반 응답 생성
 
+        conversation_history: 최근 대화(오래된 순), summary: 그 이전 대화의 세션 요약,
+        deadline: 요청 시작 시 만든 시간 예산 (없으면 지금부터 RAG_REQUEST_BUDGET초),
+        session_id: 후속 질문에 직전 검색 결과를 재사용할 세션 (빈 값이면 항상 검색)
+        """
+        try:
+            return self._generate(
+                user_query, conversation_history, deadline or Deadline(RAG_REQUEST_BUDGET), summary, session_id
+            )
+        except DeadlineExceeded as e:
+            return self._timed_out(e)
+        except Exception as e:
+            logger.error(f"응답 생성 중 오류: {e}")
+            return ERROR_RESPONSE
+
+    async def agenerate_response(self, user_query: str, conversation_history: List[Dict],
+                                 deadline: Optional[Deadline] = None, summary: str = '',
+                                 session_id: str = '') -> str:
+        """RAG 기반 응답 생성 (비동기: LLM 응답을 기다리는 동안 이벤트 루프를 막지 않음)"""
+        deadline = deadline or Deadline(RAG_REQUEST_BUDGET)
+        try:
+            # 검색(로컬 연산과 임베딩 호출)은 스레드에서, LLM 호출은 비동기 API로 수행
+            cached, prompt, cache_state = await asyncio.to_thread(
+                self._prepare, user_query, conversation_history, deadline, summary, session_id
+            )
+            if cached is not None:
+                return cached
+            response = await self.llm_caller.acall(lambda: self.llm.ainvoke(prompt), deadline)
+            return self._finish(user_query, cache_state, response.content)
+        except DeadlineExceeded as e:
+            return self._timed_out(e)
         except Exception as e:
             logger.error(f"응답 생성 중 오류: {e}")
-            return "죄송합니다. 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
+            return ERROR_RESPONSE
+
+    def stream_response(self, user_query: str, conversation_history: List[Dict],
+                        deadline: Optional[Deadline] = None, summary: str = '',
+                        session_id: str = '') -> Iterator[str]:
+        """RAG 기반 응답을 토큰 단위로 생성 (LLM 스트리밍, 시간 예산은 첫 토큰까지 적용)"""
+        deadline = deadline or Deadline(RAG_REQUEST_BUDGET)
+        started = time.perf_counter()
+        parts = []
+        cache_state = None
+        try:
+            cached, prompt, cache_state = self._prepare(user_query, conversation_history, deadline, summary, session_id)
+            if cached is not None:
+                self._record_first_token(started)
+                yield cached
+                return
+            # 첫 토큰이 올 때까지를 재시도/헤징 대상으로 하고, 이후에는 먼저 응답한 스트림을 이어서 읽음
+            chunks, first = self.stream_caller.call(lambda: first_chunk(self.llm.stream(prompt)), deadline)
+            if first is not None:
+                self._record_first_token(started)
+                parts.append(first)
+                yield first
+            for chunk in chunks:
+                if not chunk.content:
+                    continue
+                parts.append(chunk.content)
+                yield chunk.content
+            self._finish(user_query, cache_state, "".join(parts))
+        except GeneratorExit:
+            # 클라이언트 연결이 끊겨 스트리밍이 중단되어도 그때까지 생성된 응답의 토큰 수 기록
+            if parts:
+                self._record_tokens(cache_state, "".join(parts))
+            raise
+        except DeadlineExceeded as e:
+            yield self._timed_out(e)
+        except Exception as e:
+            logger.error(f"응답 스트리밍 중 오류: {e}")
+            if not parts:
+                yield ERROR_RESPONSE
+
+    async def astream_response(self, user_query: str, conversation_history: List[Dict],
+                               deadline: Optional[Deadline] = None, summary: str = '',
+                               session_id: str = '') -> AsyncIterator[str]:
+        """RAG 기반 응답을 토큰 단위로 생성 (비동기 LLM 스트리밍, 시간 예산은 첫 토큰까지 적용)"""
+        deadline = deadline or Deadline(RAG_REQUEST_BUDGET)
+        started = time.perf_counter()
+        parts = []
+        cache_state = None
+        try:
+            cached, prompt, cache_state = await asyncio.to_thread(
+                self._prepare, user_query, conversation_history, deadline, summary, session_id
+            )
+            if cached is not None:
+                self._record_first_token(started)
+                yield cached
+                return
+            chunks, first = await self.stream_caller.acall(lambda: afirst_chunk(self.llm.astream(prompt)), deadline)
+            if first is not None:
+                self._record_first_token(started)
+                parts.append(first)
+                yield first
+            async for chunk in chunks:
+                if not chunk.content:
+                    continue
+                parts.append(chunk.content)
+                yield chunk.content
+            self._finish(user_query, cache_state, "".join(parts))
+        except GeneratorExit:
+            # 클라이언트 연결이 끊겨 스트리밍이 중단되어도 그때까지 생성된 응답의 토큰 수 기록
+            if parts:
+                self._record_tokens(cache_state, "".join(parts))
+            raise
+        except DeadlineExceeded as e:
+            yield self._timed_out(e)
+        except Exception as e:
+            logger.error(f"응답 스트리밍 중 오류: {e}")
+            if not parts:
+                yield ERROR_RESPONSE
+
+    def _record_first_token(self, started: float):
+        """첫 토큰까지 걸린 시간(TTFT) 기록"""
+        elapsed = time.perf_counter() - started
+        self.first_token_latency.add(elapsed)
+        logger.info(f"첫 토큰 응답 시간(TTFT): {elapsed * 1000:.0f}ms")
+
+    def _record_tokens(self, cache_state, completion: str):
+        """LLM 호출 한 건의 프롬프트/응답 토큰 수 기록 (Gemini 응답에 사용량이 없어 로컬 추정치 사용)"""
+        if cache_state is None:
+            return
+        prompt_tokens = cache_state[2]
+        completion_tokens = estimate_tokens(completion)
+        self.token_usage['prompt'].add(prompt_tokens)
+        self.token_usage['completion'].add(completion_tokens)
+        logger.info(f"토큰 수(추정): 프롬프트 {prompt_tokens}, 응답 {completion_tokens}")
+
+    def _timed_out(self, error: DeadlineExceeded) -> str:
+        """시간 예산 초과를 단계별로 집계하고 안내 문구 반환"""
+        self.deadline_exceeded[error.stage] = self.deadline_exceeded.get(error.stage, 0) + 1
+        logger.warning(f"응답 생성 시간 초과: {error}")
+        return TIMEOUT_RESPONSE
+
+    def _generate(self, user_query: str, conversation_history: List[Dict], deadline: Deadline,
+                  summary: str = '', session_id: str = '', caller: Optional[HedgedCaller] = None) -> str:
+        """검색 후 LLM으로 응답 생성 (오류는 호출한 쪽으로 전달)"""
+        cached, prompt, cache_state = self._prepare(user_query, conversation_history, deadline, summary, session_id)
+        if cached is not None:
+            return cached
+        # LangChain ChatGoogleGenerativeAI 모델 호출 (invoke() 메서드 사용, LangChain 0.1.0 이후 권장)
+        response = (caller or self.llm_caller).call(lambda: self.llm.invoke(prompt), deadline)
+        return self._finish(user_query, cache_state, response.content)
+
+    def _finish(self, user_query: str, cache_state, content: str) -> str:
+        """LLM 응답의 토큰 수를 기록하고 응답 캐시에 저장하여 반환"""
+        index_version, cache_key, _ = cache_state
+        self._record_tokens(cache_state, content)
+        if cache_key is not None and content:
+            self.response_cache.store(index_version, user_query, *cache_key, content)
+        return content # 응답 객체에서 content 속성 사용
+
+    def _prepare(self, user_query: str, conversation_history: List[Dict], deadline: Deadline, summary: str = '',
+                 session_id: str = ''):
+        """관련 정보를 검색하여 (캐시된 답변, 프롬프트, 응답 캐시 상태) 반환 (캐시 적중 시 프롬프트는 None)"""
+        deadline.check("대화 기록 조회")
+        # 관련 정보 검색 (직전 답변에 대한 후속 질문이면 세션의 직전 검색 결과 재사용)
+        vectorstore = self.vectorstore
+        index_version = self.index_version
+        hits = self._followup_hits(vectorstore, user_query, session_id, conversation_history) if session_id else None
+        query_vector = None
+        if hits is None:
+            hits, query_vector = self._search_hits(vectorstore, user_query, 3, deadline)
+            if vectorstore and session_id:
+                doc_ids = [vectorstore.index_to_docstore_id[position] for position, _ in hits]
+                self.session_retrievals.store(session_id, index_version, hits, doc_ids, user_query)
+        positions = [position for position, _ in hits]
+        recent_history = conversation_history
+        if query_vector is not None and session_id and conversation_history and self.conversation_memory.enabled:
+            # 최근 대화에 더해 질문과 관련된 이전 대화 포함 (검색에 쓴 질의 벡터를 재사용하므로 원격 호출 없음)
+            recent_history = self._recall_turns(vectorstore, session_id, query_vector, conversation_history)
+
+        # 같은 문서로 답하는 비슷한 질문이 캐시에 있으면 LLM 호출 없이 반환
+        # (후속 질문은 검색 결과를 재사용해 질의 벡터가 없고 대화 맥락에 의존하므로 캐시하지 않음)
+        cache_key = self._response_cache_key(vectorstore, query_vector, positions, recent_history, summary)
+        deadline.check("검색")
+        if cache_key is not None:
+            cached = self.response_cache.lookup(index_version, *cache_key)
+            if cached is not None:
+                return cached.answer, None, (index_version, None, 0)
+
+        # 검색 순위순 행과 이전 대화를 토큰 예산에 맞춰 프롬프트 구성 (예산을 넘으면 가치가 낮은 것부터 제외)
+        relevant_info_list = [
+            render_document(doc, self.metadata_schema) for doc in position_documents(vectorstore, positions)
+        ]
+        built = self.prompt_builder.build(user_query, relevant_info_list, [
+            (msg.get('user_message', ''), msg.get('bot_response', '')) for msg in recent_history
+        ], summary)
+        if built.dropped_rows or built.dropped_turns:
+            logger.info(
+                f"프롬프트 토큰 예산({self.prompt_builder.budget}) 초과: 검색 결과 {built.dropped_rows}개, "
+                f"이전 대화 {built.dropped_turns}개 제외"
+            )
+        return None, built.text, (index_version, cache_key, built.tokens)
+
+def first_chunk(chunks):
+    """LLM 스트림에서 내용이 있는 첫 조각까지 읽어 (스트림, 첫 조각 내용) 반환 (내용이 없으면 None)"""
+    try:
+        for chunk in chunks:
+            if chunk.content:
+                return chunks, chunk.content
+    except BaseException:
+        chunks.close()
+        raise
+    return chunks, None
+
+async def afirst_chunk(chunks):
+    """비동기 LLM 스트림에서 내용이 있는 첫 조각까지 읽어 (스트림, 첫 조각 내용) 반환"""
+    try:
+        async for chunk in chunks:
+            if chunk.content:
+                return chunks, chunk.content
+    except BaseException:
+        # 헤징에서 져서 취소된 경우 포함
+        await chunks.aclose()
+        raise
+    return chunks, None
+
+def close_stream(result):
+    """사용하지 않을 first_chunk/afirst_chunk 결과의 스트림 닫기"""
+    chunks, _ = result
+    if hasattr(chunks, 'aclose'):
+        asyncio.get_running_loop().create_task(chunks.aclose())
+    else:
+        chunks.close()
 
 # RAG 시스템 인스턴스 생성
-rag_system = SeniorJobRAG()
+rag_system = SeniorJobRAG(background=True, watch_interval=RAG_RELOAD_INTERVAL)
+# 답변 생성 동시 실행 제한 (Gemini 요청 한도와 워커를 요청 폭주나 한 세션이 독차지하지 않도록)
+llm_admission = AdmissionController(
+    RAG_MAX_CONCURRENT, RAG_ADMISSION_QUEUE_SIZE, RAG_ADMISSION_MAX_WAIT,
+    RAG_ADMISSION_SESSION_QUEUE, RAG_ADMISSION_SLOT_DIR
+)
+
+def not_ready_payload() -> Dict[str, Any]:
+    """인덱스 준비 중/구축 실패 응답 본문 (503, Retry-After와 함께 반환)"""
+    index_status = rag_system.index_status()
+    if index_status['state'] == 'failed':
+        error = '상담 정보를 준비하지 못했습니다. 다시 준비하고 있으니 잠시 후 다시 시도해주세요.'
+        if index_status['next_retry_at'] is None:
+            error = '상담 정보를 준비하지 못했습니다. 관리자에게 문의해주세요.'
+    else:
+        error = '상담 정보를 준비하고 있습니다. 잠시 후 다시 시도해주세요.'
+    return {
+        'error': error,
+        'state': index_status['state'],
+        'reason': index_status['error'],
+        'index': index_status
+    }
+
+def overloaded_payload(error: Overloaded) -> Dict[str, Any]:
+    """요청이 몰려 거절할 때 응답 본문 (429, Retry-After와 함께 반환)"""
+    return {
+        'error': '지금 상담 요청이 많아 잠시 기다려야 합니다. 조금 후에 다시 질문해주세요.',
+        'retry_after': error.retry_after
+    }
+
+def sse_event(payload: Dict[str, Any], event: Optional[str] = None) -> str:
+    """SSE(Server-Sent Events) 메시지 한 건"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+# SSE 응답 헤더 (프록시 버퍼링 없이 바로 전달)
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def load_session_context(session_id: str) -> Tuple[List[Dict], str]:
+    """프롬프트에 넣을 최근 대화(오래된 순)와 세션 요약 조회 (앱 컨텍스트 안에서 호출)
+
+    최근 RAG_HISTORY_TURNS개 대화와, 그 이전 대화 중 아직 요약에 반영되지 않은 대화
+    (최대 RAG_SUMMARY_EVERY_TURNS개)를 함께 넣습니다.
+    질문과 관련된 이전 대화는 검색 후 세션 메모리에서 골라 추가합니다 (SeniorJobRAG._prepare).
+    """
+    unsummarized_turns = RAG_SUMMARY_EVERY_TURNS if session_summarizer.enabled else 0
+    recent_conversations = db.session.execute(
+        db.select(Conversation).filter_by(session_id=session_id)
+        .order_by(Conversation.id.desc()).limit(RAG_HISTORY_TURNS + unsummarized_turns)
+    ).scalars().all()
+    session_summary = db.session.get(SessionSummary, session_id)
+    summary, summarized_id = (session_summary.summary, session_summary.last_conversation_id) if session_summary else ('', 0)
+    recent_conversations = [
+        conv for i, conv in enumerate(recent_conversations) if i < RAG_HISTORY_TURNS or conv.id > summarized_id
+    ]
+    # 최신순으로 조회했으므로 프롬프트에는 오래된 순으로 뒤집어 전달
+    history = [conv.to_dict() for conv in reversed(recent_conversations)]
+
+    # 세션 메모리에 없는 세션(재시작했거나 다른 워커가 처리하던 세션)이면 이전 대화 임베딩을 백그라운드에서 채움
+    last_id = rag_system.memory_last_id(session_id) if history else None
+    if last_id is not None and last_id < history[-1]['id']:
+        rag_system.schedule_memory(session_id)
+    return history, summary
+
+def load_memory_turns(session_id: str, after_id: int) -> List[Tuple[int, str, str]]:
+    """세션 메모리에 아직 없는 대화 목록(오래된 순, 처음 보는 세션이면 최근 RAG_MEMORY_MAX_TURNS개)"""
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(Conversation.id, Conversation.user_message, Conversation.bot_response)
+            .filter(Conversation.session_id == session_id, Conversation.id > after_id)
+            .order_by(Conversation.id.desc()).limit(RAG_MEMORY_MAX_TURNS)
+        ).all()
+        return [tuple(row) for row in reversed(rows)]
+
+# 세션 메모리는 백그라운드 스레드에서 DB의 새 대화를 읽어 임베딩
+rag_system.conversation_memory.load = load_memory_turns
+
+def save_conversation(session_id: str, user_message: str, bot_response: str, user_agent: str):
+    """대화 기록 저장 후 세션 요약 갱신과 세션 메모리 임베딩 예약 (앱 컨텍스트 안에서 호출)"""
+    conversation = Conversation(
+        session_id=session_id,
+        user_message=user_message,
+        bot_response=bot_response,
+        user_agent=user_agent
+    )
+    db.session.add(conversation)
+    db.session.commit()
+    session_summarizer.schedule(session_id)
+    rag_system.schedule_memory(session_id)
+
+# 요약 갱신이 밀렸을 때 한 번에 요약에 반영할 최대 대화 수
+SUMMARY_MAX_NEW_TURNS = 20
+
+def load_summary_state(session_id: str) -> Tuple[str, int, List[Tuple[int, str, str]]]:
+    """세션 요약, 요약에 반영된 마지막 대화 id, 그 이후 대화 목록(오래된 순)"""
+    with app.app_context():
+        session_summary = db.session.get(SessionSummary, session_id)
+        summary, last_id = (session_summary.summary, session_summary.last_conversation_id) if session_summary else ('', 0)
+        conversations = db.session.execute(
+            db.select(Conversation).filter(Conversation.session_id == session_id, Conversation.id > last_id)
+            .order_by(Conversation.id.desc()).limit(SUMMARY_MAX_NEW_TURNS)
+        ).scalars().all()
+        return summary, last_id, [(conv.id, conv.user_message, conv.bot_response) for conv in reversed(conversations)]
+
+def save_session_summary(session_id: str, summary: str, last_id: int, previous_last_id: int) -> bool:
+    """세션 요약 저장 (다른 워커가 그 사이 먼저 갱신했으면 저장하지 않고 False)"""
+    with app.app_context():
+        if previous_last_id == 0:
+            db.session.add(SessionSummary(session_id=session_id, summary=summary, last_conversation_id=last_id))
+            try:
+                db.session.commit()
+                return True
+            except IntegrityError:
+                db.session.rollback()
+                return False
+        result = db.session.execute(
+            db.update(SessionSummary)
+            .where(SessionSummary.session_id == session_id, SessionSummary.last_conversation_id == previous_last_id)
+            .values(summary=summary, last_conversation_id=last_id, updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+# 세션 요약 요청이 실행 슬롯 대기열에서 쓰는 세션 이름 (요약 요청 전체가 한 세션처럼 사용자 요청과 번갈아 실행)
+SUMMARY_ADMISSION_SESSION = 'rag-session-summary'
+
+def summarize_conversation(prompt: str) -> str:
+    """세션 요약 생성 (답변 생성과 같은 동시 실행 한도, 재시도 정책, 시간 예산 적용)
+
+    요청이 몰려 실행 슬롯을 받지 못하면 Overloaded가 발생하고, 요약은 다음 대화 저장 때 다시 갱신됩니다.
+    """
+    deadline = Deadline(RAG_REQUEST_BUDGET)
+    with llm_admission.admit(SUMMARY_ADMISSION_SESSION, deadline):
+        return summary_caller.call(lambda: rag_system.llm.invoke(prompt), deadline).content
+
+# 세션 요약은 응답을 보낸 뒤 백그라운드에서 LLM으로 갱신 (답변 생성 지연 통계와 섞이지 않도록 호출기 분리)
+summary_caller = HedgedCaller('rag-summary', RAG_LLM_MAX_RETRIES, RAG_LLM_RETRY_DELAY, max_workers=2)
+session_summarizer = SessionSummarizer(
+    load_summary_state, save_session_summary, summarize_conversation, RAG_HISTORY_TURNS, RAG_SUMMARY_MAX_TOKENS,
+    RAG_SUMMARY_EVERY_TURNS, RAG_SUMMARY_TRIGGER_TOKENS
+)
 
 # 라우트 정의
 @app.route('/')
@@ -207,6 +1273,8 @@ def index():
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """채팅 API"""
+    # 대화 기록 조회부터 답변 생성까지 하나의 시간 예산을 나눠 씀
+    deadline = Deadline(RAG_REQUEST_BUDGET)
     try:
         data = request.json
         user_message = data.get('message', '')
@@ -214,28 +1282,34 @@ def chat():
         
         if not user_message:
             return jsonify({'error': '메시지가 비어있습니다.'}), 400
+
+        if not rag_system.is_ready():
+            response = jsonify(not_ready_payload())
+            response.headers['Retry-After'] = '5'
+            return response, 503
         
-        # 이전 대화 기록 조회
-        # SQLAlchemy 2.0 스타일의 paginate 사용법에 맞게 수정
-        recent_conversations_query = db.session.execute(
-            db.select(Conversation).filter_by(session_id=session_id).order_by(Conversation.timestamp.desc()).limit(5)
-        ).scalars().all()
-        
-        conversation_history = [conv.to_dict() for conv in recent_conversations_query]
-        
-        # RAG 시스템으로 응답 생성
-        bot_response = rag_system.generate_response(user_message, conversation_history)
+        # 절차 질문(신청 방법, 준비 서류 등)은 대화 기록 조회와 검색 없이 정해진 답변으로 응답
+        bot_response = rag_system.faq_answer(user_message)
+        if bot_response is None:
+            # 이전 대화 기록 조회
+            conversation_history, summary = load_session_context(session_id)
+            # 대화 첫 질문이 미리 답변을 만들어 둔 질문이면 바로 응답, 아니면 RAG 시스템으로 응답 생성
+            bot_response = rag_system.canned_answer(user_message) if not conversation_history else None
+        if bot_response is None:
+            # 동시 실행 한도 안에서 차례가 되면 생성 (대기열이 길면 429)
+            try:
+                ticket = llm_admission.admit(session_id, deadline)
+            except Overloaded as e:
+                response = jsonify(overloaded_payload(e))
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
+            with ticket:
+                bot_response = rag_system.generate_response(
+                    user_message, conversation_history, deadline, summary, session_id
+                )
         
         # 대화 기록 저장
-        conversation = Conversation(
-            session_id=session_id,
-            user_message=user_message,
-            bot_response=bot_response,
-            user_agent=request.headers.get('User-Agent', '')
-        )
-        
-        db.session.add(conversation)
-        db.session.commit()
+        save_conversation(session_id, user_message, bot_response, request.headers.get('User-Agent', ''))
         
         return jsonify({
             'response': bot_response,
@@ -247,6 +1321,72 @@ def chat():
         logger.error(f"채팅 API 오류: {e}")
         return jsonify({'error': '서버 오류가 발생했습니다.'}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """채팅 API (SSE로 응답 토큰을 생성되는 대로 전송)"""
+    deadline = Deadline(RAG_REQUEST_BUDGET)
+    try:
+        data = request.json
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', f'session_{datetime.now().timestamp()}')
+
+        if not user_message:
+            return jsonify({'error': '메시지가 비어있습니다.'}), 400
+
+        if not rag_system.is_ready():
+            response = jsonify(not_ready_payload())
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        # 절차 질문은 대화 기록 조회와 검색 없이 정해진 답변으로 응답
+        canned = rag_system.faq_answer(user_message)
+        conversation_history, summary = [], ''
+        if canned is None:
+            conversation_history, summary = load_session_context(session_id)
+            canned = rag_system.canned_answer(user_message) if not conversation_history else None
+        user_agent = request.headers.get('User-Agent', '')
+    except Exception as e:
+        logger.error(f"채팅 스트리밍 API 오류: {e}")
+        return jsonify({'error': '서버 오류가 발생했습니다.'}), 500
+
+    ticket = None
+    if canned is None:
+        try:
+            ticket = llm_admission.admit(session_id, deadline)
+        except Overloaded as e:
+            response = jsonify(overloaded_payload(e))
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+
+    def generate():
+        tokens = iter([canned]) if canned is not None else rag_system.stream_response(
+            user_message, conversation_history, deadline, summary, session_id
+        )
+        parts = []
+        completed = False
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield sse_event({'token': token})
+            completed = True
+            yield sse_event({'session_id': session_id, 'timestamp': datetime.now().isoformat()}, 'done')
+        finally:
+            # 스트리밍이 끝나거나 클라이언트 연결이 끊기면(GeneratorExit) 그때까지의 응답으로 대화 기록 저장
+            if hasattr(tokens, 'close'):
+                tokens.close()
+            if not completed:
+                logger.info(f"클라이언트 연결 종료: 부분 응답 {len(parts)}개 토큰 저장 ({session_id})")
+            try:
+                save_conversation(session_id, user_message, "".join(parts), user_agent)
+            except Exception as e:
+                logger.error(f"대화 기록 저장 오류: {e}")
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+    if ticket is not None:
+        # 스트리밍이 끝나거나 연결이 끊겨 응답이 닫힐 때 실행 슬롯 반환 (스트리밍을 시작하지 못한 경우 포함)
+        response.call_on_close(ticket.release)
+    return response
+
 @app.route('/api/conversations', methods=['GET'])
 def get_conversations():
     """대화 기록 조회"""
@@ -321,15 +1461,67 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'index': rag_system.index_status()
+    })
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """프로세스 생존 여부 확인 (인덱스 상태와 무관)"""
+    return jsonify({
+        'status': 'alive',
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """요청 처리 준비 여부 확인 (구축 완료 시 200, 준비 중이거나 다시 시도 예정이면 503, 재시도를 모두 실패하면 500)"""
+    index_status = rag_system.index_status()
+    status = 'ready' if rag_system.is_ready() else 'failed' if index_status['state'] == 'failed' else 'not_ready'
+    return jsonify({
+        'status': status,
+        'reason': index_status['error'] if status != 'ready' else None,
+        'timestamp': datetime.now().isoformat(),
+        'index': index_status
+    }), 200 if status == 'ready' else 500 if status == 'failed' and index_status['next_retry_at'] is None else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """성능 지표 조회"""
+    return jsonify({
+        'embedding_cache': {
+            backend: embeddings.stats()
+            for backend, embeddings in list(rag_system.embedders.items()) if hasattr(embeddings, 'stats')
+        },
+        'query_embedding_cache': rag_system.query_cache.stats(),
+        'retrieval_batcher': rag_system.retrieval_batcher.stats(),
+        'response_cache': rag_system.response_cache.stats(),
+        'time_to_first_token': rag_system.first_token_latency.summary(),
+        'canned_answers': rag_system.canned_answers.stats(),
+        'faq_router': rag_system.faq_router.stats(),
+        'llm': {
+            'invoke': rag_system.llm_caller.stats(),
+            'stream': rag_system.stream_caller.stats(),
+            'precompute': rag_system.precompute_caller.stats(),
+        },
+        'admission': llm_admission.stats(),
+        'conversation_memory': rag_system.conversation_memory.stats(),
+        'followup': rag_system.session_retrievals.stats(),
+        'session_summary': {**session_summarizer.stats(), 'llm': summary_caller.stats()},
+        'tokens': {name: histogram.summary() for name, histogram in rag_system.token_usage.items()},
+        'deadline': {
+            'budget_seconds': RAG_REQUEST_BUDGET,
+            'exceeded': dict(rag_system.deadline_exceeded)
+        },
+        'retrieval': dict(rag_system.retrieval_counts),
+        'timestamp': datetime.now().isoformat()
     })
 
 # 데이터베이스 초기화
 def init_db():
     """데이터베이스 및 샘플 데이터 초기화"""
+    create_tables()
     with app.app_context():
-        db.create_all()
-        
         # 샘플 일자리 데이터 추가 (JobInfo 테이블에만 추가)
         sample_jobs = [
             {
@@ -0,0 +1,204 @@
+# asgi.py - 비동기 서버용 진입점 (예: gunicorn -k uvicorn.workers.UvicornWorker asgi:application)
+# /api/chat, /api/chat/stream은 Gemini 응답을 기다리는 동안 이벤트 루프를 막지 않으므로 프로세스 하나가 많은 요청을 동시에 처리합니다.
+# 그 밖의 경로는 기존 Flask 앱(WSGI)을 스레드에서 그대로 실행합니다.
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.wsgi import WsgiToAsgi
+
+from admission import Overloaded
+from deadline import Deadline
+
+from app import (
+    RAG_REQUEST_BUDGET, SSE_HEADERS, app, llm_admission, load_session_context, not_ready_payload,
+    overloaded_payload, rag_system, save_conversation, sse_event
+)
+
+logger = logging.getLogger(__name__)
+
+# 검색/DB 접근을 실행할 스레드 수 (LLM 호출은 스레드를 쓰지 않음)
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', '64'))
+
+flask_application = WsgiToAsgi(app)
+
+
+def _in_app_context(func, *args):
+    """Flask 앱 컨텍스트 안에서 DB 접근 함수 실행"""
+    with app.app_context():
+        return func(*args)
+
+
+async def _read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, status: int, payload: Dict[str, Any],
+                     headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())] + (headers or []),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def chat(scope, receive, send):
+    """채팅 API (비동기)"""
+    deadline = Deadline(RAG_REQUEST_BUDGET)
+    try:
+        data = json.loads(await _read_body(receive) or b'{}')
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', f'session_{datetime.now().timestamp()}')
+
+        if not user_message:
+            return await _send_json(send, 400, {'error': '메시지가 비어있습니다.'})
+
+        if not rag_system.is_ready():
+            return await _send_json(send, 503, not_ready_payload(), [(b'retry-after', b'5')])
+
+        # 절차 질문(신청 방법, 준비 서류 등)은 대화 기록 조회와 검색 없이 정해진 답변으로 응답
+        # (키워드/BM25 확인은 이벤트 루프를 막지 않도록 스레드에서)
+        bot_response = await asyncio.to_thread(rag_system.faq_answer, user_message)
+        if bot_response is None:
+            # 이전 대화 기록 조회 (DB 접근은 스레드에서)
+            conversation_history, summary = await asyncio.to_thread(_in_app_context, load_session_context, session_id)
+            # 대화 첫 질문이 미리 답변을 만들어 둔 질문이면 바로 응답, 아니면 RAG 시스템으로 응답 생성
+            bot_response = rag_system.canned_answer(user_message) if not conversation_history else None
+        if bot_response is None:
+            # 동시 실행 한도 안에서 차례가 되면 생성 (대기열이 길면 429)
+            try:
+                ticket = await llm_admission.aadmit(session_id, deadline)
+            except Overloaded as e:
+                return await _send_json(send, 429, overloaded_payload(e), [(b'retry-after', str(e.retry_after).encode())])
+            with ticket:
+                bot_response = await rag_system.agenerate_response(
+                    user_message, conversation_history, deadline, summary, session_id
+                )
+
+        # 대화 기록 저장
+        user_agent = dict(scope.get('headers', [])).get(b'user-agent', b'').decode('latin-1')
+        await asyncio.to_thread(_in_app_context, save_conversation, session_id, user_message, bot_response, user_agent)
+
+        await _send_json(send, 200, {
+            'response': bot_response,
+            'session_id': session_id,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"채팅 API 오류: {e}")
+        await _send_json(send, 500, {'error': '서버 오류가 발생했습니다.'})
+
+
+async def chat_stream(scope, receive, send):
+    """채팅 API (비동기 SSE 스트리밍)"""
+    deadline = Deadline(RAG_REQUEST_BUDGET)
+    try:
+        data = json.loads(await _read_body(receive) or b'{}')
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', f'session_{datetime.now().timestamp()}')
+
+        if not user_message:
+            return await _send_json(send, 400, {'error': '메시지가 비어있습니다.'})
+
+        if not rag_system.is_ready():
+            return await _send_json(send, 503, not_ready_payload(), [(b'retry-after', b'5')])
+
+        # 절차 질문은 대화 기록 조회와 검색 없이 정해진 답변으로 응답
+        canned = await asyncio.to_thread(rag_system.faq_answer, user_message)
+        conversation_history, summary = [], ''
+        if canned is None:
+            conversation_history, summary = await asyncio.to_thread(_in_app_context, load_session_context, session_id)
+            canned = rag_system.canned_answer(user_message) if not conversation_history else None
+        user_agent = dict(scope.get('headers', [])).get(b'user-agent', b'').decode('latin-1')
+        ticket = None if canned is not None else await llm_admission.aadmit(session_id, deadline)
+    except Overloaded as e:
+        return await _send_json(send, 429, overloaded_payload(e), [(b'retry-after', str(e.retry_after).encode())])
+    except Exception as e:
+        logger.error(f"채팅 스트리밍 API 오류: {e}")
+        return await _send_json(send, 500, {'error': '서버 오류가 발생했습니다.'})
+
+    # 요청 본문을 모두 읽은 뒤 도착하는 메시지는 연결 종료뿐이므로 별도 태스크에서 감시
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    tokens = None if canned is not None else rag_system.astream_response(
+        user_message, conversation_history, deadline, summary, session_id
+    )
+    parts = []
+    completed = False
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream; charset=utf-8')]
+                       + [(k.lower().encode(), v.encode()) for k, v in SSE_HEADERS.items()],
+        })
+        if tokens is None:
+            parts.append(canned)
+            await send({'type': 'http.response.body', 'body': sse_event({'token': canned}).encode('utf-8'), 'more_body': True})
+        else:
+            async for token in tokens:
+                if disconnected.is_set():
+                    break
+                parts.append(token)
+                await send({'type': 'http.response.body', 'body': sse_event({'token': token}).encode('utf-8'), 'more_body': True})
+        if not disconnected.is_set():
+            done = sse_event({'session_id': session_id, 'timestamp': datetime.now().isoformat()}, 'done')
+            await send({'type': 'http.response.body', 'body': done.encode('utf-8')})
+            completed = True
+    finally:
+        # 스트리밍이 끝나거나 클라이언트 연결이 끊기면 그때까지의 응답으로 대화 기록 저장
+        watcher.cancel()
+        if tokens is not None:
+            await tokens.aclose()
+        if ticket is not None:
+            ticket.release()
+        if not completed:
+            logger.info(f"클라이언트 연결 종료: 부분 응답 {len(parts)}개 토큰 저장 ({session_id})")
+        try:
+            await asyncio.to_thread(_in_app_context, save_conversation, session_id, user_message, "".join(parts), user_agent)
+        except Exception as e:
+            logger.error(f"대화 기록 저장 오류: {e}")
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # asyncio.to_thread 기본 스레드 수(CPU 수 + 4)로는 동시 요청의 검색/DB 접근이 밀리므로 확장
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='asgi')
+            )
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI 애플리케이션"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] == 'http' and scope['method'] == 'POST':
+        if scope['path'] == '/api/chat':
+            return await chat(scope, receive, send)
+        if scope['path'] == '/api/chat/stream':
+            return await chat_stream(scope, receive, send)
+    return await flask_application(scope, receive, send)
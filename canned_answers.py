@@ -0,0 +1,107 @@
+# canned_answers.py - 빠른 질문 버튼용 미리 생성한 답변 (인덱스 버전별로 저장)
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from embedding_cache import normalize_query
+from index_store import index_build_lock
+
+logger = logging.getLogger(__name__)
+
+# templates/index.html 빠른 질문 버튼과 같은 문구
+DEFAULT_CANNED_QUESTIONS = "노인 일자리 종류가 어떻게 되나요?|신청 방법을 알려주세요|급여는 얼마나 되나요?"
+
+
+def parse_questions(spec: str) -> List[str]:
+    """'질문1|질문2' 형식의 설정 문자열을 질문 목록으로 변환"""
+    return [q.strip() for q in spec.split("|") if q.strip()]
+
+
+class CannedAnswers:
+    """정해진 질문의 답변을 인덱스 버전과 함께 파일에 저장하여 모든 워커가 공유"""
+
+    def __init__(self, path: str, questions: List[str]):
+        self.path = path
+        self.questions = questions
+        self.index_version: Optional[str] = None
+        self.answers: Dict[str, str] = {}
+        self.served: Dict[str, int] = {q: 0 for q in questions}
+        self._keys = {normalize_query(q): q for q in questions}
+        self._lock = threading.Lock()
+
+    def get(self, index_version: Optional[str], query: str) -> Optional[str]:
+        """현재 인덱스 버전으로 만든 답변이 있으면 반환"""
+        question = self._keys.get(normalize_query(query))
+        if question is None or index_version is None or index_version != self.index_version:
+            return None
+        answer = self.answers.get(question)
+        if answer is not None:
+            with self._lock:
+                self.served[question] += 1
+        return answer
+
+    def _load(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"미리 생성한 답변 파일을 읽을 수 없습니다: {e}")
+            return {}
+
+    def _save(self, data: Dict) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, index_version: str, generate: Callable[[str], str],
+                questions: Optional[List[str]] = None) -> None:
+        """인덱스 버전에 맞는 답변 준비 (저장된 답변이 같은 버전이면 재사용, 없는 질문만 생성)
+
+        questions를 주면 그 질문만 준비합니다 (다른 경로로 답하는 질문 제외).
+        """
+        started = time.perf_counter()
+        questions = self.questions if questions is None else [q for q in questions if q in self.served]
+        generated = 0
+        # 먼저 잠금을 얻은 워커가 생성하고, 나머지 워커는 저장된 결과를 읽음
+        with index_build_lock(self.path):
+            saved = self._load()
+            answers = {}
+            if saved.get("index_version") == index_version:
+                answers = {q: a for q, a in saved.get("answers", {}).items() if q in questions}
+            for question in questions:
+                if question in answers:
+                    continue
+                try:
+                    answers[question] = generate(question)
+                    generated += 1
+                except Exception as e:
+                    logger.warning(f"답변 미리 생성 실패 ('{question}'): {e}")
+            if generated or saved.get("index_version") != index_version:
+                self._save({"index_version": index_version, "answers": answers})
+
+        self.answers = answers
+        self.index_version = index_version
+        logger.info(
+            f"미리 생성한 답변 준비 완료: {len(answers)}/{len(questions)}개 "
+            f"(새로 생성 {generated}개, {time.perf_counter() - started:.2f}초, 인덱스 {index_version})"
+        )
+
+    def stats(self) -> Dict:
+        """질문별 제공 횟수"""
+        with self._lock:
+            served = dict(self.served)
+        return {
+            "index_version": self.index_version,
+            "ready": len(self.answers),
+            "questions": len(self.questions),
+            "served": served,
+        }
@@ -0,0 +1,113 @@
+# constraints.py - 사용자 질문에서 검색 조건(신체활동, 지역, 근무형태) 추출
+from typing import Dict, List, Set, Tuple
+
+from phrase_automaton import PhraseAutomaton
+
+# 신체적 부담을 언급하는 표현 -> 신체활동수준이 낮은 직업만 검색
+MOBILITY_PHRASES = (
+    "다리 아파", "다리가 아파", "다리가 불편", "무릎", "허리가 아파", "허리 아파", "허리가 안 좋",
+    "거동이 불편", "거동 불편", "몸이 불편", "오래 서 있", "오래 걷", "걷기 힘들", "걷는 게 힘들",
+    "힘든 일은", "몸을 많이 쓰", "체력이 약", "체력이 없", "앉아서", "가벼운 일",
+)
+MOBILITY_COLUMN = "신체활동수준"
+LOW_MOBILITY_VALUES = ("낮음",)
+
+# 근무형태 값의 줄임말 (CSV에 해당 값이 있을 때만 사용)
+WORK_TYPE_COLUMN = "근무형태"
+WORK_TYPE_ALIASES = {
+    "공익활동형": ("공익형", "공익활동"),
+    "사회서비스형": ("사회서비스", "서비스형"),
+    "시장형": ("시장형 사업", "사업단"),
+    "취업알선형": ("취업알선", "알선형"),
+}
+
+REGION_COLUMN = "지역"
+# 지역 값에서 검색어로 쓰지 않을 일반적인 단어
+REGION_STOPWORDS = {"전지역", "전체", "지역", "일대"}
+# 시/도 이름의 접미사 ("서울특별시", "서울시", "서울"을 같은 시/도로 취급)
+CITY_SUFFIXES = ("특별자치시", "특별자치도", "특별시", "광역시", "시", "도")
+
+
+def city_key(token: str) -> str:
+    """지역 값 첫 단어(시/도)의 비교용 이름"""
+    for suffix in CITY_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            return token[:-len(suffix)]
+    return token
+
+
+class ConstraintExtractor:
+    """질문에서 메타데이터 조건({컬럼: 허용 값 집합})을 추출"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        phrases: List[Tuple[str, Tuple[str, str]]] = []
+
+        vocab = columns.vocab
+        if MOBILITY_COLUMN in vocab:
+            for value in LOW_MOBILITY_VALUES:
+                if value in vocab[MOBILITY_COLUMN]:
+                    phrases += [(phrase, (MOBILITY_COLUMN, value)) for phrase in MOBILITY_PHRASES]
+
+        if WORK_TYPE_COLUMN in vocab:
+            for value in vocab[WORK_TYPE_COLUMN]:
+                phrases.append((value, (WORK_TYPE_COLUMN, value)))
+                phrases += [(alias, (WORK_TYPE_COLUMN, value)) for alias in WORK_TYPE_ALIASES.get(value, ())]
+
+        # 시/도 전체 대상 값 ("서울시 전지역", "서울시") - 같은 시/도의 구/군을 물어도 함께 검색
+        self.city_wide: Dict[str, Set[str]] = {}
+        if REGION_COLUMN in vocab:
+            for value in vocab[REGION_COLUMN]:
+                tokens = value.split()
+                if tokens and all(token in REGION_STOPWORDS for token in tokens[1:]):
+                    self.city_wide.setdefault(city_key(tokens[0]), set()).add(value)
+                # "서울시 강남구" -> "서울시 강남구", "서울시", "강남구", "강남"
+                terms = {value}
+                if tokens:
+                    terms.add(city_key(tokens[0]))
+                for token in tokens:
+                    terms.add(token)
+                    if len(token) >= 3 and token[-1] in "시도구군":
+                        terms.add(token[:-1])
+                phrases += [(term, (REGION_COLUMN, value)) for term in terms
+                            if len(term) >= 2 and term not in REGION_STOPWORDS]
+
+        self.automaton = PhraseAutomaton(phrases)
+
+    def extract(self, query: str) -> Dict[str, Set[str]]:
+        """질문에 포함된 조건 추출 (같은 컬럼의 여러 값은 OR 조건)"""
+        constraints: Dict[str, Set[str]] = {}
+        spans = self.automaton.find_spans(query)
+        region_spans = {(start, end) for start, end, (column, _) in spans if column == REGION_COLUMN}
+        # 시/도 이름으로만 일치한 값과 구/군 이름까지 일치한 값을 구분
+        city_only: Set[str] = set()
+        specific: Set[str] = set()
+        for start, end, (column, value) in spans:
+            if column == REGION_COLUMN:
+                if not self._region_match(query, start, end, region_spans):
+                    continue
+                tokens = value.split()
+                (city_only if query[start:end] == city_key(tokens[0]) else specific).add(value)
+            constraints.setdefault(column, set()).add(value)
+        regions = constraints.get(REGION_COLUMN)
+        if regions:
+            # "대구 동구"처럼 구/군까지 말했으면 같은 시/도의 다른 구/군은 제외
+            narrowed = {city_key(value.split()[0]) for value in specific}
+            regions.difference_update(value for value in city_only - specific
+                                      if city_key(value.split()[0]) in narrowed)
+            for value in list(regions):
+                tokens = value.split()
+                if tokens:
+                    regions.update(self.city_wide.get(city_key(tokens[0]), ()))
+        return constraints
+
+    @staticmethod
+    def _region_match(query: str, start: int, end: int, region_spans: Set[Tuple[int, int]]) -> bool:
+        """지역 표현이 독립된 단어로 쓰였는지 ("강동구"의 "동구"처럼 더 긴 지역명의 일부면 제외)"""
+        for other_start, other_end in region_spans:
+            if other_start <= start and end <= other_end and other_end - other_start > end - start:
+                return False
+        # 단어 중간에서 시작하면 제외 (바로 앞이 다른 지역명으로 끝나는 "서울강남"은 허용)
+        if start > 0 and query[start - 1].isalnum():
+            return any(other_end == start for _, other_end in region_spans)
+        return True
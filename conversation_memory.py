@@ -0,0 +1,178 @@
+# conversation_memory.py - 세션별 이전 대화 임베딩을 메모리에 두고 질문과 관련된 대화를 선택
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from prompt_builder import compact_whitespace, truncate_tokens
+from response_cache import unit_vector
+
+logger = logging.getLogger(__name__)
+
+# (Conversation id, 사용자 메시지, 챗봇 답변)
+Turn = Tuple[int, str, str]
+# 대화 임베딩과 메모리에 보관할 챗봇 답변의 최대 토큰 수 (답변 앞부분에 추천 직업 등 핵심 내용이 옴)
+TURN_ANSWER_TOKENS = 200
+
+
+def turn_text(user_message: str, bot_response: str) -> str:
+    """대화 한 턴의 임베딩 입력"""
+    answer = truncate_tokens(compact_whitespace(bot_response), TURN_ANSWER_TOKENS)
+    return f"사용자: {compact_whitespace(user_message)}\n챗봇: {answer}"
+
+
+class _SessionMemory:
+    """세션 하나의 대화(id 오름차순)와 단위 벡터"""
+
+    __slots__ = ("model_name", "turns", "vectors")
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.turns: List[Turn] = []
+        self.vectors: Optional[np.ndarray] = None
+
+
+class ConversationMemory:
+    """세션별 대화 벡터 저장소 (최근 사용한 max_sessions개 세션만 유지, LRU)
+
+    대화 임베딩은 요청 처리 경로 밖의 백그라운드 스레드에서 합니다. 대화가 저장되거나 메모리에 없는 세션의
+    요청이 오면 schedule()로 예약하고, 스레드가 load(session_id, 마지막 id)로 DB에서 새 대화를 읽어 임베딩합니다
+    (세션이 밀려났거나 다른 워커가 처리하던 세션이면 최근 max_turns개를 다시 읽고, 임베딩 캐시에 남아 있으면
+    원격 호출 없이 복원). 요청 처리 중에는 검색에 쓴 질의 벡터로 recall()만 하므로 원격 호출이 없습니다.
+    """
+
+    def __init__(self, max_sessions: int = 256, max_turns: int = 200,
+                 load: Optional[Callable[[str, int], List[Turn]]] = None):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.load = load
+        self._sessions: "OrderedDict[str, _SessionMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, Embeddings]]" = queue.Queue()
+        self._pending: Set[str] = set()
+        self._worker: Optional[threading.Thread] = None
+        self.embedded_turns = 0
+        self.evictions = 0
+        self.recalls = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0 and self.max_turns > 0
+
+    @staticmethod
+    def _model_name(embeddings: Embeddings) -> str:
+        return getattr(embeddings, "model_name", type(embeddings).__name__)
+
+    def last_id(self, session_id: str, embeddings: Embeddings) -> int:
+        """메모리에 있는 세션의 마지막 대화 id (없거나 다른 임베딩 모델로 만든 경우 0)"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None or memory.model_name != self._model_name(embeddings) or not memory.turns:
+                return 0
+            return memory.turns[-1][0]
+
+    def schedule(self, session_id: str, embeddings: Embeddings) -> None:
+        """세션의 새 대화 임베딩 예약 (요청 처리 경로에서는 기다리지 않음)"""
+        if not self.enabled or self.load is None:
+            return
+        with self._lock:
+            if session_id in self._pending:
+                return
+            self._pending.add(session_id)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='rag-conversation-memory', daemon=True)
+                self._worker.start()
+        self._queue.put((session_id, embeddings))
+
+    def _run(self) -> None:
+        while True:
+            session_id, embeddings = self._queue.get()
+            with self._lock:
+                self._pending.discard(session_id)
+            try:
+                self.remember(session_id, embeddings, self.load(session_id, self.last_id(session_id, embeddings)))
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                logger.warning(f"대화 임베딩 실패 ({session_id}): {e}")
+
+    def remember(self, session_id: str, embeddings: Embeddings, turns: Sequence[Turn]) -> None:
+        """새 대화를 임베딩하여 세션 메모리에 추가 (이미 있는 id는 건너뜀)"""
+        model_name = self._model_name(embeddings)
+        known = self.last_id(session_id, embeddings)
+        turns = [
+            (turn_id, compact_whitespace(user), truncate_tokens(compact_whitespace(bot), TURN_ANSWER_TOKENS))
+            for turn_id, user, bot in turns if turn_id > known
+        ][-self.max_turns:]
+        if not turns:
+            with self._lock:
+                if session_id in self._sessions:
+                    self._sessions.move_to_end(session_id)
+            return
+        # 임베딩(원격 호출)은 잠금 밖에서 수행
+        vectors = np.array(
+            embeddings.embed_documents([turn_text(user, bot) for _, user, bot in turns]), dtype=np.float32
+        )
+        vectors = np.stack([unit_vector(vector) for vector in vectors])
+
+        with self._lock:
+            self.embedded_turns += len(turns)
+            memory = self._sessions.get(session_id)
+            if memory is None or memory.model_name != model_name:
+                memory = _SessionMemory(model_name)
+                self._sessions[session_id] = memory
+            self._sessions.move_to_end(session_id)
+            # 다른 스레드가 먼저 추가한 대화는 제외
+            fresh = [i for i, turn in enumerate(turns) if not memory.turns or turn[0] > memory.turns[-1][0]]
+            if fresh:
+                memory.turns.extend(turns[i] for i in fresh)
+                added = vectors[fresh]
+                memory.vectors = added if memory.vectors is None else np.vstack([memory.vectors, added])
+                if len(memory.turns) > self.max_turns:
+                    memory.turns = memory.turns[-self.max_turns:]
+                    memory.vectors = memory.vectors[-self.max_turns:]
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def recall(self, session_id: str, embeddings: Embeddings, query_vector: Sequence[float], k: int,
+               min_similarity: float = 0.0, exclude: Optional[Set[int]] = None) -> List[Tuple[Turn, float]]:
+        """질문 벡터와 코사인 유사도가 높은 대화 상위 k개 (유사도 내림차순, 원격 호출 없음)"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None or memory.model_name != self._model_name(embeddings) or memory.vectors is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            turns, vectors = list(memory.turns), memory.vectors
+            self.recalls += 1
+        scores = vectors @ unit_vector(query_vector)
+        order = np.argsort(-scores)
+        exclude = exclude or set()
+        hits = []
+        for position in order:
+            if scores[position] < min_similarity or len(hits) >= k:
+                break
+            if turns[position][0] not in exclude:
+                hits.append((turns[position], float(scores[position])))
+        return hits
+
+    def stats(self) -> Dict[str, Any]:
+        """메모리에 있는 세션/대화 수와 임베딩한 대화 수"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'sessions': len(self._sessions),
+                'turns': sum(len(memory.turns) for memory in self._sessions.values()),
+                'max_sessions': self.max_sessions,
+                'max_turns': self.max_turns,
+                'embedded_turns': self.embedded_turns,
+                'evictions': self.evictions,
+                'recalls': self.recalls,
+                'failures': self.failures,
+                'pending': len(self._pending),
+            }
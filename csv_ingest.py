@@ -0,0 +1,135 @@
+# csv_ingest.py - CSV 파일을 한 행씩 읽어 Document로 변환 (인코딩 자동 감지)
+import codecs
+import csv
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# BOM이 없을 때 순서대로 시도할 인코딩 (cp949는 euc-kr의 상위 집합)
+CANDIDATE_ENCODINGS = ("utf-8", "cp949")
+READ_BLOCK = 1024 * 1024
+
+# 메타데이터로 저장할 컬럼과 타입 ("컬럼명:타입" 목록, CSV에 없는 컬럼은 건너뜀)
+#  - str: 문자열 그대로, category: 범주형 값, int: 숫자 추출 ('만원' 단위는 원으로 환산)
+DEFAULT_METADATA_SCHEMA = "직업명:str,신체활동수준:category,지역:category,근무형태:category,급여:int"
+COLUMN_TYPES = ("str", "category", "int")
+
+_NUMBER_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_schema(spec: str) -> Dict[str, str]:
+    """"컬럼명:타입,..." 형식의 메타데이터 스키마 문자열 해석"""
+    schema = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, col_type = item.partition(":")
+        col_type = col_type.strip() or "str"
+        if col_type not in COLUMN_TYPES:
+            raise ValueError(f"알 수 없는 메타데이터 컬럼 타입입니다: {item.strip()} (가능: {', '.join(COLUMN_TYPES)})")
+        schema[name.strip()] = col_type
+    return schema
+
+
+def convert_value(value: Optional[str], col_type: str) -> Any:
+    """CSV 문자열 값을 스키마 타입으로 변환 (빈 값은 None)"""
+    if value is None or not value.strip():
+        return None
+    value = value.strip()
+    if col_type != "int":
+        return value
+    match = _NUMBER_PATTERN.search(value)
+    if not match:
+        return None
+    number = float(match.group(0).replace(",", ""))
+    # "월 27만원", "월 60-80만원"처럼 뒤에 '만' 단위가 붙으면 원 단위로 환산 (범위는 하한값 사용)
+    if "만" in value[match.end():]:
+        number *= 10000
+    return int(number)
+
+
+def render_document(doc: Document, schema: Dict[str, str]) -> str:
+    """메타데이터 컬럼과 본문을 한 줄로 표시 (임베딩 입력과 프롬프트에 공통 사용)"""
+    parts = [f"{col}: {doc.metadata[col]}" for col in schema if doc.metadata.get(col) is not None]
+    parts += [line for line in doc.page_content.split("\n") if line]
+    return ", ".join(parts)
+
+
+def detect_encoding(path: str) -> str:
+    """CSV 파일 인코딩 감지 (UTF-8 BOM, UTF-8, CP949/EUC-KR 순)"""
+    with open(path, "rb") as f:
+        if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+            return "utf-8-sig"
+
+    for encoding in CANDIDATE_ENCODINGS:
+        # 파일 전체를 블록 단위로 디코딩해 보아 메모리 사용량을 일정하게 유지
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(READ_BLOCK), b""):
+                    decoder.decode(block)
+            decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    raise ValueError(f"지원하지 않는 인코딩입니다 (시도: {', '.join(CANDIDATE_ENCODINGS)}): {path}")
+
+
+def iter_csv_documents(path: str, schema: Dict[str, str],
+                       encoding: str = None) -> Iterator[Document]:
+    """CSV 행을 하나씩 Document로 변환하여 반환
+
+    스키마 컬럼은 타입을 변환해 metadata에 저장하고, 나머지 컬럼은
+    CSVLoader와 같은 "컬럼: 값" 형식으로 page_content에 담습니다.
+    """
+    encoding = encoding or detect_encoding(path)
+    with open(path, newline="", encoding=encoding) as f:
+        reader = csv.DictReader(f, delimiter=",")
+        for i, row in enumerate(reader):
+            # 헤더보다 필드가 많은 행은 남는 값이 None 키에 담기므로 버리고 기록 (따옴표 없이 쉼표가 들어간 경우 등)
+            extra = row.pop(None, None)
+            if extra:
+                logger.warning(f"{path} {reader.line_num}번째 줄: 헤더보다 많은 필드 {len(extra)}개를 무시합니다: {extra}")
+            content = "\n".join(
+                f"{k.strip()}: {v.strip() if v is not None else v}"
+                for k, v in row.items()
+                if k not in schema
+            )
+            metadata = {"source": path, "row": i}
+            for col, col_type in schema.items():
+                if col in row:
+                    metadata[col] = convert_value(row[col], col_type)
+            yield Document(page_content=content, metadata=metadata)
+
+
+def iter_data_documents(data_path: str, csv_files: Iterable[str], schema: Dict[str, str],
+                        failed: Optional[Dict[str, str]] = None) -> Iterator[Document]:
+    """데이터 폴더의 CSV 파일들을 차례로 스트리밍 (읽기 실패한 파일은 건너뜀)
+
+    failed를 주면 도중에 읽기를 멈춘 파일의 {파일명: 오류}를 기록합니다 (읽지 못한 행을 삭제로 오인하지 않도록).
+    """
+    for csv_file in csv_files:
+        full_csv_path = os.path.join(data_path, csv_file)
+        encoding = None
+        count = 0
+        try:
+            encoding = detect_encoding(full_csv_path)
+            logger.info(f"{full_csv_path} 파일 로딩 중... (인코딩: {encoding})")
+            for doc in iter_csv_documents(full_csv_path, schema, encoding):
+                count += 1
+                yield doc
+            logger.info(f"{count}개의 직업 정보 로드 완료. (파일: {csv_file})")
+        except Exception as e:
+            logger.error(f"오류: '{csv_file}' 파일 로딩 중 문제가 발생했습니다: {e}")
+            logger.error(f"파일 경로: {full_csv_path}, 인코딩: {encoding or '감지 실패'}, 처리된 행: {count}")
+            logger.error("CSV 파일의 형식이나 컬럼명, 인코딩을 확인해주세요.")
+            if failed is not None:
+                failed[os.path.basename(csv_file)] = str(e)
+            continue # 다음 파일로 넘어감
+
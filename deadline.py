@@ -0,0 +1,303 @@
+# deadline.py - 요청별 시간 예산과 예산 안에서의 재시도/헤징(hedging) 호출
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from embedding_pipeline import is_rate_limited
+from latency_stats import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# 재시도하면 성공할 수 있는 Google API 오류 (google.api_core.exceptions 클래스 이름)
+TRANSIENT_ERRORS = frozenset((
+    "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout", "TooManyRequests", "Aborted"
+))
+# 헤징 지연 시간을 정하기 전에 모아야 할 최소 응답 시간 표본 수
+HEDGE_MIN_SAMPLES = 20
+
+
+class DeadlineExceeded(TimeoutError):
+    """요청 시간 예산 초과 (stage: 예산이 소진된 단계)"""
+
+    def __init__(self, stage: str, elapsed: float):
+        super().__init__(f"{stage} 단계에서 요청 시간 예산 초과 ({elapsed:.2f}초 경과)")
+        self.stage = stage
+
+
+class Deadline:
+    """요청 한 건의 시간 예산 (budget초, 0 이하이면 제한 없음)
+
+    대화 기록 조회, 검색, 답변 생성이 같은 예산을 나눠 쓰며, 각 단계는 남은 시간만큼만 기다립니다.
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        """남은 시간(초), 제한이 없으면 None"""
+        if self.budget <= 0:
+            return None
+        return max(0.0, self.budget - self.elapsed())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self, stage: str) -> None:
+        """예산이 소진되었으면 DeadlineExceeded 발생"""
+        if self.expired():
+            raise DeadlineExceeded(stage, self.elapsed())
+
+
+class CallerSaturated(RuntimeError):
+    """결과를 기다리지 않고 버린 호출이 아직 너무 많이 실행 중이어서 새 호출을 보내지 않음"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """일시적인 오류(요청 한도 초과, 서버 오류, 연결 오류)인지 확인"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return is_rate_limited(error) or type(error).__name__ in TRANSIENT_ERRORS
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 10.0) -> float:
+    """지터가 있는 지수 백오프 대기 시간(초)"""
+    return min(cap, base * 2 ** attempt) * (0.5 + random.random())
+
+
+class HedgedCaller:
+    """시간 예산 안에서 원격 호출을 재시도하고, 느린 호출은 한 번 더 보내 먼저 끝난 결과를 사용
+
+    - 일시적인 오류는 지터가 있는 지수 백오프로 최대 max_retries회 재시도하되, 대기 후 남는 예산이 없으면 포기합니다.
+    - hedge_percentile이 0보다 크면 최근 성공한 호출 지연 시간의 해당 백분위수(예: p95)가 지나도
+      응답이 없을 때 같은 호출을 하나 더 보내고 먼저 성공한 결과를 사용합니다.
+    - 동기 호출은 데몬 스레드에서 실행하므로 예산이 끝나면 기다리지 않고 반환하지만(프로세스 종료도 막지 않음),
+      이미 시작된 호출 자체는 취소되지 않습니다. 동시에 실행하는 호출은 max_workers개까지이고(나머지는 대기),
+      이렇게 버린 호출이 아직 max_abandoned개 이상 실행 중이면 새 호출은 CallerSaturated로 바로 거절합니다.
+      discard가 있으면 사용되지 않은 호출(헤징에서 진 호출, 예산 초과로 버린 호출)의 결과가 나오는 대로
+      discard(결과)를 호출합니다 (예: 스트림 닫기).
+    - 지연 시간 통계로 헤징 시점을 정하므로 호출 종류(전체 응답, 스트리밍 첫 조각 등)마다 별도 인스턴스를 사용해야 합니다.
+    """
+
+    def __init__(self, name: str, max_retries: int = 2, retry_delay: float = 0.5,
+                 hedge_percentile: float = 0, max_workers: int = 32,
+                 discard: Optional[Callable[[Any], None]] = None, max_abandoned: Optional[int] = None):
+        self.name = name
+        self.discard = discard
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = retry_delay
+        self.hedge_percentile = hedge_percentile
+        self.max_workers = max_workers
+        self.max_abandoned = max_workers if max_abandoned is None else max_abandoned
+        self.latency = LatencyWindow()
+        self._slots = threading.BoundedSemaphore(max(1, max_workers))
+        self._lock = threading.Lock()
+        self.abandoned = 0
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """두 번째 호출을 보내기까지 기다릴 시간(초), 헤징을 쓰지 않거나 표본이 부족하면 None"""
+        if self.hedge_percentile <= 0 or self.latency.count < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def saturated(self) -> bool:
+        """버린 호출이 max_abandoned개 이상 아직 실행 중인지 여부"""
+        with self._lock:
+            return self.abandoned >= self.max_abandoned
+
+    def _submit(self, func: Callable[[], Any]):
+        if self.saturated():
+            raise CallerSaturated(f"{self.name} 응답을 기다리지 않은 호출 {self.abandoned}개가 아직 실행 중입니다.")
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+
+        def run():
+            try:
+                with self._slots:
+                    # 실행 차례를 기다리는 동안 버려진 호출은 보내지 않음
+                    if getattr(future, 'abandoned', False):
+                        raise CancelledError()
+                    result = func()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=run, name=f"{self.name}-call", daemon=True).start()
+        return future, time.monotonic()
+
+    def _retry_wait(self, attempt: int, error: Exception, deadline: Deadline) -> Optional[float]:
+        """재시도 전 대기 시간, 재시도하지 않을 오류이거나 예산이 부족하면 None"""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = backoff_delay(attempt, self.retry_delay)
+        remaining = deadline.remaining()
+        if remaining is not None and delay >= remaining:
+            return None
+        self._count('retries')
+        logger.warning(f"{self.name} 호출 재시도 예정 ({attempt + 1}/{self.max_retries}, {delay:.2f}초 후): {error}")
+        return delay
+
+    def _discard_result(self, result: Any) -> None:
+        try:
+            self.discard(result)
+        except Exception as e:
+            logger.warning(f"{self.name} 사용하지 않은 응답 정리 실패: {e}")
+
+    def _abandon(self, future) -> None:
+        """결과를 쓰지 않을 호출을 실행 중인 버린 호출로 집계하고, 끝나면 결과 정리"""
+        future.abandoned = True
+        with self._lock:
+            self.abandoned += 1
+
+        def finished(done) -> None:
+            with self._lock:
+                self.abandoned -= 1
+            if self.discard is not None and done.exception() is None:
+                self._discard_result(done.result())
+
+        future.add_done_callback(finished)
+
+    def _failed(self, error: Exception) -> None:
+        self._count('timeouts' if isinstance(error, DeadlineExceeded) else 'failures')
+
+    def call(self, func: Callable[[], Any], deadline: Deadline) -> Any:
+        """func()를 예산 안에서 재시도/헤징하여 실행 (동기)"""
+        self._count('calls')
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._call_once(func, deadline)
+            except Exception as e:
+                delay = self._retry_wait(attempt, e, deadline)
+                if delay is None:
+                    self._failed(e)
+                    raise
+                time.sleep(delay)
+
+    def _call_once(self, func: Callable[[], Any], deadline: Deadline) -> Any:
+        primary, started = self._submit(func)
+        pending = {primary: started}
+        hedge_delay = self.hedge_delay()
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = deadline.remaining()
+                if hedge_delay is not None and len(pending) == 1 and primary in pending:
+                    until_hedge = max(0.0, started + hedge_delay - time.monotonic())
+                    timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future_started = pending.pop(future)
+                    if future.exception() is not None:
+                        error = future.exception()
+                        continue
+                    self.latency.add(time.monotonic() - future_started)
+                    if future is not primary:
+                        self._count('hedge_wins')
+                    return future.result()
+                if done:
+                    continue
+                deadline.check(f"{self.name} 응답 대기")
+                if hedge_delay is not None and primary in pending and len(pending) == 1:
+                    if not self.saturated():
+                        self._count('hedges')
+                        logger.info(f"{self.name} 응답이 {hedge_delay * 1000:.0f}ms 넘게 지연되어 같은 요청을 한 번 더 보냅니다.")
+                        hedge, hedge_started = self._submit(func)
+                        pending[hedge] = hedge_started
+                    hedge_delay = None
+            raise error
+        finally:
+            # 같은 wait에서 함께 끝났거나 아직 실행 중인 나머지 호출은 결과를 쓰지 않음
+            for other in pending:
+                self._abandon(other)
+
+    async def acall(self, func: Callable[[], Awaitable[Any]], deadline: Deadline) -> Any:
+        """func()가 만드는 코루틴을 예산 안에서 재시도/헤징하여 실행 (비동기, 늦게 끝난 호출은 취소)"""
+        self._count('calls')
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._acall_once(func, deadline)
+            except Exception as e:
+                delay = self._retry_wait(attempt, e, deadline)
+                if delay is None:
+                    self._failed(e)
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _acall_once(self, func: Callable[[], Awaitable[Any]], deadline: Deadline) -> Any:
+        primary = asyncio.ensure_future(func())
+        pending = {primary: time.monotonic()}
+        hedge_delay = self.hedge_delay()
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = deadline.remaining()
+                if hedge_delay is not None and len(pending) == 1 and primary in pending:
+                    until_hedge = max(0.0, pending[primary] + hedge_delay - time.monotonic())
+                    timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task_started = pending.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    self.latency.add(time.monotonic() - task_started)
+                    if task is not primary:
+                        self._count('hedge_wins')
+                    return task.result()
+                if done:
+                    continue
+                deadline.check(f"{self.name} 응답 대기")
+                if hedge_delay is not None and primary in pending and len(pending) == 1:
+                    self._count('hedges')
+                    logger.info(f"{self.name} 응답이 {hedge_delay * 1000:.0f}ms 넘게 지연되어 같은 요청을 한 번 더 보냅니다.")
+                    pending[asyncio.ensure_future(func())] = time.monotonic()
+                    hedge_delay = None
+            raise error
+        finally:
+            for task in pending:
+                if task.done() and not task.cancelled() and task.exception() is None and self.discard is not None:
+                    self._discard_result(task.result())
+                else:
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """호출/재시도/헤징 횟수와 성공한 호출의 지연 시간 통계"""
+        hedge_delay = self.hedge_delay()
+        with self._lock:
+            counts = {
+                'calls': self.calls,
+                'retries': self.retries,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'abandoned_in_flight': self.abandoned,
+            }
+        return {
+            **counts,
+            'max_retries': self.max_retries,
+            'hedge_percentile': self.hedge_percentile,
+            'hedge_delay_ms': round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+            'latency': self.latency.summary(),
+        }
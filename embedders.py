@@ -0,0 +1,94 @@
+# embedders.py - 임베딩 백엔드 (Gemini 원격 / 로컬 CPU)
+import hashlib
+import logging
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from lexical_index import char_ngrams
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("gemini", "local")
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+
+
+class LocalHashEmbeddings(Embeddings):
+    """문자 bigram/trigram을 해싱하여 고정 차원으로 투영하는 로컬 임베딩 (네트워크 불필요)
+
+    n-gram 빈도에 로그 스케일(1 + log tf)을 적용하고, 해시로 정한 차원에 부호와 함께 더한 뒤
+    L2 정규화합니다. 말뭉치 통계(IDF)를 쓰지 않으므로 같은 텍스트는 언제나 같은 벡터가 됩니다.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.model_name = f"local-hash-ngram-{dim}"
+
+    def _embed(self, text: str) -> List[float]:
+        counts: Dict[str, int] = {}
+        for gram in char_ngrams(text):
+            counts[gram] = counts.get(gram, 0) + 1
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for gram, count in counts.items():
+            digest = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+            sign = 1.0 if digest >> 63 else -1.0
+            # 긴 n-gram(trigram)이 더 구체적인 단서이므로 가중치를 조금 더 줌
+            vector[digest % self.dim] += sign * (1.0 + math.log(count)) * (1.0 + 0.5 * (len(gram) - 2))
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+
+class GeminiEmbeddings(Embeddings):
+    """Gemini 임베딩 (문서용/질의용 작업 유형을 생성자에서 정한 인스턴스 두 개를 사용)
+
+    GoogleGenerativeAIEmbeddings.embed_documents는 task_type이 지정되어 있으면 그 작업 유형으로
+    한 번에 임베딩하므로, 질의용 인스턴스의 embed_documents로 여러 질의를 한 번의 API 호출로 처리합니다.
+    """
+
+    def __init__(self, model: str = GEMINI_EMBEDDING_MODEL):
+        self.model_name = model
+        self.documents = GoogleGenerativeAIEmbeddings(model=model, task_type="retrieval_document")
+        self.queries = GoogleGenerativeAIEmbeddings(model=model, task_type="retrieval_query")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.documents.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.queries.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.queries.embed_documents(texts)
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """여러 질의를 질의용 작업 유형으로 한 번에 임베딩 (배치 호출이 불가능한 백엔드는 하나씩)"""
+    batch = getattr(embeddings, "embed_queries", None)
+    if batch is not None:
+        return batch(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+def create_embeddings(backend: str, local_dim: int = 512) -> Tuple[Embeddings, str]:
+    """백엔드 이름으로 (임베딩 객체, 모델 이름) 생성"""
+    if backend == "gemini":
+        return GeminiEmbeddings(GEMINI_EMBEDDING_MODEL), GEMINI_EMBEDDING_MODEL
+    if backend == "local":
+        embeddings = LocalHashEmbeddings(local_dim)
+        return embeddings, embeddings.model_name
+    raise ValueError(f"알 수 없는 임베딩 백엔드입니다: {backend} (가능: {', '.join(EMBEDDING_BACKENDS)})")
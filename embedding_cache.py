@@ -0,0 +1,342 @@
+# embedding_cache.py - SQLite 기반 임베딩 캐시 (모든 워커 프로세스가 공유)
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from embedders import embed_queries
+
+logger = logging.getLogger(__name__)
+
+TASK_DOCUMENT = "retrieval_document"
+TASK_QUERY = "retrieval_query"
+
+# SQLite IN 절에 한 번에 넣을 해시 개수
+LOOKUP_BATCH = 500
+# 오래된 캐시 정리 주기 (새로 저장한 벡터 수 또는 경과 시간(초) 중 먼저 도달하는 쪽)
+PRUNE_EVERY_ROWS = 1000
+PRUNE_INTERVAL = 600.0
+
+# 질의 끝에서 제거할 조사/어미 (긴 것부터 검사)
+TRAILING_PARTICLES = ("인가요", "나요", "은요", "는요", "이요", "예요", "에요", "요", "은", "는", "이", "가", "을", "를")
+# 끝 글자가 조사처럼 보이지만 명사의 일부인 단어 (조사를 떼면 다른 말이 됨)
+PARTICLE_KEEP_WORDS = {
+    "나이", "아이", "어린이", "고양이", "놀이", "차이", "사이", "필요", "중요", "수요",
+    "휴가", "평가", "단가", "전문가", "작가",
+}
+# 조사를 뗀 뒤 남는 어간의 최소 글자 수 ("필요" -> "필"처럼 한 글자만 남으면 조사가 아님)
+MIN_PARTICLE_STEM = 2
+_WHITESPACE = re.compile(r"\s+")
+
+
+class CachedEmbeddings(Embeddings):
+    """(임베딩 모델, 작업 유형, 텍스트 sha256) 키로 벡터를 재사용하는 임베딩 래퍼
+
+    max_rows(행 수)나 max_age(저장 후 경과 초)를 넘은 벡터는 주기적으로 오래된 것부터 삭제합니다 (0이면 제한 없음).
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, path: str,
+                 max_rows: int = 0, max_age: float = 0.0):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.path = path
+        self.max_rows = max(0, max_rows)
+        self.max_age = max(0.0, max_age)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._miss_seconds = 0.0
+        self.pruned = 0
+        self._stored_since_prune = 0
+        self._last_prune = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, task TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "created_at REAL, PRIMARY KEY (model, task, text_hash))"
+        )
+        # created_at이 없던 이전 캐시 파일은 컬럼을 추가하고 기존 행은 지금 저장한 것으로 취급
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+        if "created_at" not in columns:
+            conn.execute("ALTER TABLE embeddings ADD COLUMN created_at REAL")
+            conn.execute("UPDATE embeddings SET created_at = ? WHERE created_at IS NULL", (time.time(),))
+        conn.commit()
+        self.prune()
+
+    def _connection(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 (WAL 모드로 여러 프로세스 동시 접근 허용)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, task: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """캐시에서 벡터 조회"""
+        found = {}
+        conn = self._connection()
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), LOOKUP_BATCH):
+            batch = unique[start:start + LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND task = ? AND text_hash IN ({placeholders})",
+                [self.model_name, task, *batch],
+            ).fetchall()
+            for text_hash, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[text_hash] = vector.tolist()
+        return found
+
+    def _store(self, task: str, items: Dict[str, List[float]]) -> None:
+        """캐시에 벡터 저장"""
+        if not items:
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR IGNORE INTO embeddings (model, task, text_hash, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(self.model_name, task, text_hash, array("f", vector).tobytes(), now)
+             for text_hash, vector in items.items()],
+        )
+        conn.commit()
+        with self._lock:
+            self._stored_since_prune += len(items)
+            due = (self._stored_since_prune >= PRUNE_EVERY_ROWS
+                   or time.monotonic() - self._last_prune >= PRUNE_INTERVAL)
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """max_age보다 오래된 행과 max_rows를 넘는 가장 오래된 행(rowid 순) 삭제, 삭제한 행 수 반환"""
+        with self._lock:
+            self._stored_since_prune = 0
+            self._last_prune = time.monotonic()
+        if not self.max_rows and not self.max_age:
+            return 0
+        conn = self._connection()
+        deleted = 0
+        try:
+            if self.max_age:
+                deleted += conn.execute(
+                    "DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.max_age,)
+                ).rowcount
+            if self.max_rows:
+                deleted += conn.execute(
+                    "DELETE FROM embeddings WHERE rowid <= "
+                    "(SELECT rowid FROM embeddings ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                    (self.max_rows,),
+                ).rowcount
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            # 다른 워커가 쓰는 중이라 잠겨 있으면 다음 주기에 다시 정리
+            conn.rollback()
+            logger.warning(f"임베딩 캐시 정리 실패: {e}")
+            return 0
+        if deleted:
+            logger.info(f"임베딩 캐시 정리: {deleted}개 삭제")
+            with self._lock:
+                self.pruned += deleted
+        return deleted
+
+    def _record(self, hits: int, misses: int, seconds: float = 0.0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self._miss_seconds += seconds
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """문서 임베딩 (캐시에 없는 텍스트만 원격 호출)"""
+        hashes = [self._hash(t) for t in texts]
+        found = self._lookup(TASK_DOCUMENT, hashes)
+
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in found:
+                missing.setdefault(text_hash, text)
+
+        seconds = 0.0
+        if missing:
+            started = time.perf_counter()
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            seconds = time.perf_counter() - started
+            new_items = dict(zip(missing.keys(), vectors))
+            self._store(TASK_DOCUMENT, new_items)
+            found.update(new_items)
+
+        self._record(len(texts) - len(missing), len(missing), seconds)
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """질의 임베딩 (캐시에 없을 때만 원격 호출)"""
+        text_hash = self._hash(text)
+        found = self._lookup(TASK_QUERY, [text_hash])
+        if text_hash in found:
+            self._record(1, 0)
+            return found[text_hash]
+
+        started = time.perf_counter()
+        vector = self.underlying.embed_query(text)
+        self._record(0, 1, time.perf_counter() - started)
+        self._store(TASK_QUERY, {text_hash: vector})
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """여러 질의 임베딩 (캐시에 없는 질의만 한 번에 원격 호출)"""
+        hashes = [self._hash(t) for t in texts]
+        found = self._lookup(TASK_QUERY, hashes)
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in found:
+                missing.setdefault(text_hash, text)
+
+        seconds = 0.0
+        if missing:
+            started = time.perf_counter()
+            vectors = embed_queries(self.underlying, list(missing.values()))
+            seconds = time.perf_counter() - started
+            new_items = dict(zip(missing.keys(), vectors))
+            self._store(TASK_QUERY, new_items)
+            found.update(new_items)
+
+        self._record(len(texts) - len(missing), len(missing), seconds)
+        return [found[h] for h in hashes]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """캐시 적중/미스 통계 (절약된 시간은 미스 평균 지연으로 추정)"""
+        with self._lock:
+            hits, misses, miss_seconds, pruned = self.hits, self.misses, self._miss_seconds, self.pruned
+        rows = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        avg_miss = miss_seconds / misses if misses else None
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else None,
+            "avg_miss_latency_ms": avg_miss * 1000 if avg_miss is not None else None,
+            "estimated_saved_seconds": hits * avg_miss if avg_miss is not None else None,
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "max_age": self.max_age,
+            "pruned": pruned,
+        }
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 질의 정규화 (문장부호/이모지 제거, 공백 정리, 끝 조사 제거)"""
+    text = unicodedata.normalize("NFC", text).lower()
+    # 문장부호(P*), 기호/이모지(S*), 서식 문자(Cf, 예: 이모지 결합 문자) 제거
+    text = "".join(" " if unicodedata.category(ch)[0] in "PS" or unicodedata.category(ch) == "Cf" else ch for ch in text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    word = text.rsplit(" ", 1)[-1]
+    if word in PARTICLE_KEEP_WORDS:
+        return text
+    for particle in TRAILING_PARTICLES:
+        if word.endswith(particle) and len(word) - len(particle) >= MIN_PARTICLE_STEM:
+            text = text[:-len(particle)].rstrip()
+            break
+    return text
+
+
+class QueryEmbeddingCache:
+    """정규화한 질의 기준의 프로세스 내 LRU 캐시 (선택적 TTL)"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(embeddings: Embeddings, query: str) -> Tuple[str, str]:
+        return getattr(embeddings, "model_name", type(embeddings).__name__), normalize_query(query)
+
+    def _get(self, key: Tuple[str, str], now: float, count_miss: bool = True) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl or now - entry[0] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if count_miss:
+                self.misses += 1
+        return None
+
+    def _put(self, key: Tuple[str, str], now: float, vector: List[float]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (now, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def peek(self, embeddings: Embeddings, query: str) -> Optional[List[float]]:
+        """캐시에 있는 벡터만 반환 (없으면 None, 이어서 get_or_embed* 로 임베딩하므로 미스는 세지 않음)"""
+        return self._get(self._key(embeddings, query), time.monotonic(), count_miss=False)
+
+    def get_or_embed(self, embeddings: Embeddings, query: str) -> List[float]:
+        """캐시에 있으면 반환하고, 없으면 임베딩 후 저장"""
+        key = self._key(embeddings, query)
+        now = time.monotonic()
+        vector = self._get(key, now)
+        if vector is None:
+            vector = embeddings.embed_query(query)
+            self._put(key, now, vector)
+        return vector
+
+    def get_or_embed_many(self, embeddings: Embeddings, queries: List[str]) -> List[List[float]]:
+        """여러 질의를 캐시에서 찾고, 없는 질의만 모아 한 번에 임베딩"""
+        keys = [self._key(embeddings, query) for query in queries]
+        now = time.monotonic()
+        vectors: Dict[Tuple[str, str], List[float]] = {}
+        missing: Dict[Tuple[str, str], str] = {}
+        for key, query in zip(keys, queries):
+            if key in vectors or key in missing:
+                continue
+            vector = self._get(key, now)
+            if vector is None:
+                missing[key] = query
+            else:
+                vectors[key] = vector
+        if missing:
+            for key, vector in zip(missing, embed_queries(embeddings, list(missing.values()))):
+                vectors[key] = vector
+                self._put(key, now, vector)
+        return [vectors[key] for key in keys]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """적중률 통계"""
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else None,
+            "size": size,
+            "max_size": self.max_size,
+        }
@@ -0,0 +1,112 @@
+# embedding_pipeline.py - 배치/동시성/요청 한도를 고려한 인덱싱용 임베딩 파이프라인
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """분당 요청 수를 제한하는 토큰 버킷 (429 응답 시 속도를 줄이고 성공 시 서서히 회복)"""
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.max_rate = requests_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> None:
+        """토큰이 생길 때까지 대기"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self) -> None:
+        """요청 한도 초과(429) 시 속도를 절반으로 낮춤"""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.max_rate / 60.0, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+        logger.warning(f"임베딩 요청 한도 초과: 요청 속도를 분당 {self.rate * 60:.1f}회로 낮춥니다.")
+
+    def recover(self) -> None:
+        """성공 시 속도를 조금씩 원래대로 회복"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Gemini 요청 한도 초과(429/ResourceExhausted) 오류인지 확인"""
+    if getattr(error, "code", None) == 429 or type(error).__name__ == "ResourceExhausted":
+        return True
+    message = str(error)
+    return "429" in message or "quota" in message.lower() or "rate limit" in message.lower()
+
+
+class EmbeddingPipeline:
+    """청크를 배치로 나눠 제한된 동시성으로 임베딩하고 실패한 배치는 재시도
+
+    임베딩 결과는 배치가 끝날 때마다 임베딩 캐시(SQLite)에 기록되므로,
+    빌드가 중간에 중단되더라도 다시 실행하면 완료된 배치는 원격 호출 없이 재사용됩니다.
+    """
+
+    def __init__(self, embeddings: Embeddings, batch_size: int = 100, max_workers: int = 4,
+                 requests_per_minute: float = 300, max_retries: int = 5):
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(requests_per_minute, burst=self.max_workers)
+
+    def _embed_batch(self, index: int, texts: List[str]) -> List[List[float]]:
+        """배치 하나를 임베딩 (지터가 있는 지수 백오프로 재시도)"""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                self.bucket.recover()
+                return vectors
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"임베딩 배치 {index} 실패 ({attempt + 1}회 시도): {e}")
+                    raise
+                if is_rate_limited(e):
+                    self.bucket.throttle()
+                delay = min(60.0, 2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"임베딩 배치 {index} 재시도 예정 ({attempt + 1}/{self.max_retries}, {delay:.1f}초 후): {e}")
+                time.sleep(delay)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """전체 텍스트 임베딩 (입력 순서 유지)"""
+        if not texts:
+            return []
+
+        started = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embed") as executor:
+            futures = [executor.submit(self._embed_batch, i, batch) for i, batch in enumerate(batches)]
+            vectors = [vector for future in futures for vector in future.result()]
+
+        elapsed = time.perf_counter() - started
+        logger.debug(
+            f"임베딩 완료: {len(texts)}개 청크, {len(batches)}개 배치, {elapsed:.2f}초 "
+            f"({len(texts) / elapsed if elapsed > 0 else 0:.1f} chunks/s)"
+        )
+        return vectors
@@ -0,0 +1,204 @@
+# faq_router.py - 신청 방법/준비 서류/모집 시기/일자리 유형 등 절차 질문을 LLM 없이 정해진 답변으로 응답
+import math
+import threading
+import unicodedata
+from collections import Counter, deque
+from typing import Any, Deque, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from latency_stats import Histogram, LatencyWindow
+from lexical_index import char_ngrams
+from phrase_automaton import PhraseAutomaton
+
+# 라우팅 점수(n-gram 유사도) 히스토그램 구간 (임계값 조정용)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+# 정해진 답변 끝에 붙이는 안내 문구
+ANSWER_CLOSING = "본인 상황(건강 상태, 희망 지역, 원하는 업무 등)을 알려주시면 맞는 일자리를 찾아드릴게요 😊"
+
+
+class FaqIntent(NamedTuple):
+    """절차 질문 의도 (keywords: 공백을 뺀 핵심 표현, examples: 대표 질문, answer: 정해진 답변)"""
+    name: str
+    keywords: Tuple[str, ...]
+    examples: Tuple[str, ...]
+    answer: str
+
+
+# 예전 지식 베이스(app copy.py)의 신청 방법 및 절차, 일자리 유형 내용으로 만든 답변
+FAQ_INTENTS = (
+    FaqIntent(
+        "apply_method",
+        ("신청방법", "신청하는방법", "신청절차", "접수방법", "지원방법", "어떻게신청", "어디서신청", "어디에신청",
+         "신청은어디", "신청하려면", "지원하려면", "참여하려면"),
+        ("신청 방법을 알려주세요", "노인 일자리는 어떻게 신청하나요?", "어디서 신청할 수 있나요?",
+         "신청 절차가 어떻게 되나요?", "일자리에 참여하려면 어떻게 해야 하나요?"),
+        """노인 일자리 신청 방법을 안내해 드릴게요 📝
+
+[신청 방법]
+1. 방문 신청: 거주지 시니어클럽, 노인복지관, 구청/동 행정복지센터 노인일자리 담당부서
+2. 온라인 신청: 노인일자리 통합정보시스템(www.seniorcity.go.kr), 지역별 노인일자리 홈페이지
+
+[신청 절차]
+신청서 작성 및 제출 → 서류 심사 → 면접 및 적성 검사 → 건강진단(필요시) → 선발 및 배치 → 교육 및 오리엔테이션 → 활동 시작""",
+    ),
+    FaqIntent(
+        "documents",
+        ("준비서류", "필요서류", "구비서류", "제출서류", "필요한서류", "서류는", "서류가", "서류를", "무엇을준비",
+         "뭘준비", "뭐준비", "챙겨야", "가져가야"),
+        ("준비 서류가 뭔가요?", "신청할 때 필요한 서류는 무엇인가요?", "어떤 서류를 준비해야 하나요?",
+         "신청하러 갈 때 뭘 챙겨가야 하나요?"),
+        """신청할 때 준비하실 서류예요 📂
+
+- 신분증 (주민등록증, 운전면허증 등)
+- 주민등록등본 (최근 3개월 이내)
+- 건강진단서 (해당 사업 참여시)
+- 자격증 또는 경력증명서 (해당자)
+- 통장사본 (급여 지급용)""",
+    ),
+    FaqIntent(
+        "recruit_period",
+        ("모집시기", "모집기간", "모집일정", "모집공고", "신청시기", "신청기간", "접수기간", "언제모집", "언제신청",
+         "언제까지신청", "언제부터신청", "언제뽑"),
+        ("모집 시기가 언제인가요?", "언제 신청할 수 있나요?", "신청 기간 알려주세요",
+         "노인 일자리는 언제 모집하나요?"),
+        """노인 일자리 모집 시기를 안내해 드릴게요 📅
+
+- 연중 수시 접수
+- 주요 모집시기: 2월, 8월
+- 사업마다 모집 기간이 다르니 시니어클럽이나 노인복지관의 모집 공고를 꼭 확인해주세요.""",
+    ),
+    FaqIntent(
+        "job_types",
+        ("일자리종류", "일자리유형", "일자리는어떤", "사업유형", "사업종류", "어떤종류", "종류가", "유형이", "유형은",
+         "공익활동형", "사회서비스형", "시장형", "취업알선형"),
+        ("노인 일자리 종류가 어떻게 되나요?", "어떤 유형의 일자리가 있나요?", "노인 일자리 사업 유형을 알려주세요",
+         "공익활동형이랑 사회서비스형은 뭐가 달라요?"),
+        """노인 일자리는 크게 네 가지 유형이 있어요 👵👴
+
+1. 공익활동형: 초등학교 급식지원, 교통안전 캠페인, 환경정비, 복지시설 지원 등 (월 30시간 내외, 월 27만원 내외 활동비)
+2. 사회서비스형: 가사간병, 시설환경 개선, 교육강사, 보육지원 등 (월 60시간 내외, 월 60~80만원)
+3. 시장형 사업단: 매점·카페 운영, 농산물 판매, 수공예품·전통식품 제조 등 (최저임금 이상, 수익에 따라 변동)
+4. 취업알선형: 민간기업 사무관리, 매장 판매, 경비, 청소·배달 등 (해당 기업 급여 기준, 4대 보험 가입 가능)
+
+모두 만 60세 이상이면 참여할 수 있고, 유형별로 우대 조건이 조금씩 달라요.""",
+    ),
+)
+
+
+def normalize(text: str) -> str:
+    """유니코드 정규화 후 소문자로 바꾸고 공백 제거 (키워드 매칭용)"""
+    return "".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+def _ngram_vector(text: str) -> Tuple[Counter, float]:
+    """띄어쓰기에 영향받지 않도록 공백을 뺀 문자열의 n-gram 빈도 벡터와 크기"""
+    counts = Counter(char_ngrams(normalize(text)))
+    return counts, math.sqrt(sum(count * count for count in counts.values()))
+
+
+def _cosine(a: Tuple[Counter, float], b: Tuple[Counter, float]) -> float:
+    if not a[1] or not b[1]:
+        return 0.0
+    small, large = (a[0], b[0]) if len(a[0]) <= len(b[0]) else (b[0], a[0])
+    return sum(count * large.get(gram, 0) for gram, count in small.items()) / (a[1] * b[1])
+
+
+class RouteDecision(NamedTuple):
+    """라우팅 결과 (intents: 정해진 답변으로 응답할 의도, 비어 있으면 RAG로 응답)
+
+    reason: faq(정해진 답변) / no_match(키워드 없음) / low_score(유사도 부족) 또는 호출한 쪽에서 정한 사유
+    """
+    intents: Tuple[str, ...]
+    reason: str
+    best_intent: Optional[str]
+    score: float
+    keywords: Tuple[str, ...]
+
+
+class FaqRouter:
+    """키워드 오토마톤과 대표 질문과의 문자 n-gram 유사도로 절차 질문을 분류
+
+    키워드가 있는 의도는 유사도가 min_similarity 이상이면, 키워드가 없어도 유사도가 high_similarity 이상이면
+    정해진 답변으로 응답합니다. 질문이 여러 의도에 해당하면(예: '신청 방법이랑 준비 서류') 답변을 이어 붙입니다.
+    모든 라우팅 결과를 사유별로 집계하고 점수 분포와 최근 결정을 남겨 임계값 조정에 사용합니다.
+    """
+
+    def __init__(self, intents: Sequence[FaqIntent] = FAQ_INTENTS, min_similarity: float = 0.3,
+                 high_similarity: float = 0.7, recent: int = 50):
+        self.intents = {intent.name: intent for intent in intents}
+        self.min_similarity = min_similarity
+        self.high_similarity = high_similarity
+        self._automaton = PhraseAutomaton(
+            (normalize(keyword), (normalize(keyword), intent.name)) for intent in intents for keyword in intent.keywords
+        )
+        self._examples = [(intent.name, _ngram_vector(example)) for intent in intents for example in intent.examples]
+        self._lock = threading.Lock()
+        self.decisions: Dict[str, int] = {}
+        self.served: Dict[str, int] = {name: 0 for name in self.intents}
+        self.scores = {'faq': Histogram(SCORE_BUCKETS), 'fallthrough': Histogram(SCORE_BUCKETS)}
+        self.latency = LatencyWindow()
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.intents) and self.min_similarity <= 1
+
+    def classify(self, query: str) -> RouteDecision:
+        """질문의 절차 질문 의도 분류 (원격 호출 없음)"""
+        if not self.enabled:
+            return RouteDecision((), 'disabled', None, 0.0, ())
+        found = self._automaton.find(normalize(query))
+        keywords = tuple(dict.fromkeys(keyword for keyword, _ in found))
+        matched = [name for name in self.intents if any(intent == name for _, intent in found)]
+
+        vector = _ngram_vector(query)
+        similarity: Dict[str, float] = {}
+        for name, example in self._examples:
+            similarity[name] = max(similarity.get(name, 0.0), _cosine(vector, example))
+        best_intent = max(similarity, key=similarity.get)
+        score = similarity[best_intent]
+
+        # 키워드가 있는 의도 중 하나라도 대표 질문과 충분히 비슷하면 키워드가 있는 의도 모두에 답하고,
+        # 키워드가 없으면 대표 질문과 아주 비슷한 의도에만 답함
+        if matched and max(similarity[name] for name in matched) >= self.min_similarity:
+            intents = tuple(matched)
+        else:
+            intents = tuple(name for name in self.intents if similarity[name] >= self.high_similarity)
+        if intents:
+            return RouteDecision(intents, 'faq', best_intent, score, keywords)
+        return RouteDecision((), 'low_score' if matched or score >= self.min_similarity else 'no_match',
+                             best_intent, score, keywords)
+
+    def answer(self, intents: Sequence[str]) -> str:
+        """의도별 정해진 답변을 이어 붙인 응답"""
+        return "\n\n".join([self.intents[name].answer for name in intents] + [ANSWER_CLOSING])
+
+    def record(self, query: str, decision: RouteDecision, elapsed: float) -> None:
+        """라우팅 결과 집계 (사유별 횟수, 점수 분포, 최근 결정)"""
+        self.latency.add(elapsed)
+        with self._lock:
+            self.decisions[decision.reason] = self.decisions.get(decision.reason, 0) + 1
+            for name in decision.intents:
+                self.served[name] += 1
+            self.scores['faq' if decision.intents else 'fallthrough'].add(decision.score)
+            self.recent.append({
+                'query': query[:50],
+                'reason': decision.reason,
+                'intents': list(decision.intents),
+                'best_intent': decision.best_intent,
+                'score': round(decision.score, 3),
+                'keywords': list(decision.keywords),
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        """사유별 라우팅 횟수, 의도별 응답 수, 점수 분포와 최근 결정"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'min_similarity': self.min_similarity,
+                'high_similarity': self.high_similarity,
+                'decisions': dict(self.decisions),
+                'served': dict(self.served),
+                'score_histogram': {name: histogram.summary() for name, histogram in self.scores.items()},
+                'latency': self.latency.summary(),
+                'recent': list(self.recent),
+            }
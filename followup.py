@@ -0,0 +1,140 @@
+# followup.py - 후속 질문 감지와 세션별 직전 검색 결과 캐시
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# '두 번째', '2번', '셋째' 등 앞 답변에서 몇 번째 항목을 가리키는 표현
+# ('세 번'처럼 횟수를 뜻하는 표현과 구분하기 위해 한글 수사는 '번째'가 붙은 경우만 인정)
+ORDINAL_PATTERN = re.compile(r"(첫|두|세|네|다섯)\s*번\s*째|(?<!\d)([1-9])\s*번(?:\s*째)?|(첫째|둘째|셋째|넷째|다섯째)")
+# 서수 바로 뒤에 와도 앞 답변의 항목을 가리키는 말 ('두 번째 거', '1번은요?'; '1번 출구', '5번 버스'는 제외)
+ORDINAL_TAIL = re.compile(
+    r"(?:거|것|꺼|걸|게|건|항목|일자리|직업|일)?(?:은요|는요|이요|도요|요|은|는|이|가|을|를|도|만)?"
+)
+ORDINAL_WORDS = {
+    "첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5,
+    "첫째": 1, "둘째": 2, "셋째": 3, "넷째": 4, "다섯째": 5,
+}
+# 앞 답변의 대상을 가리키는 지시어
+REFERENCE_WORDS = (
+    "그거", "그것", "그건", "그게", "그걸", "이거", "이것", "저거", "저것", "거기", "그곳",
+    "그 일", "그 직업", "그 일자리", "그중", "그 중", "방금", "아까", "위에",
+)
+# 같은 대상에 대해 더 묻는 표현
+ELABORATE_WORDS = ("자세히", "더 알려", "좀 더", "더 설명", "구체적", "예를 들", "그럼", "그러면")
+# 직전 답변이 아닌 새 대상을 찾는 표현 (있으면 후속 질문으로 보지 않고 다시 검색)
+NEW_TOPIC_WORDS = ("또 다른", "다른", "새로운")
+# 지시어가 있어도 이보다 긴 질문은 새 질문일 가능성이 높으므로 다시 검색 (추가 설명 요청은 더 짧은 질문만)
+MAX_REFERENCE_LENGTH = 30
+MAX_ELABORATE_LENGTH = 15
+
+
+class FollowUp(NamedTuple):
+    """후속 질문 종류 (ordinal: 몇 번째 항목, reference: 지시어, elaborate: 추가 설명 요청)"""
+    kind: str
+    ordinal: Optional[int] = None
+
+
+def detect_followup(query: str) -> Optional[FollowUp]:
+    """직전 답변을 가리키는 후속 질문이면 FollowUp, 아니면 None (규칙 기반, 원격 호출 없음)"""
+    text = " ".join(unicodedata.normalize("NFC", query).split())
+    if len(text) > MAX_REFERENCE_LENGTH or any(word in text for word in NEW_TOPIC_WORDS):
+        return None
+    for match in ORDINAL_PATTERN.finditer(text):
+        if not _standalone_ordinal(text[match.end():]):
+            continue
+        word = match.group(1) or match.group(2) or match.group(3)
+        return FollowUp("ordinal", int(word) if word.isdigit() else ORDINAL_WORDS[word])
+    if "마지막" in text:
+        return FollowUp("ordinal", -1)
+    if any(word in text for word in REFERENCE_WORDS):
+        return FollowUp("reference")
+    if len(text) <= MAX_ELABORATE_LENGTH and any(word in text for word in ELABORATE_WORDS):
+        return FollowUp("elaborate")
+    return None
+
+
+def _standalone_ordinal(rest: str) -> bool:
+    """서수 뒤 첫 단어가 없거나 조사/'거' 등뿐이면 True ('1번 출구'처럼 명사가 오면 False)"""
+    words = rest.split(maxsplit=1)
+    if not words:
+        return True
+    return ORDINAL_TAIL.fullmatch(re.sub(r"[^\w]", "", words[0])) is not None
+
+
+class RetrievalResult(NamedTuple):
+    """세션의 직전 검색 결과 (인덱스 버전, 벡터 위치, 문서 ID, 점수는 순위순)"""
+    index_version: Optional[str]
+    positions: List[int]
+    doc_ids: List[str]
+    scores: List[float]
+    query: str
+    created_at: float
+
+
+class SessionRetrievalCache:
+    """세션별 직전 검색 결과 (최근 사용한 max_sessions개 세션, ttl초 이내만 사용)"""
+
+    def __init__(self, max_sessions: int = 1024, ttl: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, RetrievalResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, index_version: Optional[str]) -> Optional[RetrievalResult]:
+        """같은 인덱스로 검색한 직전 결과 (없거나 만료되었으면 None)"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry.index_version != index_version or (self.ttl and time.time() - entry.created_at > self.ttl):
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry
+
+    def store(self, session_id: str, index_version: Optional[str], hits: List[Tuple[int, float]],
+              doc_ids: List[str], query: str) -> None:
+        if not session_id or self.max_sessions <= 0 or not hits:
+            return
+        entry = RetrievalResult(
+            index_version, [position for position, _ in hits], doc_ids,
+            [score for _, score in hits], query, time.time()
+        )
+        with self._lock:
+            self._entries[session_id] = entry
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.max_sessions > 0,
+                'sessions': len(self._entries),
+                'max_sessions': self.max_sessions,
+                'ttl': self.ttl,
+            }
+
+
+def order_by_mention(titles: Sequence[str], answer: str) -> List[int]:
+    """답변에서 먼저 언급된 순서로 정렬한 titles의 인덱스 (언급되지 않은 항목은 원래 순서로 뒤에 둠)"""
+    found = [(answer.find(title), i) for i, title in enumerate(titles) if title and title in answer]
+    mentioned = [i for _, i in sorted(found)]
+    return mentioned + [i for i in range(len(titles)) if i not in mentioned]
+
+
+def pick_ordinal(titles: Sequence[str], answer: str, ordinal: int) -> Optional[int]:
+    """직전 답변에서 ordinal번째(-1이면 마지막)로 안내한 항목의 인덱스 (범위를 벗어나면 None)
+
+    답변은 검색 순위와 다른 순서로 항목을 소개할 수 있으므로 답변에 직업명이 나온 순서를 기준으로 합니다.
+    """
+    order = order_by_mention(titles, answer)
+    if ordinal == -1:
+        mentioned = [i for i in order if titles[i] and titles[i] in answer]
+        return (mentioned or order)[-1] if order else None
+    if 1 <= ordinal <= len(order):
+        return order[ordinal - 1]
+    return None
@@ -0,0 +1,156 @@
+# index_store.py - FAISS 벡터 인덱스 디스크 저장/로드
+import hashlib
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+
+try:
+    import fcntl
+except ImportError:  # Windows 개발 환경에서는 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 5
+
+
+def file_sha256(path: str) -> str:
+    """파일 내용의 sha256 해시 계산"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(csv_paths: List[str], chunk_size: int, chunk_overlap: int,
+                   embedding_backend: str, embedding_model: str, ingest_mode: str,
+                   metadata_schema: Dict[str, str], index_type: str, index_compression: str) -> Dict[str, Any]:
+    """인덱스 재사용 여부를 판단하기 위한 매니페스트 생성"""
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        "files": {os.path.basename(p): file_sha256(p) for p in sorted(csv_paths)},
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_backend": embedding_backend,
+        "embedding_model": embedding_model,
+        "ingest_mode": ingest_mode,
+        "metadata_schema": metadata_schema,
+        "index_type": index_type,
+        "index_compression": index_compression,
+    }
+
+
+def text_sha256(text: str) -> str:
+    """문자열의 sha256 해시 계산"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# 구축 결과로 기록되는 항목 (설정 비교와 인덱스 버전 계산에서 제외)
+BUILD_RESULT_KEYS = ("rows", "index")
+# 검색 인덱스 종류 설정 (바뀌어도 임베딩은 그대로 두고 검색 인덱스만 다시 구성)
+SEARCH_INDEX_KEYS = ("index_type", "index_compression")
+
+
+def files_unchanged(saved: Optional[Dict[str, Any]], manifest: Dict[str, Any]) -> bool:
+    """CSV 파일과 설정이 모두 그대로인지 확인 (행 정보는 비교하지 않음)"""
+    if not saved:
+        return False
+    return {k: v for k, v in saved.items() if k not in BUILD_RESULT_KEYS} == manifest
+
+
+def same_build_config(saved: Optional[Dict[str, Any]], manifest: Dict[str, Any]) -> bool:
+    """기존 인덱스에 행 단위 증분 반영이 가능한지 확인 (파일 해시 외 설정 비교)"""
+    if not saved or "rows" not in saved:
+        return False
+    return all(saved.get(k) == manifest.get(k) for k in manifest
+               if k not in ("files",) + BUILD_RESULT_KEYS + SEARCH_INDEX_KEYS)
+
+
+def row_key(doc) -> str:
+    """행 매니페스트 키의 기본 형태 (파일명:직업명, 직업명이 없으면 행 번호)"""
+    return f"{os.path.basename(doc.metadata.get('source', ''))}:{doc.metadata.get('직업명', doc.metadata.get('row'))}"
+
+
+def row_file(key: str) -> str:
+    """행 매니페스트 키의 파일명"""
+    return key.split(":", 1)[0]
+
+
+def diff_rows(old_rows: Dict[str, Dict[str, Any]],
+              new_rows: Dict[str, Dict[str, Any]]) -> Tuple[List[str], List[str], List[str]]:
+    """행 매니페스트 비교 결과를 (추가, 변경, 삭제) 행 키 목록으로 반환"""
+    added = [k for k in new_rows if k not in old_rows]
+    changed = [k for k in new_rows if k in old_rows and old_rows[k]["hash"] != new_rows[k]["hash"]]
+    removed = [k for k in old_rows if k not in new_rows]
+    return added, changed, removed
+
+
+def index_version(manifest: Dict[str, Any]) -> str:
+    """매니페스트(CSV 해시와 설정)로부터 인덱스 버전 문자열 생성"""
+    content = json.dumps({k: v for k, v in manifest.items() if k not in BUILD_RESULT_KEYS}, sort_keys=True)
+    return text_sha256(content)[:12]
+
+
+@contextmanager
+def index_build_lock(index_dir: str):
+    """인덱스 구축/로드를 여러 워커 프로세스 사이에서 직렬화하는 파일 잠금"""
+    if fcntl is None:
+        yield
+        return
+    parent = os.path.dirname(index_dir)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(f"{index_dir}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    """저장된 매니페스트 읽기 (없거나 손상되었으면 None)"""
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"인덱스 매니페스트를 읽을 수 없습니다: {e}")
+        return None
+
+
+def load_index(index_dir: str, embeddings) -> FAISS:
+    """디스크에 저장된 FAISS 인덱스 로드
+
+    docstore는 pickle로 저장되므로 langchain-community 0.0.27부터는 명시적 허용이 필요합니다.
+    이 폴더는 save_index()로 이 서비스가 직접 쓴 파일만 담으므로 역직렬화를 허용합니다.
+    """
+    return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+
+
+def save_index(vectorstore: FAISS, index_dir: str, manifest: Dict[str, Any]) -> None:
+    """FAISS 인덱스와 매니페스트를 임시 폴더에 쓴 뒤 교체하여 저장"""
+    tmp_dir = f"{index_dir}.tmp"
+    old_dir = f"{index_dir}.old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    vectorstore.save_local(tmp_dir)
+    # 매니페스트는 마지막에 기록하여 인덱스 파일이 모두 쓰인 경우에만 유효하도록 함
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(index_dir):
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
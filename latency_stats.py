@@ -0,0 +1,73 @@
+# latency_stats.py - 최근 요청의 지연 시간 백분위수 통계와 구간별 히스토그램
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class LatencyWindow:
+    """최근 size개 지연 시간(초)을 보관하여 평균/백분위수 계산"""
+
+    def __init__(self, size: int = 1000):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """p 백분위수(초), 표본이 없으면 None"""
+        with self._lock:
+            samples = list(self._samples)
+        return float(np.percentile(samples, p)) if samples else None
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """건수와 밀리초 단위 평균/p50/p95/최대값"""
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64)
+            count = self.count
+        if samples.size == 0:
+            return {'count': count, 'avg_ms': None, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+        return {
+            'count': count,
+            'avg_ms': round(float(samples.mean()) * 1000, 1),
+            'p50_ms': round(float(np.percentile(samples, 50)) * 1000, 1),
+            'p95_ms': round(float(np.percentile(samples, 95)) * 1000, 1),
+            'max_ms': round(float(samples.max()) * 1000, 1),
+        }
+
+
+class Histogram:
+    """값을 구간별로 세는 히스토그램 (buckets: 오름차순 구간 상한, 마지막 구간은 상한 없음)"""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        index = int(np.searchsorted(self.buckets, value, side='left'))
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def summary(self) -> Dict[str, object]:
+        """건수/합계/평균과 구간 순서대로의 개수 (upper: 구간 상한, 마지막 구간은 None)"""
+        with self._lock:
+            counts = list(self._counts)
+            count, total = self.count, self.total
+        return {
+            'count': count,
+            'sum': round(total, 3),
+            'avg': round(total / count, 3) if count else None,
+            'buckets': [
+                {'upper': upper, 'count': n} for upper, n in zip(self.buckets + [None], counts)
+            ],
+        }
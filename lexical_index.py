@@ -0,0 +1,99 @@
+# lexical_index.py - 한국어 문자 n-gram BM25 색인 (원격 호출 없는 로컬 검색)
+import logging
+import math
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[0-9A-Za-z가-힣]+")
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = (2, 3)) -> List[str]:
+    """단어별 문자 bigram/trigram 목록 (n보다 짧은 단어는 단어 그대로 사용)"""
+    grams = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if len(token) < min(sizes):
+            grams.append(token)
+            continue
+        for n in sizes:
+            grams.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return grams
+
+
+class BM25Index:
+    """벡터 위치(i) 순서의 문서 텍스트로 만든 BM25 역색인"""
+
+    def __init__(self, vectorstore, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        started = time.perf_counter()
+        self.vectorstore = vectorstore
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for position, text in enumerate(texts):
+            grams = char_ngrams(text)
+            lengths[position] = len(grams)
+            for gram in grams:
+                entry = postings.setdefault(gram, {})
+                entry[position] = entry.get(position, 0) + 1
+
+        self.avgdl = float(lengths.mean()) if self.size else 0.0
+        # 문서 길이 정규화 항을 미리 계산: k1 * (1 - b + b * dl / avgdl)
+        self.norm = k1 * (1 - b + b * lengths / self.avgdl) if self.avgdl else np.full(self.size, k1, dtype=np.float32)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        for gram, entry in postings.items():
+            df = len(entry)
+            self.idf[gram] = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            self.postings[gram] = (
+                np.fromiter(entry.keys(), dtype=np.int64, count=df),
+                np.fromiter(entry.values(), dtype=np.float32, count=df),
+            )
+        logger.info(f"BM25 색인 생성 완료: {self.size}개 문서, {len(self.postings)}개 n-gram ({time.perf_counter() - started:.2f}초)")
+
+    def search(self, query: str, k: int,
+               mask: Optional[np.ndarray] = None) -> Tuple[List[Tuple[int, float]], float]:
+        """질의로 검색하여 ((위치, 점수) 목록, 확신도) 반환
+
+        확신도는 1위 점수를 "질의의 모든 n-gram을 포함한 평균 길이 문서"의 점수로 나눈 값이며,
+        2위와의 점수 차가 작으면(모호한 결과) 0으로 봅니다.
+        """
+        grams = char_ngrams(query)
+        if not grams or not self.size:
+            return [], 0.0
+
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            counts[gram] = counts.get(gram, 0) + 1
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        ideal = 0.0
+        for gram, count in counts.items():
+            idf = self.idf.get(gram)
+            if idf is None:
+                # 색인에 없는 n-gram도 이상적 점수에는 포함 (일치하지 않은 부분만큼 확신도를 낮춤)
+                idf = math.log(1 + (self.size + 0.5) / 0.5)
+            else:
+                positions, tfs = self.postings[gram]
+                scores[positions] += idf * tfs * (self.k1 + 1) / (tfs + self.norm[positions])
+            ideal += idf * count * (self.k1 + 1) / (count + self.k1)
+
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return [], 0.0
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+        hits = [(int(p), float(scores[p])) for p in top]
+
+        confidence = min(1.0, hits[0][1] / ideal) if ideal > 0 else 0.0
+        if len(hits) > 1 and hits[1][1] > hits[0][1] * 0.8:
+            confidence = 0.0
+        return hits, confidence
@@ -0,0 +1,82 @@
+# metadata_index.py - 벡터 위치 순서로 정렬된 메타데이터 컬럼 배열
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataColumns:
+    """FAISS 벡터 위치(i)별 메타데이터를 컬럼 단위 배열로 보관
+
+    str/category 컬럼은 값 목록(vocab)과 int32 코드 배열(-1은 값 없음)로,
+    int 컬럼은 int64 배열과 값 존재 여부 배열로 저장합니다.
+    """
+
+    def __init__(self, vectorstore, schema: Dict[str, str]):
+        self.vectorstore = vectorstore
+        self.schema = schema
+        self.size = vectorstore.index.ntotal
+        self.vocab: Dict[str, List[str]] = {}
+        self.codes: Dict[str, np.ndarray] = {}
+        self.numbers: Dict[str, np.ndarray] = {}
+        self.present: Dict[str, np.ndarray] = {}
+        self._value_masks: Dict[tuple, np.ndarray] = {}
+
+        metadatas = []
+        for position in range(self.size):
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+            metadatas.append(doc.metadata if hasattr(doc, "metadata") else {})
+
+        for col, col_type in schema.items():
+            values = [metadata.get(col) for metadata in metadatas]
+            if col_type == "int":
+                self.present[col] = np.array([v is not None for v in values], dtype=bool)
+                self.numbers[col] = np.array([v if v is not None else 0 for v in values], dtype=np.int64)
+            else:
+                lookup: Dict[str, int] = {}
+                codes = np.full(self.size, -1, dtype=np.int32)
+                for position, value in enumerate(values):
+                    if value is None:
+                        continue
+                    codes[position] = lookup.setdefault(value, len(lookup))
+                self.vocab[col] = list(lookup)
+                self.codes[col] = codes
+
+    def value(self, position: int, column: str) -> Optional[Any]:
+        """위치 position의 컬럼 값"""
+        if column in self.numbers:
+            return int(self.numbers[column][position]) if self.present[column][position] else None
+        code = self.codes[column][position]
+        return self.vocab[column][code] if code >= 0 else None
+
+    def value_mask(self, column: str, value: str) -> np.ndarray:
+        """범주형 컬럼 값별 불리언 마스크 (역색인, 처음 요청 시 만들어 재사용)"""
+        key = (column, value)
+        mask = self._value_masks.get(key)
+        if mask is None:
+            vocab = self.vocab.get(column, [])
+            if value in vocab:
+                mask = self.codes[column] == vocab.index(value)
+            else:
+                mask = np.zeros(self.size, dtype=bool)
+            self._value_masks[key] = mask
+        return mask
+
+    def mask(self, constraints: Dict[str, Set[str]]) -> np.ndarray:
+        """조건을 만족하는 위치 마스크 (컬럼 간 AND, 같은 컬럼의 값끼리는 OR)"""
+        result = np.ones(self.size, dtype=bool)
+        for column, values in constraints.items():
+            column_mask = np.zeros(self.size, dtype=bool)
+            for value in values:
+                column_mask |= self.value_mask(column, value)
+            result &= column_mask
+        return result
+
+    def summary(self) -> Dict[str, int]:
+        """컬럼별 고유값(범주형) 또는 값이 있는 행 수(숫자형)"""
+        summary = {col: len(vocab) for col, vocab in self.vocab.items()}
+        summary.update({col: int(present.sum()) for col, present in self.present.items()})
+        return summary
+
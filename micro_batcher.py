@@ -0,0 +1,163 @@
+# micro_batcher.py - 동시에 들어온 질의를 모아 임베딩/벡터 검색을 한 번에 처리
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from deadline import DeadlineExceeded
+from embedding_cache import QueryEmbeddingCache
+from retrieval import vector_search, vector_search_batch
+
+logger = logging.getLogger(__name__)
+
+
+class _Request:
+    """배치에 들어갈 질의 하나와 결과를 기다리는 이벤트"""
+
+    __slots__ = ("vectorstore", "query", "k", "mask", "submitted_at", "done", "result", "vector", "error")
+
+    def __init__(self, vectorstore, query: str, k: int, mask: Optional[np.ndarray]):
+        self.vectorstore = vectorstore
+        self.query = query
+        self.k = k
+        self.mask = mask
+        self.submitted_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result: List[Tuple[int, float]] = []
+        self.vector: Optional[List[float]] = None
+        self.error: Optional[BaseException] = None
+
+
+class RetrievalBatcher:
+    """여러 요청 스레드의 질의를 최대 max_batch개, 최대 max_wait초 동안 모아 처리
+
+    모은 질의는 임베딩 API 한 번, 조건(mask)이 없는 질의끼리는 FAISS 검색 한 번으로 처리한 뒤
+    각 요청에 결과를 돌려줍니다. 요청이 하나뿐이어도 첫 질의 이후 최대 max_wait만큼만 기다립니다.
+    질의 임베딩 캐시에 이미 있는 질의는 배치를 기다리지 않고 요청 스레드에서 바로 검색합니다.
+    """
+
+    def __init__(self, query_cache: QueryEmbeddingCache, max_batch: int = 16, max_wait: float = 0.005):
+        self.query_cache = query_cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.queries = 0
+        self.max_seen = 0
+        self.cached = 0
+        self._wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1 and self.max_wait > 0
+
+    def search(self, vectorstore, query: str, k: int, mask: Optional[np.ndarray] = None,
+               timeout: Optional[float] = None) -> Tuple[List[Tuple[int, float]], List[float]]:
+        """질의를 임베딩하여 벡터 검색하고 ((위치, 거리) 목록, 질의 벡터) 반환
+        (다른 요청과 함께 배치로 처리되며, 오류는 호출한 쪽으로 전달)
+
+        timeout초 안에 결과가 없으면 DeadlineExceeded를 발생시킵니다 (배치 처리 자체는 계속 진행).
+        """
+        if not self.enabled:
+            vector = self.query_cache.get_or_embed(vectorstore.embedding_function, query)
+            return vector_search(vectorstore, vector, k, mask), vector
+
+        # 캐시에 있는 질의는 원격 임베딩 배치 뒤에 줄 세우지 않음
+        vector = self.query_cache.peek(vectorstore.embedding_function, query)
+        if vector is not None:
+            with self._stats_lock:
+                self.cached += 1
+            return vector_search(vectorstore, vector, k, mask), vector
+
+        self._ensure_worker()
+        request = _Request(vectorstore, query, k, mask)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise DeadlineExceeded("질의 임베딩", time.perf_counter() - request.submitted_at)
+        if request.error is not None:
+            raise request.error
+        if mask is not None:
+            # 조건(mask)이 있는 질의는 질의마다 허용 위치가 다르므로 임베딩만 배치로 하고 검색은 요청 스레드에서
+            return vector_search(vectorstore, request.vector, k, mask), request.vector
+        return request.result, request.vector
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='rag-retrieval-batcher', daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        """첫 질의가 도착하면 max_wait 동안(또는 max_batch개가 찰 때까지) 더 모아서 처리"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[_Request]) -> None:
+        started = time.perf_counter()
+        # 인덱스 교체 중에는 서로 다른 인덱스의 질의가 섞일 수 있으므로 인덱스별로 처리
+        groups: Dict[int, List[_Request]] = {}
+        for request in batch:
+            groups.setdefault(id(request.vectorstore), []).append(request)
+        for requests in groups.values():
+            try:
+                self._search_group(requests)
+            except Exception as e:
+                for request in requests:
+                    request.error = e
+
+        with self._stats_lock:
+            self.batches += 1
+            self.queries += len(batch)
+            self.max_seen = max(self.max_seen, len(batch))
+            self._wait_seconds += sum(started - request.submitted_at for request in batch)
+        for request in batch:
+            request.done.set()
+
+    def _search_group(self, requests: List[_Request]) -> None:
+        vectorstore = requests[0].vectorstore
+        vectors = self.query_cache.get_or_embed_many(
+            vectorstore.embedding_function, [request.query for request in requests]
+        )
+        for request, vector in zip(requests, vectors):
+            request.vector = vector
+        plain = [(request, vector) for request, vector in zip(requests, vectors) if request.mask is None]
+        if plain:
+            k = max(request.k for request, _ in plain)
+            results = vector_search_batch(vectorstore, [vector for _, vector in plain], k)
+            for (request, _), hits in zip(plain, results):
+                request.result = hits[:request.k]
+
+    def stats(self) -> Dict[str, Any]:
+        """배치 크기와 대기 시간 통계"""
+        with self._stats_lock:
+            batches, queries, max_seen, wait = self.batches, self.queries, self.max_seen, self._wait_seconds
+            cached = self.cached
+        return {
+            'enabled': self.enabled,
+            'batches': batches,
+            'queries': queries,
+            'avg_batch_size': queries / batches if batches else None,
+            'max_batch_size': max_seen,
+            'cached_inline': cached,
+            'avg_wait_ms': wait / queries * 1000 if queries else None,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+        }
@@ -0,0 +1,50 @@
+# phrase_automaton.py - 여러 표현을 한 번의 순회로 찾는 Aho-Corasick 자동자 (조건 추출, FAQ 라우터 공용)
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class PhraseAutomaton:
+    """여러 표현을 한 번의 순회로 찾는 Aho-Corasick 자동자"""
+
+    def __init__(self, phrases: Iterable[Tuple[str, object]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # 상태별 (표현 길이, payload) 목록 - 길이로 일치 구간을 복원
+        self.output: List[List[Tuple[int, object]]] = [[]]
+
+        for phrase, payload in phrases:
+            state = 0
+            for ch in phrase:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state].append((len(phrase), payload))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text: str) -> List[object]:
+        """text에 등장하는 모든 표현의 payload 목록"""
+        return [payload for _, _, payload in self.find_spans(text)]
+
+    def find_spans(self, text: str) -> List[Tuple[int, int, object]]:
+        """text에 등장하는 모든 표현의 (시작, 끝, payload) 목록"""
+        found = []
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            found.extend((end - length, end, payload) for length, payload in self.output[state])
+        return found
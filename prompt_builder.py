@@ -0,0 +1,143 @@
+# prompt_builder.py - 토큰 예산 안에서 지시문/검색 결과/이전 대화로 프롬프트 구성
+import math
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# 영문/숫자/한글 연속 구간, 공백 연속 구간, 그 밖의 한 글자 단위로 나눔
+TOKEN_PIECES = re.compile(r"[A-Za-z]+|[0-9]+|[가-힣]+|\s+|.", re.S)
+# 토큰 하나에 들어가는 대략적인 글자 수 (Gemini 토크나이저 기준 추정치, 실제보다 약간 많게 추정)
+CHARS_PER_TOKEN = {'latin': 4.0, 'digit': 3.0, 'hangul': 1.5}
+# 잘라낸 텍스트 끝에 붙이는 표시
+ELLIPSIS = "…"
+
+
+def _piece_tokens(piece: str) -> int:
+    first = piece[0]
+    if first.isspace():
+        # 공백 하나는 앞뒤 단어 토큰에 붙지만, 들여쓰기처럼 연속된 공백은 별도 토큰이 됨
+        return math.ceil((len(piece) - 1) / CHARS_PER_TOKEN['latin'])
+    if first.isascii() and first.isalpha():
+        return math.ceil(len(piece) / CHARS_PER_TOKEN['latin'])
+    if first.isdigit():
+        return math.ceil(len(piece) / CHARS_PER_TOKEN['digit'])
+    if '가' <= first <= '힣':
+        return math.ceil(len(piece) / CHARS_PER_TOKEN['hangul'])
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """텍스트의 토큰 수 추정 (원격 호출 없이 글자 종류별 평균으로 계산)"""
+    return sum(_piece_tokens(piece) for piece in TOKEN_PIECES.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """추정 토큰 수가 max_tokens를 넘지 않도록 뒷부분을 잘라냄"""
+    if max_tokens <= 0:
+        return ""
+    used = 0
+    for match in TOKEN_PIECES.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + ELLIPSIS
+    return text
+
+
+def compact_whitespace(text: str) -> str:
+    """줄마다 앞뒤 공백과 연속 공백을 정리하고 빈 줄 제거"""
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class BuiltPrompt(NamedTuple):
+    """완성된 프롬프트와 구성 통계"""
+    text: str
+    tokens: int
+    sections: Dict[str, int]
+    context_rows: int
+    dropped_rows: int
+    history_turns: int
+    dropped_turns: int
+
+
+class PromptBuilder:
+    """고정된 토큰 예산을 지시문, 검색된 행, 이전 대화에 나눠 프롬프트 구성
+
+    지시문과 사용자 질문은 항상 포함하고, 남은 예산은 가치가 높은 순서로 채웁니다:
+    1) 검색 1순위 행 (예산이 부족하면 잘라서 포함) 2) 가장 최근 대화 3) 세션 요약 4) 나머지 검색 행(순위순)
+    5) 그 이전 대화(최근순). 예산에 들어가지 않는 항목은 가치가 낮은 것부터 빠집니다.
+    이전 대화의 챗봇 답변은 history_answer_tokens 이내로 줄여서 넣습니다.
+    """
+
+    def __init__(self, header: str, guidelines: str, budget: int = 2000, history_answer_tokens: int = 150):
+        self.header = compact_whitespace(header)
+        self.guidelines = compact_whitespace(guidelines)
+        self.budget = budget
+        self.history_answer_tokens = history_answer_tokens
+
+    def build(self, user_query: str, context_rows: Sequence[str],
+              history: Sequence[Tuple[str, str]], summary: str = '') -> BuiltPrompt:
+        """context_rows: 검색 순위순 행, history: 오래된 것부터 (사용자 메시지, 챗봇 답변) 목록,
+        summary: history 이전 대화의 요약"""
+        query = compact_whitespace(user_query)
+        fixed = "\n\n".join([
+            self.header, "관련 정보 (CSV 파일에서 검색된 내용):", "이전 대화:", f"사용자 질문: {query}", self.guidelines
+        ])
+        remaining = self.budget - estimate_tokens(fixed)
+
+        rows = [compact_whitespace(row) for row in context_rows]
+        turns = [self._render_turn(user, bot) for user, bot in history]
+        row_cost = [estimate_tokens(row) for row in rows]
+        turn_cost = [estimate_tokens(turn) for turn in turns]
+
+        kept_rows: List[Optional[str]] = [None] * len(rows)
+        kept_turns: List[Optional[str]] = [None] * len(turns)
+        if rows:
+            kept_rows[0] = rows[0] if row_cost[0] <= remaining else truncate_tokens(rows[0], max(remaining, 0))
+            remaining -= min(row_cost[0], max(remaining, 0))
+        # 가장 최근 대화부터 이어서 넣다가 들어가지 않으면 그 이전 대화는 모두 제외 (대화 흐름이 끊기지 않도록)
+        newest_first = list(range(len(turns)))[::-1]
+        if newest_first and turn_cost[newest_first[0]] <= remaining:
+            kept_turns[newest_first[0]] = turns[newest_first[0]]
+            remaining -= turn_cost[newest_first[0]]
+        summary_text = f"대화 요약: {compact_whitespace(summary)}" if summary.strip() else ""
+        summary_cost = estimate_tokens(summary_text)
+        if summary_cost <= remaining:
+            remaining -= summary_cost
+        else:
+            summary_text = ""
+        for i in range(1, len(rows)):
+            if row_cost[i] <= remaining:
+                kept_rows[i] = rows[i]
+                remaining -= row_cost[i]
+        if kept_turns and kept_turns[newest_first[0]] is not None:
+            for i in newest_first[1:]:
+                if turn_cost[i] > remaining:
+                    break
+                kept_turns[i] = turns[i]
+                remaining -= turn_cost[i]
+
+        context = "\n".join(row for row in kept_rows if row)
+        history_text = "\n".join(turn for turn in [summary_text] + kept_turns if turn)
+        sections = {
+            'instructions': estimate_tokens(self.header) + estimate_tokens(self.guidelines),
+            'context': estimate_tokens(context),
+            'history': estimate_tokens(history_text),
+            'query': estimate_tokens(query),
+        }
+        text = "\n\n".join([
+            self.header,
+            f"관련 정보 (CSV 파일에서 검색된 내용):\n{context}",
+            f"이전 대화:\n{history_text}",
+            f"사용자 질문: {query}",
+            self.guidelines,
+        ])
+        context_count = sum(1 for row in kept_rows if row)
+        turn_count = sum(1 for turn in kept_turns if turn)
+        return BuiltPrompt(
+            text, estimate_tokens(text), sections,
+            context_count, len(rows) - context_count, turn_count, len(turns) - turn_count
+        )
+
+    def _render_turn(self, user_message: str, bot_response: str) -> str:
+        answer = truncate_tokens(compact_whitespace(bot_response), self.history_answer_tokens)
+        return f"사용자: {compact_whitespace(user_message)}\n챗봇: {answer}"
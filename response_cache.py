@@ -0,0 +1,140 @@
+# response_cache.py - 의미 기반 응답 캐시 (비슷한 질문에는 LLM 호출 없이 이전 답변 재사용)
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def unit_vector(vector: Sequence[float]) -> np.ndarray:
+    """코사인 유사도 계산용 L2 정규화 벡터"""
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm > 0 else array
+
+
+class CachedResponse:
+    """캐시된 답변 하나와 적중 통계"""
+
+    def __init__(self, query: str, vector: np.ndarray, doc_ids: FrozenSet[str], answer: str):
+        self.query = query
+        self.vector = vector
+        self.doc_ids = doc_ids
+        self.answer = answer
+        self.created_at = time.time()
+        self.hits = 0
+        self.last_hit_at: Optional[float] = None
+
+
+class SemanticResponseCache:
+    """(질의 임베딩, 검색된 문서 ID 집합) 기준의 응답 캐시
+
+    검색된 문서 집합이 같고 질의 임베딩의 코사인 유사도가 threshold 이상이면 같은 질문으로 봅니다.
+    인덱스 버전이 바뀌면 전체를 비우고, 크기(LRU)와 TTL로 오래된 답변을 내보냅니다.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 3600, threshold: float = 0.95):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.index_version: Optional[str] = None
+        self._entries: "OrderedDict[int, CachedResponse]" = OrderedDict()
+        self._by_docs: Dict[FrozenSet[str], List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, index_version: Optional[str]) -> None:
+        """인덱스 버전이 바뀌었으면 캐시 전체 무효화 (잠금 안에서 호출)"""
+        if index_version == self.index_version:
+            return
+        if self._entries:
+            logger.info(f"인덱스 버전 변경({self.index_version} -> {index_version}): 응답 캐시 {len(self._entries)}개 무효화")
+            self.invalidations += 1
+        self._entries.clear()
+        self._by_docs.clear()
+        self.index_version = index_version
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        ids = self._by_docs.get(entry.doc_ids, [])
+        if entry_id in ids:
+            ids.remove(entry_id)
+        if not ids:
+            self._by_docs.pop(entry.doc_ids, None)
+
+    def lookup(self, index_version: Optional[str], vector: Sequence[float],
+               doc_ids: FrozenSet[str]) -> Optional[CachedResponse]:
+        """조건에 맞는 캐시 답변 (없으면 None)"""
+        query = unit_vector(vector)
+        now = time.time()
+        with self._lock:
+            self._check_version(index_version)
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._by_docs.get(doc_ids, [])):
+                entry = self._entries[entry_id]
+                if self.ttl and now - entry.created_at >= self.ttl:
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(query, entry.vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            entry = self._entries[best_id]
+            self._entries.move_to_end(best_id)
+            entry.hits += 1
+            entry.last_hit_at = now
+            self.hits += 1
+        logger.info(f"응답 캐시 적중 (유사도 {best_score:.3f}, 원 질문: {entry.query})")
+        return entry
+
+    def store(self, index_version: Optional[str], query: str, vector: Sequence[float],
+              doc_ids: FrozenSet[str], answer: str) -> None:
+        """답변 저장 (가장 오래 사용되지 않은 답변부터 내보냄)"""
+        if self.max_size <= 0:
+            return
+        entry = CachedResponse(query, unit_vector(vector), doc_ids, answer)
+        with self._lock:
+            self._check_version(index_version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._by_docs.setdefault(doc_ids, []).append(entry_id)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        """적중률과 답변별 적중 통계 (적중 많은 순 top개)"""
+        now = time.time()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            entries = sorted(self._entries.values(), key=lambda e: e.hits, reverse=True)[:top]
+            size = len(self._entries)
+            top_entries = [{
+                'query': entry.query,
+                'hits': entry.hits,
+                'documents': len(entry.doc_ids),
+                'age_seconds': round(now - entry.created_at, 1),
+                'last_hit_seconds_ago': round(now - entry.last_hit_at, 1) if entry.last_hit_at else None,
+            } for entry in entries]
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else None,
+            'size': size,
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'threshold': self.threshold,
+            'index_version': self.index_version,
+            'invalidations': self.invalidations,
+            'entries': top_entries,
+        }
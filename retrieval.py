@@ -0,0 +1,67 @@
+# retrieval.py - 벡터 위치 기반 검색과 검색 결과 결합
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+
+from ann_index import search_parameters
+
+# Reciprocal Rank Fusion 상수 (순위 차이의 영향을 완화)
+RRF_K = 60
+
+
+def vector_search(vectorstore, query_vector: List[float], k: int,
+                  mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+    """질의 벡터로 검색하여 (벡터 위치, 거리) 목록 반환 (mask가 있으면 허용된 위치만 검색)"""
+    total = vectorstore.index.ntotal
+    params = None
+    if mask is not None:
+        positions = np.flatnonzero(mask).astype(np.int64)
+        if positions.size == 0:
+            return []
+        total = positions.size
+        selector = faiss.IDSelectorBatch(positions.size, faiss.swig_ptr(positions))
+        params = search_parameters(vectorstore.index, selector)
+    if total == 0:
+        return []
+
+    vector = np.array([query_vector], dtype=np.float32)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vector)
+    distances, indices = vectorstore.index.search(vector, min(k, total), params=params)
+    return [(int(i), float(d)) for i, d in zip(indices[0], distances[0]) if i != -1]
+
+
+def vector_search_batch(vectorstore, query_vectors: List[List[float]], k: int) -> List[List[Tuple[int, float]]]:
+    """여러 질의 벡터를 FAISS 검색 한 번으로 처리하여 질의별 (벡터 위치, 거리) 목록 반환"""
+    total = vectorstore.index.ntotal
+    if total == 0 or not query_vectors:
+        return [[] for _ in query_vectors]
+    vectors = np.array(query_vectors, dtype=np.float32)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vectors)
+    distances, indices = vectorstore.index.search(vectors, min(k, total))
+    return [
+        [(int(i), float(d)) for i, d in zip(row_indices, row_distances) if i != -1]
+        for row_indices, row_distances in zip(indices, distances)
+    ]
+
+
+def position_documents(vectorstore, positions: Sequence[int]) -> List[Document]:
+    """벡터 위치 목록을 Document 목록으로 변환"""
+    docs = []
+    for position in positions:
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+        if isinstance(doc, Document):
+            docs.append(doc)
+    return docs
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Tuple[int, float]]]) -> List[Tuple[int, float]]:
+    """여러 검색 결과 순위를 RRF 점수로 합쳐 (위치, RRF 점수) 목록을 점수 내림차순으로 반환"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (position, _) in enumerate(ranking):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
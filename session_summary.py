@@ -0,0 +1,151 @@
+# session_summary.py - 세션별 대화 요약을 응답 이후 백그라운드에서 갱신
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from latency_stats import LatencyWindow
+from prompt_builder import compact_whitespace, estimate_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# (Conversation id, 사용자 메시지, 챗봇 답변)
+Turn = Tuple[int, str, str]
+
+SUMMARY_PROMPT = """노인 일자리 상담 대화를 이어서 상담할 수 있도록 요약해주세요.
+기존 요약에 새 대화 내용을 반영하여 하나의 요약으로 다시 작성하고, {max_chars}자 이내로 작성하세요.
+사용자의 상황(나이, 건강 상태, 희망 지역, 희망 업무 등), 관심을 보인 직업과 이미 안내한 내용을 중심으로 정리하고
+인사말이나 이모지는 빼주세요. 요약만 출력하세요.
+
+기존 요약:
+{summary}
+
+새 대화:
+{turns}
+"""
+
+
+def build_summary_prompt(summary: str, turns: List[Turn], max_tokens: int) -> str:
+    """기존 요약과 새 대화로 요약 갱신 프롬프트 구성"""
+    rendered = "\n".join(
+        f"사용자: {compact_whitespace(user)}\n챗봇: {truncate_tokens(compact_whitespace(bot), max_tokens)}"
+        for _, user, bot in turns
+    )
+    # 한글 기준 토큰 하나가 대략 1.5자
+    return SUMMARY_PROMPT.format(max_chars=int(max_tokens * 1.5), summary=summary or "(없음)", turns=rendered)
+
+
+class SessionSummarizer:
+    """대화가 저장될 때마다 세션 요약을 백그라운드 스레드에서 갱신
+
+    프롬프트에는 최근 keep_recent개 대화를 그대로 넣으므로, 요약은 그 이전 대화까지만 반영합니다.
+    (대화가 keep_recent개 이하인 세션은 요약을 만들지 않음)
+    요약에 반영할 대화가 every_turns개 이상 쌓이거나 추정 토큰 수가 trigger_tokens를 넘을 때만 LLM을 호출하고,
+    그 전까지는 요약되지 않은 대화를 프롬프트에 그대로 넣습니다 (load_session_context).
+    같은 세션의 갱신 요청이 밀려 있으면 한 번으로 합쳐 처리합니다.
+
+    load(session_id) -> (기존 요약, 요약에 반영된 마지막 Conversation id, 그 이후 대화 목록(오래된 순))
+    save(session_id, 요약, 반영된 마지막 id, 이전에 반영된 마지막 id) -> 저장 여부
+      (다른 워커가 먼저 갱신했으면 False)
+    summarize(프롬프트) -> 요약 텍스트
+    """
+
+    def __init__(self, load: Callable[[str], Tuple[str, int, List[Turn]]],
+                 save: Callable[[str, str, int, int], bool], summarize: Callable[[str], str],
+                 keep_recent: int = 1, max_tokens: int = 300, every_turns: int = 1, trigger_tokens: int = 0):
+        self.load = load
+        self.save = save
+        self.summarize = summarize
+        self.keep_recent = max(0, keep_recent)
+        self.max_tokens = max_tokens
+        self.every_turns = max(1, every_turns)
+        self.trigger_tokens = trigger_tokens
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.latency = LatencyWindow()
+        self.updated = 0
+        self.conflicts = 0
+        self.failures = 0
+        self.deferred = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens > 0
+
+    def schedule(self, session_id: str) -> None:
+        """세션 요약 갱신 예약 (요청 처리 경로에서는 기다리지 않음)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if session_id in self._pending:
+                return
+            self._pending.add(session_id)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='rag-session-summary', daemon=True)
+                self._worker.start()
+        self._queue.put(session_id)
+
+    def _run(self) -> None:
+        while True:
+            session_id = self._queue.get()
+            with self._lock:
+                self._pending.discard(session_id)
+            try:
+                self.update(session_id)
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                logger.warning(f"세션 요약 갱신 실패 ({session_id}): {e}")
+
+    def update(self, session_id: str) -> bool:
+        """최근 keep_recent개를 제외한 새 대화를 요약에 반영 (반영할 대화가 없으면 False)"""
+        summary, last_id, turns = self.load(session_id)
+        turns = turns[:len(turns) - self.keep_recent] if self.keep_recent else turns
+        if not turns:
+            return False
+        if len(turns) < self.every_turns and not self._over_budget(turns):
+            with self._lock:
+                self.deferred += 1
+            return False
+        started = time.perf_counter()
+        text = self.summarize(build_summary_prompt(summary, turns, self.max_tokens))
+        text = truncate_tokens(compact_whitespace(text), self.max_tokens)
+        if not text:
+            return False
+        saved = self.save(session_id, text, turns[-1][0], last_id)
+        self.latency.add(time.perf_counter() - started)
+        with self._lock:
+            if saved:
+                self.updated += 1
+            else:
+                self.conflicts += 1
+        return saved
+
+    def _over_budget(self, turns: List[Turn]) -> bool:
+        """요약에 반영할 대화의 추정 토큰 수가 trigger_tokens를 넘는지 (0이면 대화 수로만 판단)"""
+        if self.trigger_tokens <= 0:
+            return False
+        return sum(estimate_tokens(user) + estimate_tokens(bot) for _, user, bot in turns) > self.trigger_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        """요약 갱신 횟수와 소요 시간"""
+        with self._lock:
+            counts = {
+                'updated': self.updated,
+                'conflicts': self.conflicts,
+                'failures': self.failures,
+                'deferred': self.deferred,
+                'pending': len(self._pending),
+            }
+        return {
+            'enabled': self.enabled,
+            'keep_recent': self.keep_recent,
+            'max_tokens': self.max_tokens,
+            'every_turns': self.every_turns,
+            'trigger_tokens': self.trigger_tokens,
+            **counts,
+            'latency': self.latency.summary(),
+        }
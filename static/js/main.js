@@ -104,8 +104,8 @@ async function sendMessage() {
     showLoading(true);
     
     try {
-        // API 호출
-        const response = await fetch('/api/chat', {
+        // API 호출 (응답을 토큰 단위로 받아 생성되는 대로 표시)
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -115,15 +115,20 @@ async function sendMessage() {
                 session_id: sessionId
             })
         });
-        
+
+        // 서버가 상담 정보를 준비 중이거나(503) 요청이 몰려 잠시 받을 수 없는 경우(429) 안내 메시지 표시
+        if (response.status === 503 || response.status === 429) {
+            const data = await response.json();
+            addMessage(data.error, 'bot');
+            return;
+        }
+
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
-        const data = await response.json();
-        
         // 봇 응답 표시
-        addMessage(data.response, 'bot');
+        await renderStream(response);
         
         // 통계 업데이트
         messageCount++;
@@ -137,6 +142,44 @@ async function sendMessage() {
     }
 }
 
+// SSE 응답을 읽어 봇 메시지를 점진적으로 표시
+async function renderStream(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let contentDiv = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // 이벤트는 빈 줄로 구분됨
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+            const dataLine = event.split('\n').find(line => line.startsWith('data: '));
+            if (!dataLine || event.startsWith('event: done')) continue;
+            const data = JSON.parse(dataLine.substring(6));
+            if (data.token === undefined) continue;
+
+            text += data.token;
+            if (!contentDiv) {
+                // 첫 토큰이 오면 로딩 화면을 닫고 봇 메시지 생성
+                document.getElementById('loadingOverlay').style.display = 'none';
+                contentDiv = addMessage('', 'bot');
+            }
+            contentDiv.innerHTML = formatMessage(text);
+            scrollToBottom();
+        }
+    }
+
+    if (!contentDiv) {
+        throw new Error('빈 응답');
+    }
+}
+
 // 빠른 메시지 전송
 function sendQuickMessage(message) {
     const messageInput = document.getElementById('messageInput');
@@ -168,6 +211,8 @@ function addMessage(content, sender) {
     
     // 자동 스크롤
     scrollToBottom();
+
+    return contentDiv;
 }
 
 // 메시지 포맷팅
@@ -0,0 +1,22 @@
+# conftest.py - 테스트 공통 설정
+# 저장소 루트의 모듈을 import하고, app을 import하는 테스트는 임시 폴더와 로컬 임베딩으로 실행
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix="rag-test-")
+for name, value in {
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TMP, 'chatbot.db')}",
+    "RAG_INDEX_DIR": os.path.join(_TMP, "rag_index"),
+    "RAG_EMBEDDING_CACHE": os.path.join(_TMP, "embedding_cache.sqlite3"),
+    "RAG_CANNED_ANSWERS": os.path.join(_TMP, "canned_answers.json"),
+    "RAG_ADMISSION_SLOT_DIR": os.path.join(_TMP, "llm_slots"),
+    "RAG_EMBEDDING_BACKEND": "local",
+    "RAG_CANNED_QUESTIONS": "",
+    "RAG_RELOAD_INTERVAL": "0",
+    "GOOGLE_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,53 @@
+# test_ann_index.py - 검색 인덱스 종류 선택과 목표 재현율 조정 (build_search_index)
+import faiss
+import numpy as np
+
+from ann_index import PQ_MIN_TRAIN, build_search_index, choose_index_type, exact_index
+
+
+def flat_index(n, d, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, d)).astype(np.float32)
+    index = faiss.IndexFlatL2(d)
+    index.add(vectors)
+    return index
+
+
+def test_choose_index_type_falls_back_to_flat_for_small_corpora():
+    assert choose_index_type("auto", 100, 1000, "none") == "flat"
+    assert choose_index_type("auto", 5000, 1000, "none") == "hnsw"
+    assert choose_index_type("auto", 5000, 1000, "pq") == "flat"
+    assert choose_index_type("auto", PQ_MIN_TRAIN, 1000, "pq") == "pq"
+
+
+def test_pq_that_misses_target_recall_is_replaced():
+    # 구조가 없는 무작위 벡터에서는 IVF-PQ 재현율이 목표에 크게 못 미침
+    flat = flat_index(PQ_MIN_TRAIN, 64)
+    index, info = build_search_index(flat, "pq", "pq", 0.95, 12)
+
+    assert info["recall_at_k"] >= 0.95
+    assert info["fallback_from"][0]["factory"].startswith("IVF")
+    assert "PQ" in info["fallback_from"][0]["factory"]
+    assert info["fallback_from"][0]["recall_at_k"] < 0.95
+    assert info["type"] == "ivf" and info["compression"] == "fp16"
+    assert index.ntotal == flat.ntotal
+
+
+def test_hnsw_reaches_target_with_tuned_ef():
+    flat = flat_index(3000, 32)
+    index, info = build_search_index(flat, "hnsw", "none", 0.9, 10)
+
+    assert isinstance(index, faiss.IndexHNSW)
+    assert info["recall_at_k"] >= 0.9
+    assert "efSearch" in info["params"]
+    assert "fallback_from" not in info
+    restored = exact_index(index)
+    assert restored.ntotal == flat.ntotal
+
+
+def test_unreachable_target_ends_on_exact_search():
+    flat = flat_index(3000, 32)
+    index, info = build_search_index(flat, "hnsw", "none", 1.01, 10)
+
+    assert index is flat
+    assert info["type"] == "flat"
+    assert info["fallback_from"]
@@ -0,0 +1,49 @@
+# test_constraints.py - 질문에서 검색 조건 추출 (ConstraintExtractor)
+from types import SimpleNamespace
+
+from constraints import ConstraintExtractor
+from phrase_automaton import PhraseAutomaton
+
+REGIONS = ["서울특별시 강동구", "서울특별시 중구", "서울특별시 전지역", "대구광역시 동구", "대구광역시 중구", "부산광역시 중구"]
+
+
+def make_extractor():
+    columns = SimpleNamespace(vocab={
+        "신체활동수준": ["낮음", "보통", "높음"],
+        "근무형태": ["공익활동형", "사회서비스형"],
+        "지역": REGIONS,
+    })
+    return ConstraintExtractor(columns)
+
+
+def test_automaton_returns_spans():
+    automaton = PhraseAutomaton([("강동구", "a"), ("동구", "b")])
+    assert sorted(automaton.find_spans("강동구 일자리")) == [(0, 3, "a"), (1, 3, "b")]
+
+
+def test_mobility_and_work_type():
+    constraints = make_extractor().extract("무릎이 안 좋아서 공익형 일자리를 찾아요")
+    assert constraints["신체활동수준"] == {"낮음"}
+    assert constraints["근무형태"] == {"공익활동형"}
+
+
+def test_longer_district_hides_contained_one():
+    constraints = make_extractor().extract("강동구에서 할 수 있는 일")
+    assert constraints["지역"] == {"서울특별시 강동구", "서울특별시 전지역"}
+
+
+def test_district_inside_another_word_is_ignored():
+    # "인천광역시 강동구"처럼 어휘에 없는 더 긴 이름 안의 "동구"는 지역으로 보지 않는다
+    assert "지역" not in make_extractor().extract("남동구청 근처 일자리")
+    constraints = make_extractor().extract("대구 동구에 사는데요")
+    assert constraints["지역"] == {"대구광역시 동구"}
+
+
+def test_city_prefix_without_space():
+    constraints = make_extractor().extract("서울강동 쪽 일자리")
+    assert constraints["지역"] == {"서울특별시 강동구", "서울특별시 전지역"}
+
+
+def test_ambiguous_district_keeps_all_cities():
+    constraints = make_extractor().extract("중구 일자리")
+    assert constraints["지역"] == {"서울특별시 중구", "서울특별시 전지역", "대구광역시 중구", "부산광역시 중구"}
@@ -0,0 +1,131 @@
+# test_deadline.py - 시간 예산 안의 재시도/헤징 호출 (HedgedCaller)
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from deadline import CallerSaturated, Deadline, DeadlineExceeded, HedgedCaller, HEDGE_MIN_SAMPLES
+
+
+class ServiceUnavailable(Exception):
+    """google.api_core.exceptions.ServiceUnavailable과 같은 이름의 일시적 오류"""
+
+
+def warm(caller, seconds=0.01):
+    for _ in range(HEDGE_MIN_SAMPLES):
+        caller.latency.add(seconds)
+
+
+def test_retries_transient_errors():
+    caller = HedgedCaller("test", max_retries=2, retry_delay=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ServiceUnavailable("잠시 후 다시 시도")
+        return "ok"
+
+    assert caller.call(flaky, Deadline(5)) == "ok"
+    assert caller.stats()["retries"] == 2
+
+
+def test_does_not_retry_permanent_errors():
+    caller = HedgedCaller("test", max_retries=2, retry_delay=0.001)
+    with pytest.raises(ValueError):
+        caller.call(lambda: (_ for _ in ()).throw(ValueError("잘못된 요청")), Deadline(5))
+    assert caller.stats()["retries"] == 0
+    assert caller.stats()["failures"] == 1
+
+
+def test_hedge_wins_and_loser_is_discarded():
+    discarded = []
+    caller = HedgedCaller("test", max_retries=0, hedge_percentile=50, discard=discarded.append)
+    warm(caller)
+    delays = iter([0.5, 0.0])
+
+    def call():
+        delay = next(delays)
+        time.sleep(delay)
+        return delay
+
+    assert caller.call(call, Deadline(5)) == 0.0
+    assert caller.stats()["hedge_wins"] == 1
+    deadline = time.monotonic() + 2
+    while not discarded and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert discarded == [0.5]
+    assert caller.stats()["abandoned_in_flight"] == 0
+
+
+def test_deadline_returns_without_waiting_for_stuck_call():
+    release = threading.Event()
+    caller = HedgedCaller("test", max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        caller.call(lambda: release.wait(5), Deadline(0.05))
+    assert time.monotonic() - started < 1
+    assert caller.stats()["timeouts"] == 1
+    assert caller.stats()["abandoned_in_flight"] == 1
+    release.set()
+    deadline = time.monotonic() + 2
+    while caller.stats()["abandoned_in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert caller.stats()["abandoned_in_flight"] == 0
+
+
+def test_abandoned_calls_are_bounded():
+    release = threading.Event()
+    caller = HedgedCaller("test", max_retries=0, max_workers=4, max_abandoned=1)
+    with pytest.raises(DeadlineExceeded):
+        caller.call(lambda: release.wait(5), Deadline(0.02))
+    with pytest.raises(CallerSaturated):
+        caller.call(lambda: "ok", Deadline(1))
+    release.set()
+    deadline = time.monotonic() + 2
+    while caller.saturated() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert caller.call(lambda: "ok", Deadline(1)) == "ok"
+
+
+def test_stuck_call_does_not_block_interpreter_exit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (
+        "import threading\n"
+        "from deadline import Deadline, DeadlineExceeded, HedgedCaller\n"
+        "try:\n"
+        "    HedgedCaller('exit').call(lambda: threading.Event().wait(60), Deadline(0.05))\n"
+        "except DeadlineExceeded:\n"
+        "    pass\n"
+    )
+    started = time.monotonic()
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True, timeout=20)
+    assert time.monotonic() - started < 15
+
+
+def test_async_hedge_cancels_loser():
+    caller = HedgedCaller("test", max_retries=0, hedge_percentile=50)
+    warm(caller)
+    cancelled = []
+    delays = iter([0.5, 0.0])
+
+    async def call():
+        delay = next(delays)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    async def main():
+        result = await caller.acall(call, Deadline(5))
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == 0.0
+    assert cancelled == [0.5]
@@ -0,0 +1,55 @@
+# test_embedding_cache.py - SQLite 임베딩 캐시 크기/보관 기간 제한 (CachedEmbeddings)
+import sqlite3
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_max_rows_keeps_newest(tmp_path):
+    underlying = CountingEmbeddings()
+    cache = CachedEmbeddings(underlying, "m", str(tmp_path / "cache.sqlite3"), max_rows=3)
+    cache.embed_documents([f"문서 {i}" for i in range(5)])
+    assert cache.prune() == 2
+    stats = cache.stats()
+    assert stats["rows"] == 3 and stats["pruned"] == 2 and stats["max_rows"] == 3
+
+    # 가장 오래된 행이 삭제되어 다시 임베딩, 최근 행은 캐시 적중
+    underlying.calls = 0
+    cache.embed_documents(["문서 0", "문서 4"])
+    assert underlying.calls == 1
+
+
+def test_max_age_drops_expired_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = CachedEmbeddings(CountingEmbeddings(), "m", path, max_age=60)
+    cache.embed_documents(["오래된 문서", "새 문서"])
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE embeddings SET created_at = ? WHERE rowid = 1", (time.time() - 120,))
+    assert cache.prune() == 1
+    assert cache.stats()["rows"] == 1
+
+
+def test_adds_created_at_to_old_cache_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE embeddings (model TEXT NOT NULL, task TEXT NOT NULL, text_hash TEXT NOT NULL, "
+            "vector BLOB NOT NULL, PRIMARY KEY (model, task, text_hash))"
+        )
+        conn.execute("INSERT INTO embeddings VALUES ('m', 'retrieval_document', 'h', x'00000000')")
+    cache = CachedEmbeddings(CountingEmbeddings(), "m", path, max_age=60)
+    assert cache.stats()["rows"] == 1
@@ -0,0 +1,57 @@
+# test_faq_router.py - 절차 질문 라우터 (FaqRouter)와 공용 Aho-Corasick 자동자
+from faq_router import ANSWER_CLOSING, FAQ_INTENTS, FaqRouter
+from phrase_automaton import PhraseAutomaton
+
+
+def test_automaton_finds_overlapping_phrases():
+    automaton = PhraseAutomaton([("신청", "a"), ("신청방법", "b"), ("방법", "c")])
+    assert sorted(automaton.find("신청방법알려줘")) == ["a", "b", "c"]
+    assert automaton.find("모집시기") == []
+
+
+def test_routes_procedural_questions():
+    router = FaqRouter()
+    for query, intent in [
+        ("신청 방법을 알려주세요", "apply_method"),
+        ("신청방법 알려줘", "apply_method"),
+        ("준비 서류가 뭔가요?", "documents"),
+        ("모집 시기가 언제예요", "recruit_period"),
+        ("노인 일자리 종류가 어떻게 되나요?", "job_types"),
+    ]:
+        decision = router.classify(query)
+        assert decision.reason == "faq", query
+        assert decision.intents == (intent,), query
+
+
+def test_multiple_intents_are_answered_together():
+    router = FaqRouter()
+    decision = router.classify("신청 방법이랑 준비 서류 알려주세요")
+    assert set(decision.intents) == {"apply_method", "documents"}
+    answer = router.answer(decision.intents)
+    intents = {intent.name: intent for intent in FAQ_INTENTS}
+    assert intents["apply_method"].answer in answer
+    assert intents["documents"].answer in answer
+    assert answer.endswith(ANSWER_CLOSING)
+
+
+def test_other_questions_fall_through_to_rag():
+    router = FaqRouter()
+    for query in ("다리가 아파도 할 수 있는 일 있나요?", "바리스타 교육은 어디서 받나요", "안녕하세요"):
+        decision = router.classify(query)
+        assert decision.intents == (), query
+        assert decision.reason in ("no_match", "low_score"), query
+
+
+def test_disabled_router_never_routes():
+    router = FaqRouter(min_similarity=1.1)
+    assert router.classify("신청 방법을 알려주세요").reason == "disabled"
+
+
+def test_record_counts_decisions():
+    router = FaqRouter()
+    for query in ("신청 방법을 알려주세요", "안녕하세요"):
+        router.record(query, router.classify(query), 0.001)
+    stats = router.stats()
+    assert stats["decisions"]["faq"] == 1
+    assert stats["served"]["apply_method"] == 1
+    assert len(stats["recent"]) == 2
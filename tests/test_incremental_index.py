@@ -0,0 +1,96 @@
+# test_incremental_index.py - 행 단위 증분 반영(_index_documents)과 읽기 실패 파일 처리
+import os
+
+import pytest
+from langchain.schema import Document
+
+from csv_ingest import iter_data_documents
+from embedders import LocalHashEmbeddings
+from embedding_pipeline import EmbeddingPipeline
+
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    def __init__(self):
+        super().__init__(64)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def job(source, title, description, row=0):
+    return Document(
+        page_content=f"설명: {description}",
+        metadata={"source": f"data/{source}", "row": row, "직업명": title},
+    )
+
+
+@pytest.fixture
+def rag():
+    app = pytest.importorskip("app")
+    rag = app.SeniorJobRAG.__new__(app.SeniorJobRAG)
+    rag.ingest_mode = "row"
+    rag.metadata_schema = {"직업명": "str"}
+    return rag
+
+
+@pytest.fixture
+def pipeline():
+    return EmbeddingPipeline(CountingEmbeddings(), batch_size=10, max_workers=1, requests_per_minute=6000)
+
+
+def build(rag, pipeline, documents, vectorstore=None, old_rows=None, failed_files=None):
+    pipeline.embeddings.embedded.clear()
+    return rag._index_documents(iter(documents), vectorstore, old_rows, pipeline, failed_files)
+
+
+def test_only_changed_rows_are_embedded(rag, pipeline):
+    vectorstore, rows = build(rag, pipeline, [
+        job("a.csv", "경비", "아파트 경비"),
+        job("a.csv", "급식", "학교 급식 지원"),
+        job("a.csv", "청소", "공원 청소"),
+    ])
+    assert vectorstore.index.ntotal == 3
+
+    vectorstore, new_rows = build(rag, pipeline, [
+        job("a.csv", "경비", "아파트 경비"),
+        job("a.csv", "급식", "학교 급식 배식 지원"),
+        job("a.csv", "바리스타", "실버카페 운영"),
+    ], vectorstore, rows)
+
+    assert set(new_rows) == {"a.csv:경비", "a.csv:급식", "a.csv:바리스타"}
+    assert len(pipeline.embeddings.embedded) == 2
+    assert vectorstore.index.ntotal == 3
+    assert "a.csv:청소/0" not in vectorstore.index_to_docstore_id.values()
+
+
+def test_rows_of_failed_file_are_kept(rag, pipeline):
+    vectorstore, rows = build(rag, pipeline, [
+        job("a.csv", "경비", "아파트 경비"),
+        job("b.csv", "급식", "학교 급식 지원"),
+        job("b.csv", "청소", "공원 청소"),
+    ])
+
+    # b.csv는 첫 행만 읽고 실패, a.csv의 경비 행은 실제로 삭제됨
+    vectorstore, new_rows = build(rag, pipeline, [
+        job("b.csv", "급식", "학교 급식 지원"),
+    ], vectorstore, rows, {"b.csv": "UnicodeDecodeError"})
+
+    assert new_rows["b.csv:청소"] == rows["b.csv:청소"]
+    assert "a.csv:경비" not in new_rows
+    ids = set(vectorstore.index_to_docstore_id.values())
+    assert "b.csv:청소/0" in ids
+    assert "a.csv:경비/0" not in ids
+    assert pipeline.embeddings.embedded == []
+
+
+def test_iter_data_documents_reports_failed_files(tmp_path):
+    (tmp_path / "good.csv").write_text("직업명,설명\n경비,아파트 경비\n", encoding="utf-8")
+    (tmp_path / "bad.csv").mkdir()
+    failed = {}
+    documents = list(iter_data_documents(str(tmp_path), ["bad.csv", "good.csv"], {"직업명": "str"}, failed))
+
+    assert [doc.metadata["직업명"] for doc in documents] == ["경비"]
+    assert list(failed) == ["bad.csv"]
+    assert os.path.basename(documents[0].metadata["source"]) == "good.csv"
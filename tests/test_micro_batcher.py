@@ -0,0 +1,104 @@
+# test_micro_batcher.py - 질의 임베딩/검색 마이크로 배치 (RetrievalBatcher)
+import threading
+import time
+
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from deadline import DeadlineExceeded
+from embedders import LocalHashEmbeddings
+from embedding_cache import QueryEmbeddingCache
+from micro_batcher import RetrievalBatcher
+
+TEXTS = ["아파트 경비", "학교 급식 지원", "공원 청소", "실버카페 바리스타"]
+
+
+class GatedEmbeddings(LocalHashEmbeddings):
+    """embed_queries 호출 횟수를 세고, gate가 닫혀 있으면 열릴 때까지 대기"""
+
+    def __init__(self):
+        super().__init__(64)
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def embed_queries(self, texts):
+        self.calls.append(list(texts))
+        self.gate.wait(5)
+        return super().embed_queries(texts)
+
+
+@pytest.fixture
+def embeddings():
+    return GatedEmbeddings()
+
+
+@pytest.fixture
+def vectorstore(embeddings):
+    return FAISS.from_texts(TEXTS, embeddings)
+
+
+def test_concurrent_misses_share_one_embedding_call(embeddings, vectorstore):
+    batcher = RetrievalBatcher(QueryEmbeddingCache(), max_batch=8, max_wait=0.05)
+    results = {}
+
+    def search(query):
+        results[query] = batcher.search(vectorstore, query, 1, timeout=5)
+
+    threads = [threading.Thread(target=search, args=(text,)) for text in TEXTS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(embeddings.calls) == 1
+    assert sorted(embeddings.calls[0]) == sorted(TEXTS)
+    for position, text in enumerate(TEXTS):
+        hits, vector = results[text]
+        assert hits[0][0] == position
+        assert vector is not None
+
+
+def test_cached_query_does_not_wait_behind_batch(embeddings, vectorstore):
+    cache = QueryEmbeddingCache()
+    batcher = RetrievalBatcher(cache, max_batch=8, max_wait=0.01)
+    batcher.search(vectorstore, "공원 청소", 1, timeout=5)
+
+    # 원격 임베딩이 멈춘 동안 다른 질의가 배치에 들어가 있어도 캐시 적중 질의는 바로 응답
+    embeddings.gate.clear()
+    slow = threading.Thread(target=lambda: batcher.search(vectorstore, "새 질문", 1, timeout=5))
+    slow.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    hits, _ = batcher.search(vectorstore, "공원 청소", 1, timeout=1)
+    elapsed = time.perf_counter() - started
+    embeddings.gate.set()
+    slow.join()
+
+    assert hits[0][0] == 2
+    assert elapsed < 0.5
+    assert batcher.stats()["cached_inline"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_masked_search_only_returns_allowed_positions(vectorstore):
+    batcher = RetrievalBatcher(QueryEmbeddingCache(), max_batch=8, max_wait=0.01)
+    mask = np.zeros(len(TEXTS), dtype=bool)
+    mask[[1, 3]] = True
+
+    hits, _ = batcher.search(vectorstore, "아파트 경비", 4, mask=mask, timeout=5)
+    cached_hits, _ = batcher.search(vectorstore, "아파트 경비", 4, mask=mask, timeout=5)
+
+    assert {position for position, _ in hits} == {1, 3}
+    assert cached_hits == hits
+
+
+def test_timeout_raises_deadline_exceeded(embeddings, vectorstore):
+    batcher = RetrievalBatcher(QueryEmbeddingCache(), max_batch=8, max_wait=0.01)
+    embeddings.gate.clear()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            batcher.search(vectorstore, "느린 질문", 1, timeout=0.05)
+    finally:
+        embeddings.gate.set()
@@ -0,0 +1,39 @@
+# test_session_summary.py - 세션 요약 갱신 주기 (SessionSummarizer)
+from session_summary import SessionSummarizer
+
+
+def make_summarizer(turns, **kwargs):
+    state = {'summary': '', 'last_id': 0}
+    calls = []
+
+    def load(session_id):
+        return state['summary'], state['last_id'], [turn for turn in turns if turn[0] > state['last_id']]
+
+    def save(session_id, summary, last_id, previous_last_id):
+        state.update(summary=summary, last_id=last_id)
+        return True
+
+    def summarize(prompt):
+        calls.append(prompt)
+        return "요약"
+
+    return SessionSummarizer(load, save, summarize, **kwargs), state, calls
+
+
+def test_summarizes_only_every_n_turns():
+    turns = []
+    summarizer, state, calls = make_summarizer(turns, keep_recent=1, every_turns=3)
+    for turn_id in range(1, 8):
+        turns.append((turn_id, f"질문 {turn_id}", "답변"))
+        summarizer.update("s")
+    # 최근 1개를 제외한 대화가 3개 쌓였을 때(4번째, 7번째 대화 저장 후)만 LLM 호출
+    assert len(calls) == 2
+    assert state['last_id'] == 6
+    assert summarizer.stats()['deferred'] == 4
+
+
+def test_long_turns_trigger_summary_early():
+    turns = [(1, "질문", "아주 긴 답변 " * 100), (2, "다음 질문", "답변")]
+    summarizer, state, calls = make_summarizer(turns, keep_recent=1, every_turns=5, trigger_tokens=100)
+    assert summarizer.update("s")
+    assert len(calls) == 1 and state['last_id'] == 1